@@ -0,0 +1 @@
+"""API HTTP local (JSON) sobre os serviços; ver `api.server`."""
@@ -0,0 +1,23 @@
+"""Permite `python -m venda_app.api` (servidor HTTP local)."""
+
+import argparse
+import sys
+from pathlib import Path
+
+from .server import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_READERS, DEFAULT_WORKERS, run
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="venda_app.api", description="API HTTP local (JSON).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", type=Path, help="arquivo do banco (padrão: db/app.db)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="threads que atendem requisições")
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS, help="conexões de leitura")
+    args = parser.parse_args(argv)
+
+    run(args.host, args.port, args.db, workers=args.workers, readers=args.readers)
+    return 0
+
+
+sys.exit(main())
@@ -0,0 +1,410 @@
+"""venda_app.api.server
+
+API HTTP local (JSON) sobre a camada de serviços, para outra estação de
+embalagem ou robôs de marketplace usarem o mesmo banco da loja.
+
+Arquitetura:
+  - `http.server` da biblioteca padrão; cada requisição é atendida por um
+    pool fixo de threads (`workers`), não por uma thread nova a cada vez.
+  - Gravações vão para a `WriteQueue` (db.pool): uma conexão de escrita,
+    em série, com group commit (vendas que chegam juntas dividem o
+    COMMIT; cada uma no seu SAVEPOINT). Leituras usam o `ReaderPool`
+    (várias conexões, WAL).
+  - Escuta só em 127.0.0.1 por padrão. Se VENDA_APP_API_TOKEN estiver
+    definido, exige `Authorization: Bearer <token>`.
+
+Rotas:
+    GET  /health
+    GET  /stock                 estoque por variação (físico/reservado/disponível)
+    GET  /stock?below_min=1     produtos abaixo do mínimo
+    GET  /stock/<sku>           uma variação
+    GET  /summary?from=&to=     resumo financeiro
+    POST /sales                 corpo = argumentos de create_sale; items só com
+                                sku, qty, unit_price, fees, discount (custo e
+                                variação vêm do cadastro; SKU inativo é recusado)
+    POST /sales/<id>/status     {"status": "ENVIADO"} (SALE_STATUSES)
+    POST /sales/<id>/cancel
+
+Erros: 400 (dados inválidos), 404, 409 (estoque insuficiente, com
+`shortages`), 500.
+"""
+
+from __future__ import annotations
+
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from ..db.database import init_db
+from ..db.pool import ReaderPool, WriteQueue
+from ..services.inventory_service import get_stock_table_rows, get_variant_stock_by_sku, list_products_below_min
+from ..services.reports_service import get_financial_summary
+from ..services.sales_service import SALE_STATUSES, InsufficientStockError, cancel_sale, create_sale, update_sale_status
+from ..utils.logger import logger
+from ..utils.metrics import METRICS_DIR, record, set_metrics_file
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.environ.get("VENDA_APP_API_PORT", "8765"))
+DEFAULT_WORKERS = 8
+DEFAULT_READERS = 4
+MAX_BODY_BYTES = 1 << 20
+
+_SALE_FIELDS = (
+    "sale_date",
+    "channel",
+    "status",
+    "order_ref",
+    "customer_name",
+    "notes",
+    "items",
+    "packaging_enabled",
+    "packaging_volumes",
+    "packaging_box_sku",
+    "packaging_env_sku",
+    "oversell_policy",
+)
+_ITEM_FIELDS = ("sku", "qty", "unit_price", "fees", "discount")
+# venda nova não nasce cancelada (os movimentos OUT nunca seriam estornados)
+API_SALE_STATUSES = tuple(s for s in SALE_STATUSES if s != "CANCELADO")
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str, **extra: Any):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def _rows(rows) -> List[Dict[str, Any]]:
+    return [dict(r) for r in rows]
+
+
+# =========================
+# HANDLERS (recebem a app, os parâmetros da rota, a query e o corpo)
+# =========================
+
+
+def _health(app: "ApiApp", match, query, body):
+    return 200, {"ok": True, "pending_writes": app.writer.pending()}
+
+
+def _stock(app: "ApiApp", match, query, body):
+    with app.readers.connection() as conn:
+        if query.get("below_min") in ("1", "true"):
+            return 200, _rows(list_products_below_min(conn))
+        return 200, _rows(get_stock_table_rows(conn))
+
+
+def _stock_one(app: "ApiApp", match, query, body):
+    sku = unquote(match.group("sku"))
+    with app.readers.connection() as conn:
+        row = get_variant_stock_by_sku(conn, sku)
+    if row is None:
+        raise ApiError(404, f"SKU não encontrado: {sku}")
+    return 200, dict(row)
+
+
+def _summary(app: "ApiApp", match, query, body):
+    today = date.today()
+    date_from = query.get("from") or today.replace(day=1).isoformat()
+    date_to = query.get("to") or today.isoformat()
+    with app.readers.connection() as conn:
+        summary = get_financial_summary(conn, date_from, date_to)
+    return 200, {"from": date_from, "to": date_to, **summary}
+
+
+def _require(cond: bool, message: str) -> None:
+    if not cond:
+        raise ApiError(400, message)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _text(body: Dict[str, Any], key: str, default: str = "") -> str:
+    value = body.get(key)
+    if value is None:
+        return default
+    _require(isinstance(value, str), f"{key} deve ser texto")
+    return value.strip() or default
+
+
+def _sale_item(n: int, item: Any) -> Dict[str, Any]:
+    """Item de venda vindo do cliente: só SKU e valores (custo e variação vêm do cadastro)."""
+    _require(isinstance(item, dict), f"Item {n}: deve ser um objeto")
+    unknown = set(item) - set(_ITEM_FIELDS)
+    _require(not unknown, f"Item {n}: campos desconhecidos: {', '.join(sorted(unknown))}")
+    sku = item.get("sku")
+    _require(isinstance(sku, str) and sku.strip() != "", f"Item {n}: informe o sku")
+    qty = item.get("qty")
+    _require(isinstance(qty, int) and not isinstance(qty, bool) and qty > 0, f"Item {n}: qty deve ser inteiro > 0")
+    line: Dict[str, Any] = {"sku": sku.strip(), "qty": qty}
+    for key in ("unit_price", "fees", "discount"):
+        value = item.get(key, 0)
+        _require(_is_number(value) and value >= 0, f"Item {n}: {key} deve ser número >= 0")
+        line[key] = float(value)
+    return line
+
+
+def _sale_args(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida o corpo de POST /sales e monta os argumentos de create_sale."""
+    unknown = set(body) - set(_SALE_FIELDS)
+    _require(not unknown, f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+    items = body.get("items")
+    _require(isinstance(items, list) and len(items) > 0, "Informe ao menos um item (lista)")
+
+    sale_date = _text(body, "sale_date", date.today().isoformat())
+    try:
+        date.fromisoformat(sale_date)
+    except ValueError:
+        raise ApiError(400, f"sale_date inválida (use AAAA-MM-DD): {sale_date}")
+    status = _text(body, "status", "A_ENVIAR").upper()
+    _require(status in API_SALE_STATUSES, f"status deve ser um de: {', '.join(API_SALE_STATUSES)}")
+
+    args: Dict[str, Any] = {
+        "sale_date": sale_date,
+        "channel": _text(body, "channel", "API"),
+        "status": status,
+        "order_ref": _text(body, "order_ref"),
+        "customer_name": _text(body, "customer_name"),
+        "notes": _text(body, "notes"),
+        "items": [_sale_item(n, item) for n, item in enumerate(items, 1)],
+    }
+    if "packaging_enabled" in body:
+        _require(isinstance(body["packaging_enabled"], bool), "packaging_enabled deve ser true/false")
+        args["packaging_enabled"] = body["packaging_enabled"]
+    if "packaging_volumes" in body:
+        volumes = body["packaging_volumes"]
+        _require(isinstance(volumes, int) and not isinstance(volumes, bool) and volumes > 0, "packaging_volumes deve ser inteiro > 0")
+        args["packaging_volumes"] = volumes
+    for key in ("packaging_box_sku", "packaging_env_sku", "oversell_policy"):
+        if key in body:
+            args[key] = _text(body, key)
+    return args
+
+
+def _create_sale(app: "ApiApp", match, query, body):
+    sale_id = app.writer.call_grouped(create_sale, **_sale_args(body))
+    return 201, {"sale_id": sale_id}
+
+
+def _sale_status(app: "ApiApp", match, query, body):
+    status = body.get("status")
+    _require(isinstance(status, str) and status.strip() != "", "Informe o status")
+    status = status.strip().upper()
+    app.writer.call_grouped(update_sale_status, int(match.group("id")), status)
+    return 200, {"sale_id": int(match.group("id")), "status": status}
+
+
+def _sale_cancel(app: "ApiApp", match, query, body):
+    app.writer.call_grouped(cancel_sale, int(match.group("id")))
+    return 200, {"sale_id": int(match.group("id")), "status": "CANCELADO"}
+
+
+ROUTES: List[Tuple[str, "re.Pattern[str]", Callable]] = [
+    ("GET", re.compile(r"^/health$"), _health),
+    ("GET", re.compile(r"^/stock$"), _stock),
+    ("GET", re.compile(r"^/stock/(?P<sku>[^/]+)$"), _stock_one),
+    ("GET", re.compile(r"^/summary$"), _summary),
+    ("POST", re.compile(r"^/sales$"), _create_sale),
+    ("POST", re.compile(r"^/sales/(?P<id>\d+)/status$"), _sale_status),
+    ("POST", re.compile(r"^/sales/(?P<id>\d+)/cancel$"), _sale_cancel),
+]
+
+
+# =========================
+# SERVIDOR
+# =========================
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    server: "PooledHTTPServer"
+    protocol_version = "HTTP/1.1"
+    # conexão keep-alive ociosa ocupa uma thread do pool; fecha depois disso
+    timeout = 10
+    # cabeçalho e corpo saem em writes separados; com Nagle + ACK atrasado
+    # cada resposta esperaria ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):  # noqa: A002 - assinatura da base
+        logger.debug("api %s - %s", self.address_string(), format % args)
+
+    def _dispatch(self, method: str) -> None:
+        app = self.server.app
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        try:
+            body = self._read_body()  # sempre consome o corpo (keep-alive)
+            if app.token and not hmac.compare_digest(
+                self.headers.get("Authorization", ""), f"Bearer {app.token}"
+            ):
+                raise ApiError(401, "Token inválido")
+            status, payload = app.handle(method, parts.path, query, body)
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e), **e.extra}
+        except InsufficientStockError as e:
+            status, payload = 409, {"error": str(e), "shortages": e.shortages}
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:  # noqa: BLE001 - vira 500
+            logger.exception("Erro na API (%s %s)", method, parts.path)
+            status, payload = 500, {"error": f"Erro interno: {e}"}
+        self._send(status, payload)
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "Corpo muito grande")
+        try:
+            body = json.loads(self.rfile.read(length))
+        except json.JSONDecodeError as e:
+            raise ApiError(400, f"JSON inválido: {e}")
+        if not isinstance(body, dict):
+            raise ApiError(400, "O corpo deve ser um objeto JSON")
+        return body
+
+    def _send(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer que atende cada conexão em um pool fixo de threads."""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, app: "ApiApp", workers: int = DEFAULT_WORKERS):
+        self.app = app
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="venda-api")
+        super().__init__(address, handler)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # noqa: BLE001 - mesmo tratamento do ThreadingMixIn
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+class ApiApp:
+    """Estado compartilhado do servidor: fila de escrita, leitores e rotas."""
+
+    def __init__(self, db_path: Optional[Path] = None, readers: int = DEFAULT_READERS, token: Optional[str] = None):
+        init_db(db_path=db_path)
+        self.writer = WriteQueue(db_path)
+        self.readers = ReaderPool(db_path, size=readers)
+        self.token = token if token is not None else os.environ.get("VENDA_APP_API_TOKEN") or None
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Dict[str, Any]) -> Tuple[int, Any]:
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            started = time.perf_counter()
+            try:
+                return handler(self, match, query, body)
+            finally:
+                record(f"api.{handler.__name__.lstrip('_')}", (time.perf_counter() - started) * 1000.0)
+        if allowed:
+            raise ApiError(405, "Método não permitido")
+        raise ApiError(404, "Rota não encontrada")
+
+    def close(self) -> None:
+        self.writer.close()
+        self.readers.close()
+
+
+def make_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    db_path: Optional[Path] = None,
+    workers: int = DEFAULT_WORKERS,
+    readers: int = DEFAULT_READERS,
+    token: Optional[str] = None,
+) -> PooledHTTPServer:
+    """Cria o servidor (ainda sem atender). `port=0` escolhe uma porta livre."""
+    app = ApiApp(db_path, readers=readers, token=token)
+    return PooledHTTPServer((host, port), ApiRequestHandler, app, workers=workers)
+
+
+def serve_in_thread(server: PooledHTTPServer) -> threading.Thread:
+    """Atende em segundo plano (testes de carga, embutir na aplicação)."""
+    thread = threading.Thread(target=server.serve_forever, name="venda-api-accept", daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_server(server: PooledHTTPServer) -> None:
+    server.shutdown()
+    server.server_close()
+    server.app.close()
+
+
+def run(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    db_path: Optional[Path] = None,
+    workers: int = DEFAULT_WORKERS,
+    readers: int = DEFAULT_READERS,
+) -> None:
+    """Atende em primeiro plano até Ctrl+C (`python -m venda_app.api`, `cli serve`)."""
+    set_metrics_file(METRICS_DIR / "metrics_api.json")
+    server = make_server(host, port, db_path, workers=workers, readers=readers)
+    bound_host, bound_port = server.server_address[:2]
+    print(f"API em http://{bound_host}:{bound_port} (Ctrl+C para sair)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_server(server)
+
+
+__all__ = [
+    "API_SALE_STATUSES",
+    "ApiApp",
+    "ApiError",
+    "DEFAULT_HOST",
+    "DEFAULT_PORT",
+    "PooledHTTPServer",
+    "ROUTES",
+    "make_server",
+    "run",
+    "serve_in_thread",
+    "stop_server",
+]
@@ -0,0 +1 @@
+"""Pacote de benchmarks (gerador de dados sintéticos + medição de tempos)."""
@@ -0,0 +1,7 @@
+"""Permite `python -m venda_app.bench`."""
+
+import sys
+
+from .runner import main
+
+sys.exit(main())
@@ -0,0 +1,180 @@
+"""venda_app.bench.api_load
+
+Teste de carga da API HTTP local (api.server) sobre um único arquivo.
+
+Cria (ou reaproveita) o banco sintético da escala pedida, sobe o servidor
+em segundo plano numa porta livre e dispara `clients` threads com conexão
+keep-alive durante `seconds`, numa mistura de leituras e vendas:
+
+    consulta de SKU (GET /stock/<sku>)   --mix-read   (padrão 70%)
+    resumo do mês (GET /summary)         --mix-summary (padrão 10%)
+    venda (POST /sales, 1-2 itens)       restante
+
+Mostra requisições/s sustentadas e p50/p95 por rota.
+
+Uso:
+    python -m venda_app.bench.api_load --moves 10000 --clients 8 --seconds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..api.server import make_server, serve_in_thread, stop_server
+from ..db.database import get_connection
+from ..utils.logger import set_log_level
+from .runner import _percentile, bench_workdir, prepare_database
+
+
+def _client(port: int, skus: List[str], dates: List[str], mix: tuple, seed: int, stop: threading.Event, out: Dict):
+    mix_read, mix_summary = mix
+    rnd = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    while not stop.is_set():
+        roll = rnd.random()
+        if roll < mix_read:
+            route, method, path, body = "stock_sku", "GET", f"/stock/{rnd.choice(skus)}", None
+        elif roll < mix_read + mix_summary:
+            month = rnd.choice(dates)[:7]
+            route, method, path, body = "summary", "GET", f"/summary?from={month}-01&to={month}-31", None
+        else:
+            items = [
+                {"sku": rnd.choice(skus), "qty": 1, "unit_price": 10.0, "fees": 1.0, "discount": 0.0}
+                for _ in range(rnd.randint(1, 2))
+            ]
+            payload = {"sale_date": dates[-1], "channel": "LOAD", "items": items, "oversell_policy": "allow"}
+            route, method, path, body = "create_sale", "POST", "/sales", json.dumps(payload)
+
+        started = time.perf_counter()
+        try:
+            headers = {"Content-Type": "application/json"} if body else {}
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status < 400
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            ok = False
+        samples[route].append((time.perf_counter() - started) * 1000.0)
+        if not ok:
+            errors[route] += 1
+    conn.close()
+    out[seed] = (samples, errors)
+
+
+def run_load(
+    workdir: Path,
+    moves: int = 10_000,
+    clients: int = 8,
+    seconds: float = 10.0,
+    workers: int = 8,
+    readers: int = 4,
+    mix_read: float = 0.7,
+    mix_summary: float = 0.1,
+) -> Dict[str, Dict[str, float]]:
+    base = workdir / f"bench_{moves}.db"
+    prepare_database(base, moves)
+    db_path = workdir / f"api_load_{moves}.db"
+    db_path.write_bytes(base.read_bytes())
+
+    conn = get_connection(db_path)
+    skus = [r[0] for r in conn.execute("SELECT variant_sku FROM product_variants WHERE is_active = 1")]
+    dates = [r[0] for r in conn.execute("SELECT DISTINCT move_date FROM stock_moves ORDER BY move_date")]
+    conn.close()
+
+    server = make_server(port=0, db_path=db_path, workers=workers, readers=readers)
+    serve_in_thread(server)
+    port = server.server_address[1]
+
+    stop = threading.Event()
+    out: Dict[int, tuple] = {}
+    threads = [
+        threading.Thread(target=_client, args=(port, skus, dates, (mix_read, mix_summary), seed, stop, out), daemon=True)
+        for seed in range(clients)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop_server(server)
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+
+    merged: Dict[str, List[float]] = defaultdict(list)
+    failed: Dict[str, int] = defaultdict(int)
+    for samples, errors in out.values():
+        for route, values in samples.items():
+            merged[route].extend(values)
+        for route, n in errors.items():
+            failed[route] += n
+
+    results: Dict[str, Dict[str, float]] = {}
+    total = 0
+    for route, values in sorted(merged.items()):
+        values.sort()
+        total += len(values)
+        results[route] = {
+            "requests": len(values),
+            "rps": len(values) / elapsed,
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "errors": failed.get(route, 0),
+        }
+    results["_total"] = {"requests": total, "rps": total / elapsed, "seconds": elapsed}
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="venda_app.bench.api_load", description="Teste de carga da API HTTP local.")
+    parser.add_argument("--moves", type=int, default=10_000, help="escala do banco sintético")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--mix-read", type=float, default=0.7)
+    parser.add_argument("--mix-summary", type=float, default=0.1)
+    parser.add_argument("--workdir", type=Path, help="onde guardar o banco gerado (reaproveitado)")
+    args = parser.parse_args(argv)
+
+    set_log_level("WARNING")
+    with bench_workdir(args.workdir, "venda_api_load_") as workdir:
+        results = run_load(
+            workdir,
+            args.moves,
+            clients=args.clients,
+            seconds=args.seconds,
+            workers=args.workers,
+            readers=args.readers,
+            mix_read=args.mix_read,
+            mix_summary=args.mix_summary,
+        )
+        total = results.pop("_total")
+        print(f"{'rota':<14} {'reqs':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'erros':>6}")
+        for route, r in results.items():
+            print(
+                f"{route:<14} {r['requests']:8d} {r['rps']:9.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['errors']:6d}"
+            )
+        print(f"{'total':<14} {total['requests']:8d} {total['rps']:9.1f}   ({args.clients} clientes, {total['seconds']:.1f} s)")
+        return 1 if any(r["errors"] for r in results.values()) else 0
+
+
+__all__ = ["main", "run_load"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
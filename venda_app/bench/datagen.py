@@ -0,0 +1,155 @@
+"""venda_app.bench.datagen
+
+Gerador reprodutível de dados sintéticos para benchmarks.
+
+Gera categorias, produtos, variações, vendas (sales + sale_items + OUT
+VENDA) e movimentos avulsos (COMPRA, PERDA, AJUSTE) com `random.Random(seed)`,
+usando executemany e um único commit. Pensado para banco recém-criado
+(ids explícitos a partir de 1).
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict
+
+import sqlite3
+
+
+@dataclass
+class DataSpec:
+    categories: int = 10
+    products: int = 300
+    variants_per_product: int = 3
+    moves: int = 10_000
+    sales: int = 2_500
+    days: int = 730
+    start_date: str = "2024-01-01"
+    seed: int = 42
+
+
+def spec_for_scale(moves: int, seed: int = 42) -> DataSpec:
+    """Dimensiona o catálogo e as vendas proporcionalmente ao número de movimentos.
+
+    Cerca de metade dos movimentos vem de vendas (média de 2 itens por venda).
+    """
+    variants = max(30, min(moves // 20, 50_000))
+    products = max(10, variants // 3)
+    return DataSpec(
+        categories=max(5, min(products // 30, 60)),
+        products=products,
+        variants_per_product=3,
+        moves=moves,
+        sales=max(1, moves // 4),
+        seed=seed,
+    )
+
+
+def generate(conn: sqlite3.Connection, spec: DataSpec) -> Dict[str, int]:
+    """Popula o banco conforme `spec`. Retorna a contagem de linhas geradas."""
+    rnd = random.Random(spec.seed)
+    start = date.fromisoformat(spec.start_date)
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(spec.days)]
+
+    categories = [(i, "MATERIAIS" if i == 1 else f"CAT {i:03d}") for i in range(1, spec.categories + 1)]
+    conn.executemany("INSERT INTO categories (id, name) VALUES (?, ?)", categories)
+
+    products = []
+    variants = []
+    variant_cost: Dict[int, float] = {}
+    vid = 0
+    for pid in range(1, spec.products + 1):
+        cost = round(rnd.uniform(2, 80), 2)
+        price = round(cost * rnd.uniform(1.4, 2.5), 2)
+        products.append(
+            (pid, f"P{pid:06d}", f"Produto {pid:06d}", rnd.randint(1, spec.categories), "Cor", cost, price, rnd.randint(0, 20))
+        )
+        for k in range(spec.variants_per_product):
+            vid += 1
+            variants.append((vid, pid, f"P{pid:06d}-V{k + 1}", f"Cor {k + 1}", 0))
+            variant_cost[vid] = cost
+    conn.executemany(
+        """
+        INSERT INTO products (id, sku, name, category_id, variant_attribute_name, cost_default, price_default, stock_min)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        products,
+    )
+    conn.executemany(
+        "INSERT INTO product_variants (id, product_id, variant_sku, variant_value, is_default) VALUES (?, ?, ?, ?, ?)",
+        variants,
+    )
+    n_variants = vid
+
+    sales = []
+    items = []
+    moves = []
+    item_id = 0
+    for sid in range(1, spec.sales + 1):
+        day = rnd.choice(dates)
+        totals = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        for _ in range(rnd.choice((1, 2, 3))):
+            v = rnd.randint(1, n_variants)
+            qty = rnd.randint(1, 3)
+            unit_cost = variant_cost[v]
+            unit_price = round(unit_cost * 1.8, 2)
+            gross = qty * unit_price
+            fees = round(gross * 0.12, 2)
+            net = gross - fees
+            profit = net - qty * unit_cost
+            item_id += 1
+            items.append((item_id, sid, v, qty, unit_price, unit_cost, fees, 0.0, net, profit))
+            moves.append((day, v, "OUT", "VENDA", qty, unit_cost, "SALE", sid, ""))
+            for i, x in enumerate((gross, fees, 0.0, net, qty * unit_cost, profit)):
+                totals[i] += x
+        sales.append((sid, day, rnd.choice(("Shopee", "ML", "Presencial")), "CONCLUIDO", f"PED{sid:07d}", *totals))
+    conn.executemany(
+        """
+        INSERT INTO sales (id, sale_date, channel, status, order_ref,
+                           total_gross, total_fees, total_discount, total_net, total_cost, total_profit)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        sales,
+    )
+    conn.executemany(
+        """
+        INSERT INTO sale_items (id, sale_id, variant_id, qty, unit_price, unit_cost, fees, discount, net, profit)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        items,
+    )
+
+    for _ in range(max(0, spec.moves - len(moves))):
+        v = rnd.randint(1, n_variants)
+        kind = rnd.random()
+        if kind < 0.7:
+            moves.append((rnd.choice(dates), v, "IN", "COMPRA", rnd.randint(5, 50), variant_cost[v], "MANUAL", None, ""))
+        elif kind < 0.85:
+            moves.append((rnd.choice(dates), v, "OUT", "PERDA", rnd.randint(1, 3), variant_cost[v], "MANUAL", None, ""))
+        else:
+            moves.append((rnd.choice(dates), v, "ADJ", "AJUSTE", rnd.randint(-5, 5) or 1, 0.0, "MANUAL", None, ""))
+
+    # ordem cronológica, como no uso real
+    moves.sort(key=lambda m: m[0])
+    conn.executemany(
+        """
+        INSERT INTO stock_moves (move_date, variant_id, move_type, reason, qty, unit_cost, ref_type, ref_id, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        moves,
+    )
+    conn.commit()
+
+    return {
+        "categories": len(categories),
+        "products": len(products),
+        "variants": n_variants,
+        "sales": len(sales),
+        "sale_items": len(items),
+        "stock_moves": len(moves),
+    }
+
+
+__all__ = ["DataSpec", "spec_for_scale", "generate"]
@@ -0,0 +1,328 @@
+"""venda_app.bench.runner
+
+Harness de benchmark para repositórios e serviços.
+
+Para cada escala (número de movimentos), cria um banco novo em um
+diretório de trabalho, popula com `datagen.generate` e mede cada
+operação registrada em `BENCHMARKS`:
+
+- tempos p50/p95 (ms) com o profiling SQL desligado;
+- consultas por chamada, contadas em uma execução extra com o profiling
+  ligado (db.profiling);
+- baseline em JSON para comparação entre versões (`--save` / `--compare`).
+
+Uso:
+    python -m venda_app.bench --scales 1000 10000 --save baseline.json
+    python -m venda_app.bench --scales 1000 10000 --compare baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import sqlite3
+
+from ..db import profiling
+from ..db.database import get_connection, init_db
+from ..db.repositories import VariantRepository
+from ..services.inventory_service import (
+    count_products_below_min,
+    get_product_stock_levels,
+    get_stock_table_rows,
+    get_variant_stock_levels,
+)
+from ..services.replenishment_service import refresh_demand
+from ..services.reports_service import get_financial_summary
+from ..services.sales_service import create_sale, create_sale_resolved
+from ..services.snapshot_service import ensure_monthly_snapshots, get_stock_as_of
+from ..services.valuation_service import get_inventory_total_value, invalidate_valuation_cache
+from ..utils.logger import set_log_level
+from .datagen import generate, spec_for_scale
+
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Regressão quando p50 piora mais que isso em relação à baseline
+REGRESSION_THRESHOLD = 0.20
+
+
+@dataclass
+class BenchContext:
+    conn: sqlite3.Connection
+    rnd: random.Random
+    skus: List[str]
+    dates: List[str]
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def _bench_create_sale(ctx: BenchContext) -> Callable[[], Any]:
+    def run():
+        items = [
+            {"sku": ctx.rnd.choice(ctx.skus), "qty": 1, "unit_price": 10.0, "fees": 1.0, "discount": 0.0}
+            for _ in range(2)
+        ]
+        return create_sale(ctx.conn, ctx.dates[-1], "ML", "A_ENVIAR", "BENCH", "", "", items, oversell_policy="allow")
+
+    return run
+
+
+def _bench_create_sale_resolved(ctx: BenchContext) -> Callable[[], Any]:
+    # itens já resolvidos (como vêm do autocomplete): sem busca por SKU
+    resolved = {
+        r[0]: (int(r[1]), float(r[2]))
+        for r in ctx.conn.execute(
+            """
+            SELECT v.variant_sku, v.id, COALESCE(v.cost_override, p.cost_default)
+              FROM product_variants v
+              JOIN products p ON p.id = v.product_id
+            """
+        )
+    }
+
+    def run():
+        lines = []
+        for _ in range(2):
+            sku = ctx.rnd.choice(ctx.skus)
+            variant_id, unit_cost = resolved[sku]
+            lines.append(
+                {
+                    "variant_id": variant_id,
+                    "sku": sku,
+                    "qty": 1,
+                    "unit_price": 10.0,
+                    "unit_cost": unit_cost,
+                    "fees": 1.0,
+                    "discount": 0.0,
+                }
+            )
+        return create_sale_resolved(
+            ctx.conn, ctx.dates[-1], "ML", "A_ENVIAR", "BENCH", "", "", lines, oversell_policy="allow"
+        )
+
+    return run
+
+
+def _bench_search_variants(ctx: BenchContext) -> Callable[[], Any]:
+    def run():
+        sku = ctx.rnd.choice(ctx.skus)
+        return VariantRepository.search_variants(ctx.conn, sku[:5])
+
+    return run
+
+
+def _bench_get_variant_by_sku(ctx: BenchContext) -> Callable[[], Any]:
+    return lambda: VariantRepository.get_variant_by_sku(ctx.conn, ctx.rnd.choice(ctx.skus))
+
+
+def _bench_financial_summary(ctx: BenchContext) -> Callable[[], Any]:
+    def run():
+        month = ctx.rnd.choice(ctx.dates)[:7]
+        return get_financial_summary(ctx.conn, f"{month}-01", f"{month}-31")
+
+    return run
+
+
+def _bench_inventory_value(ctx: BenchContext) -> Callable[[], Any]:
+    def run():
+        invalidate_valuation_cache()
+        return get_inventory_total_value(ctx.conn)
+
+    return run
+
+
+def _bench_stock_as_of(ctx: BenchContext) -> Callable[[], Any]:
+    # checkpoints são um passo explícito (cli rebuild); a consulta só lê
+    ensure_monthly_snapshots(ctx.conn)
+    return lambda: get_stock_as_of(ctx.conn, ctx.rnd.choice(ctx.dates))
+
+
+BENCHMARKS: Dict[str, Callable[[BenchContext], Callable[[], Any]]] = {
+    "create_sale": _bench_create_sale,
+    "create_sale_resolved": _bench_create_sale_resolved,
+    "search_variants": _bench_search_variants,
+    "get_variant_by_sku": _bench_get_variant_by_sku,
+    "list_all_variants": lambda ctx: (lambda: VariantRepository.list_all_variants(ctx.conn)),
+    "get_variant_columns": lambda ctx: (lambda: VariantRepository.get_variant_columns(ctx.conn)),
+    "get_stock_table_rows": lambda ctx: (lambda: get_stock_table_rows(ctx.conn)),
+    "get_variant_stock_levels": lambda ctx: (lambda: get_variant_stock_levels(ctx.conn)),
+    "get_product_stock_levels": lambda ctx: (lambda: get_product_stock_levels(ctx.conn)),
+    "count_products_below_min": lambda ctx: (lambda: count_products_below_min(ctx.conn)),
+    "get_financial_summary": _bench_financial_summary,
+    "get_inventory_total_value": _bench_inventory_value,
+    "get_stock_as_of": _bench_stock_as_of,
+    "refresh_demand": lambda ctx: (lambda: refresh_demand(ctx.conn)),
+}
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def measure(fn: Callable[[], Any], repeat: int = 30, budget_s: float = 3.0) -> Dict[str, float]:
+    """Executa `fn` até `repeat` vezes (mínimo 3, limitado por `budget_s`)."""
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < repeat:
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        if len(samples) >= 3 and time.perf_counter() - started > budget_s:
+            break
+
+    profiling.reset_query_stats()
+    profiling.enable_profiling()
+    try:
+        fn()
+    finally:
+        profiling.disable_profiling()
+    queries = sum(r["calls"] for r in profiling.get_query_stats())
+
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "p50_ms": _percentile(samples, 50),
+        "p95_ms": _percentile(samples, 95),
+        "queries": queries,
+    }
+
+
+def prepare_database(path: Path, moves: int, seed: int = 42) -> Dict[str, int]:
+    """Cria (ou reaproveita) o banco sintético de uma escala."""
+    marker = path.with_suffix(".json")
+    if path.exists() and marker.exists():
+        return json.loads(marker.read_text(encoding="utf-8"))
+    if path.exists():
+        path.unlink()
+    init_db(db_path=path)
+    conn = get_connection(path)
+    try:
+        counts = generate(conn, spec_for_scale(moves, seed=seed))
+    finally:
+        conn.close()
+    marker.write_text(json.dumps(counts), encoding="utf-8")
+    return counts
+
+
+def run_scale(
+    workdir: Path,
+    moves: int,
+    names: Optional[List[str]] = None,
+    repeat: int = 30,
+    seed: int = 42,
+) -> Dict[str, Dict[str, float]]:
+    db_path = workdir / f"bench_{moves}.db"
+    t0 = time.perf_counter()
+    counts = prepare_database(db_path, moves, seed=seed)
+    setup_s = time.perf_counter() - t0
+
+    # cópia descartável: create_sale e checkpoints alteram o banco
+    run_path = workdir / f"bench_{moves}_run.db"
+    run_path.write_bytes(db_path.read_bytes())
+    conn = get_connection(run_path)
+    try:
+        skus = [r[0] for r in conn.execute("SELECT variant_sku FROM product_variants")]
+        dates = [r[0] for r in conn.execute("SELECT DISTINCT move_date FROM stock_moves ORDER BY move_date")]
+        ctx = BenchContext(conn=conn, rnd=random.Random(seed), skus=skus, dates=dates, counts=counts)
+
+        results: Dict[str, Dict[str, float]] = {}
+        for name, factory in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            results[name] = measure(factory(ctx), repeat=repeat)
+        results["_setup"] = {"seconds": setup_s, **counts}
+        return results
+    finally:
+        conn.close()
+        run_path.unlink(missing_ok=True)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Retorna linhas de relatório com a variação de p50 em relação à baseline."""
+    lines: List[str] = []
+    for scale, results in current.items():
+        base_scale = baseline.get(scale, {})
+        for name, r in results.items():
+            if name.startswith("_") or name not in base_scale:
+                continue
+            before = float(base_scale[name]["p50_ms"])
+            after = float(r["p50_ms"])
+            delta = (after - before) / before if before > 0 else 0.0
+            flag = "REGRESSÃO" if delta > threshold else ("melhora" if delta < -threshold else "")
+            lines.append(f"{scale:>9} {name:<28} {before:10.3f} -> {after:10.3f} ms ({delta:+.0%}) {flag}".rstrip())
+    return lines
+
+
+def format_results(all_results: Dict[str, Dict[str, Dict[str, float]]]) -> List[str]:
+    lines = [f"{'moves':>9} {'benchmark':<28} {'p50 ms':>10} {'p95 ms':>10} {'queries':>8} {'runs':>5}"]
+    for scale, results in all_results.items():
+        for name, r in results.items():
+            if name.startswith("_"):
+                continue
+            lines.append(
+                f"{scale:>9} {name:<28} {r['p50_ms']:10.3f} {r['p95_ms']:10.3f} {r['queries']:8d} {r['runs']:5d}"
+            )
+    return lines
+
+
+@contextmanager
+def bench_workdir(path: Optional[Path], prefix: str) -> Iterator[Path]:
+    """`--workdir` informado (mantido, bancos reaproveitados) ou diretório temporário apagado no fim."""
+    if path is not None:
+        path.mkdir(parents=True, exist_ok=True)
+        yield path
+        return
+    with tempfile.TemporaryDirectory(prefix=prefix) as tmp:
+        yield Path(tmp)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="venda_app.bench", description="Benchmarks de repositórios e serviços.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="número de movimentos por escala")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="roda só estes benchmarks")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", type=Path, help="onde guardar os bancos gerados (reaproveitados entre execuções)")
+    parser.add_argument("--save", type=Path, help="grava os resultados como baseline (JSON)")
+    parser.add_argument("--compare", type=Path, help="compara com uma baseline (JSON)")
+    args = parser.parse_args(argv)
+
+    # logs por operação (ex: create_sale) poluiriam a saída e as medições
+    set_log_level("WARNING")
+
+    with bench_workdir(args.workdir, "venda_bench_") as workdir:
+        all_results: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for moves in args.scales:
+            print(f"# escala {moves} movimentos (banco em {workdir})", flush=True)
+            all_results[str(moves)] = run_scale(workdir, moves, names=args.only, repeat=args.repeat, seed=args.seed)
+            for line in format_results({str(moves): all_results[str(moves)]})[1:]:
+                print(line, flush=True)
+
+        print()
+        print("\n".join(format_results(all_results)))
+
+        if args.save:
+            args.save.write_text(json.dumps(all_results, indent=2), encoding="utf-8")
+            print(f"\nBaseline gravada em {args.save}")
+
+        regressions = 0
+        if args.compare:
+            baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+            print("\nComparação com a baseline (p50):")
+            for line in compare(all_results, baseline):
+                print(line)
+                regressions += line.endswith("REGRESSÃO")
+        return 1 if regressions else 0
+
+
+__all__ = ["BENCHMARKS", "DEFAULT_SCALES", "bench_workdir", "compare", "main", "measure", "run_scale"]
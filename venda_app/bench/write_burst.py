@@ -0,0 +1,169 @@
+"""venda_app.bench.write_burst
+
+Rajada de vendas vindas de várias fontes ao mesmo tempo (sincronização de
+marketplace, várias estações), comparando três jeitos de gravar:
+
+    conexoes  cada fonte com sua conexão e create_sale (um commit por venda,
+              disputando o lock de escrita via busy_timeout)
+    fila      WriteQueue.submit: escritor único, um commit por venda
+    grupo     WriteQueue.submit_grouped: escritor único com group commit
+              (SAVEPOINT por venda, um COMMIT por grupo)
+
+Uma venda a cada `--bad-every` usa um SKU inexistente: ela deve falhar
+sozinha, sem derrubar as outras do mesmo grupo. Ao final confere se o
+número de vendas gravadas bate com os sucessos.
+
+Uso:
+    python -m venda_app.bench.write_burst --sources 8 --sales 250
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..db.database import get_connection
+from ..db.pool import BUSY_TIMEOUT_MS, WriteQueue
+from ..services.sales_service import create_sale
+from ..utils.logger import set_log_level
+from .runner import _percentile, bench_workdir, prepare_database
+
+
+MODES = ("conexoes", "fila", "grupo")
+
+
+def _sale(skus: List[str], source: int, n: int, bad_every: int) -> Dict[str, Any]:
+    sku = "NAO-EXISTE" if bad_every and (source * 7919 + n) % bad_every == 0 else skus[(source * 31 + n) % len(skus)]
+    return {
+        "sale_date": "2099-01-01",
+        "channel": f"BURST{source}",
+        "status": "A_ENVIAR",
+        "order_ref": f"b{source}-{n}",
+        "customer_name": "",
+        "notes": "",
+        "items": [{"sku": sku, "qty": 1, "unit_price": 10.0, "fees": 1.0, "discount": 0.0}],
+        "oversell_policy": "allow",
+    }
+
+
+def _source_direct(db_path: Path, sales: List[Dict[str, Any]], out: List) -> None:
+    conn = get_connection(db_path)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    for sale in sales:
+        started = time.perf_counter()
+        try:
+            create_sale(conn, **sale)
+            ok = True
+        except ValueError:
+            ok = False
+        out.append(((time.perf_counter() - started) * 1000.0, ok))
+    conn.close()
+
+
+def _source_queue(writer: WriteQueue, grouped: bool, sales: List[Dict[str, Any]], out: List) -> None:
+    submit = writer.submit_grouped if grouped else writer.submit
+    pending: List[tuple] = []
+    for sale in sales:
+        pending.append((time.perf_counter(), submit(create_sale, **sale)))
+    for started, future in pending:
+        ok = _wait(future)
+        out.append(((time.perf_counter() - started) * 1000.0, ok))
+
+
+def _wait(future: "Future[Any]") -> bool:
+    try:
+        future.result()
+        return True
+    except ValueError:
+        return False
+
+
+def run_burst(
+    db_path: Path,
+    mode: str,
+    sources: int = 8,
+    sales: int = 250,
+    bad_every: int = 50,
+) -> Dict[str, float]:
+    conn = get_connection(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")  # mesmo modo nos três casos
+    skus = [r[0] for r in conn.execute("SELECT variant_sku FROM product_variants WHERE is_active = 1")]
+    before = conn.execute("SELECT COUNT(1) FROM sales").fetchone()[0]
+    conn.close()
+
+    writer = WriteQueue(db_path) if mode != "conexoes" else None
+    results: List[List] = [[] for _ in range(sources)]
+    threads = []
+    for s in range(sources):
+        batch = [_sale(skus, s, n, bad_every) for n in range(sales)]
+        if writer is None:
+            target, args = _source_direct, (db_path, batch, results[s])
+        else:
+            target, args = _source_queue, (writer, mode == "grupo", batch, results[s])
+        threads.append(threading.Thread(target=target, args=args))
+
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    if writer is not None:
+        writer.close()
+
+    conn = get_connection(db_path)
+    written = conn.execute("SELECT COUNT(1) FROM sales").fetchone()[0] - before
+    conn.close()
+
+    samples = sorted(ms for r in results for ms, _ in r)
+    succeeded = sum(1 for r in results for _, ok in r if ok)
+    return {
+        "sales": len(samples),
+        "per_s": len(samples) / elapsed,
+        "p50_ms": _percentile(samples, 50),
+        "p95_ms": _percentile(samples, 95),
+        "failed": len(samples) - succeeded,
+        "consistent": written == succeeded,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="venda_app.bench.write_burst", description="Rajada de vendas: commit por venda x group commit.")
+    parser.add_argument("--moves", type=int, default=10_000, help="escala do banco sintético")
+    parser.add_argument("--sources", type=int, default=8, help="fontes (threads) gravando ao mesmo tempo")
+    parser.add_argument("--sales", type=int, default=250, help="vendas por fonte")
+    parser.add_argument("--bad-every", type=int, default=50, help="1 venda inválida a cada N (0 = nenhuma)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--workdir", type=Path, help="onde guardar o banco gerado (reaproveitado)")
+    args = parser.parse_args(argv)
+
+    set_log_level("WARNING")
+    with bench_workdir(args.workdir, "venda_write_burst_") as workdir:
+        base = workdir / f"bench_{args.moves}.db"
+        prepare_database(base, args.moves)
+
+        print(f"{'modo':<10} {'vendas':>7} {'vendas/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'falhas':>7}  ok")
+        consistent = True
+        for mode in args.modes:
+            db_path = workdir / f"burst_{mode}.db"
+            db_path.write_bytes(base.read_bytes())
+            r = run_burst(db_path, mode, args.sources, args.sales, args.bad_every)
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+            consistent = consistent and r["consistent"]
+            print(
+                f"{mode:<10} {r['sales']:7d} {r['per_s']:9.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} "
+                f"{r['failed']:7d}  {'sim' if r['consistent'] else 'NÃO'}"
+            )
+        return 0 if consistent else 1
+
+
+__all__ = ["MODES", "main", "run_burst"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,495 @@
+"""venda_app.cli
+
+Linha de comando sem interface gráfica (scripts, cron, manutenção).
+
+Uso:
+    python -m venda_app.cli [--db ARQ] <comando> [opções]
+
+Comandos:
+    summary   resumo financeiro (DRE simples) de um período
+    stock     estoque por variação (físico / reservado / disponível)
+    export    exporta uma tabela em CSV
+    import    importa movimentos de estoque ou gastos de um CSV
+    rebuild   recalcula tabelas materializadas (saldos, histórico, demanda, checkpoints)
+    vacuum    compacta o banco (VACUUM + PRAGMA optimize)
+    archive   move vendas/movimentos até uma data para archive_YYYY.db
+    compact   resume os movimentos até uma data em saldos iniciais (SALDO_INICIAL)
+    bench     benchmarks (mesmas opções de `python -m venda_app.bench`)
+    serve     API HTTP local (ver venda_app.api)
+
+Só importa `db`/`services` (nunca customtkinter), e cada comando importa
+apenas o que usa, para a partida ficar bem abaixo de 100 ms. Listagens e
+exportações são escritas em stdout linha a linha (fetchmany), sem montar
+o resultado inteiro em memória.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+
+# tabela -> (colunas, coluna de data para --from/--to)
+EXPORT_TABLES = {
+    "categories": ("id, name, is_active, created_at", None),
+    "products": (
+        "id, sku, name, category_id, variant_attribute_name, brand, cost_default, price_default, "
+        "stock_min, is_active, created_at, updated_at",
+        None,
+    ),
+    "variants": (
+        "id, product_id, variant_sku, variant_value, is_default, cost_override, price_override, "
+        "is_active, created_at, updated_at",
+        None,
+    ),
+    "sales": (
+        "id, sale_date, channel, status, order_ref, customer_name, notes, packaging_enabled, "
+        "packaging_volumes, packaging_box_variant_id, packaging_env_variant_id, total_gross, "
+        "total_fees, total_discount, total_net, total_cost, total_profit, created_at",
+        "sale_date",
+    ),
+    "sale_items": ("id, sale_id, variant_id, qty, unit_price, unit_cost, fees, discount, net, profit", None),
+    "stock_moves": (
+        "id, move_date, variant_id, move_type, reason, qty, unit_cost, ref_type, ref_id, notes, created_at",
+        "move_date",
+    ),
+    "expenses": ("id, exp_date, category, description, amount, payment_method, notes, created_at", "exp_date"),
+}
+
+_TABLE_NAMES = {"variants": "product_variants"}
+
+_FETCH_CHUNK = 1000
+
+
+def _open(args: argparse.Namespace):
+    from .db.database import get_connection, init_db
+
+    init_db(db_path=args.db)
+    return get_connection(args.db)
+
+
+def _write_rows(header: Sequence[str], rows: Iterable[Sequence], out=None) -> int:
+    writer = csv.writer(out or sys.stdout, lineterminator="\n")
+    writer.writerow(header)
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+    return n
+
+
+def _fetch_iter(cur):
+    while True:
+        rows = cur.fetchmany(_FETCH_CHUNK)
+        if not rows:
+            return
+        yield from rows
+
+
+# =========================
+# COMANDOS
+# =========================
+
+
+def cmd_summary(args: argparse.Namespace) -> int:
+    from .services.reports_service import get_financial_summary
+
+    today = date.today()
+    date_from = args.date_from or today.replace(day=1).isoformat()
+    date_to = args.date_to or today.isoformat()
+
+    conn = _open(args)
+    try:
+        summary = get_financial_summary(conn, date_from, date_to)
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps({"from": date_from, "to": date_to, **summary}, ensure_ascii=False))
+    else:
+        print(f"período: {date_from} a {date_to}")
+        for key, value in summary.items():
+            print(f"{key:<10} {value:14.2f}")
+    return 0
+
+
+def cmd_stock(args: argparse.Namespace) -> int:
+    from .services.inventory_service import iter_stock_table_rows, list_products_below_min
+
+    conn = _open(args)
+    try:
+        if args.below_min:
+            rows = list_products_below_min(conn)
+            header = ["product_sku", "product_name", "category_name", "stock", "stock_min", "missing"]
+            _write_rows(header, ([r[k] for k in header] for r in rows))
+            return 0
+
+        header = ["variant_sku", "product_sku", "product_name", "variant_value", "on_hand", "reserved", "stock"]
+        rows = iter_stock_table_rows(conn, chunk=_FETCH_CHUNK)
+        if not args.all:
+            rows = (r for r in rows if r["variant_active"] and r["product_active"])
+        _write_rows(header, ([r[k] for k in header] for r in rows))
+    finally:
+        conn.close()
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from .db.database import tuple_cursor
+
+    columns, date_col = EXPORT_TABLES[args.table]
+    where, params = [], []
+    if date_col and args.date_from:
+        where.append(f"{date_col} >= ?")
+        params.append(args.date_from)
+    if date_col and args.date_to:
+        where.append(f"{date_col} <= ?")
+        params.append(args.date_to)
+    if not date_col and (args.date_from or args.date_to):
+        print(f"aviso: {args.table} não tem coluna de data; --from/--to ignorados", file=sys.stderr)
+
+    sql = f"SELECT {columns} FROM {_TABLE_NAMES.get(args.table, args.table)}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id"
+
+    conn = _open(args)
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else None
+    try:
+        cur = tuple_cursor(conn)
+        cur.execute(sql, params)
+        n = _write_rows([d[0] for d in cur.description], _fetch_iter(cur), out)
+    finally:
+        if out is not None:
+            out.close()
+        conn.close()
+    if args.out:
+        print(f"{n} linhas exportadas para {args.out}", file=sys.stderr)
+    return 0
+
+
+def _read_csv(path: Path) -> List[dict]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return [{(k or "").strip(): (v or "").strip() for k, v in row.items()} for row in csv.DictReader(f)]
+
+
+def _import_moves(conn, rows: List[dict]) -> tuple:
+    """Colunas: move_date, variant_sku, move_type, reason, qty, unit_cost (opcional), notes (opcional)."""
+    from .db.repositories import VariantRepository
+    from .utils.validators import parse_flexible_date
+
+    index = VariantRepository.get_sku_index(conn)
+    params, errors = [], []
+    for line, r in enumerate(rows, start=2):
+        try:
+            entry = index.get(r.get("variant_sku", ""))
+            if entry is None:
+                raise ValueError(f"SKU não encontrado: {r.get('variant_sku', '')!r}")
+            move_type = r.get("move_type", "").upper()
+            if move_type not in ("IN", "OUT", "ADJ"):
+                raise ValueError(f"move_type inválido: {move_type!r}")
+            qty = int(r.get("qty", ""))
+            if qty == 0 or (qty < 0 and move_type != "ADJ"):
+                raise ValueError("qty deve ser positiva (negativa só em ADJ)")
+            params.append(
+                (
+                    parse_flexible_date(r.get("move_date", "")),
+                    int(entry.variant_id),
+                    move_type,
+                    (r.get("reason") or "IMPORTACAO").upper(),
+                    qty,
+                    float(r.get("unit_cost") or 0),
+                    r.get("notes", ""),
+                )
+            )
+        except ValueError as e:
+            errors.append(f"linha {line}: {e}")
+
+    sql = """
+        INSERT INTO stock_moves (move_date, variant_id, move_type, reason, qty, unit_cost, ref_type, ref_id, notes)
+        VALUES (?, ?, ?, ?, ?, ?, 'IMPORT', NULL, ?)
+    """
+    return sql, params, errors, _apply_import_purchase_costs
+
+
+def _apply_import_purchase_costs(conn, params: List[tuple]) -> None:
+    """Como na tela de Movimentações: cada IN COMPRA atualiza o custo do produto/variação (na ordem do arquivo)."""
+    from .db.repositories import ProductRepository
+
+    for _date, variant_id, move_type, reason, _qty, unit_cost, _notes in params:
+        if move_type == "IN" and reason == "COMPRA":
+            ProductRepository.apply_purchase_cost_from_variant(conn, variant_id, unit_cost, commit=False)
+
+
+def _import_expenses(conn, rows: List[dict]) -> tuple:
+    """Colunas: exp_date, category, description, amount, payment_method (opcional), notes (opcional)."""
+    from .utils.validators import parse_flexible_date
+
+    params, errors = [], []
+    for line, r in enumerate(rows, start=2):
+        try:
+            if not r.get("category") or not r.get("description"):
+                raise ValueError("category e description são obrigatórios")
+            amount = float((r.get("amount") or "").replace(",", "."))
+            if amount < 0:
+                raise ValueError("amount não pode ser negativo")
+            params.append(
+                (
+                    parse_flexible_date(r.get("exp_date", "")),
+                    r["category"],
+                    r["description"],
+                    amount,
+                    r.get("payment_method", ""),
+                    r.get("notes", ""),
+                )
+            )
+        except ValueError as e:
+            errors.append(f"linha {line}: {e}")
+
+    sql = """
+        INSERT INTO expenses (exp_date, category, description, amount, payment_method, notes)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+    return sql, params, errors, None
+
+
+_IMPORTERS = {"moves": _import_moves, "expenses": _import_expenses}
+
+
+def cmd_import(args: argparse.Namespace) -> int:
+    from .db import cache
+
+    rows = _read_csv(args.file)
+    conn = _open(args)
+    try:
+        sql, params, errors, after = _IMPORTERS[args.kind](conn, rows)
+        for err in errors:
+            print(err, file=sys.stderr)
+        if errors:
+            print(f"{len(errors)} linha(s) com erro; nada foi importado", file=sys.stderr)
+            return 1
+        if args.dry_run:
+            print(f"{len(params)} linha(s) válidas (dry-run, nada gravado)")
+            return 0
+        try:
+            conn.executemany(sql, params)
+            if after is not None:
+                after(conn, params)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cache.invalidate()
+        print(f"{len(params)} linha(s) importadas")
+    finally:
+        conn.close()
+    return 0
+
+
+REBUILD_TARGETS = ["balances", "history", "demand", "checkpoints"]
+
+
+def cmd_rebuild(args: argparse.Namespace) -> int:
+    from .db import cache
+    from .db.repositories import StockBalanceRepository, VariantRepository
+    from .services.replenishment_service import refresh_demand
+    from .services.snapshot_service import ensure_monthly_snapshots
+
+    targets = args.only or REBUILD_TARGETS
+    conn = _open(args)
+    try:
+        if "balances" in targets:
+            StockBalanceRepository.rebuild_balances(conn)
+            print("saldos e reservas recalculados", flush=True)
+        if "history" in targets:
+            VariantRepository.rebuild_history_flags(conn)
+            print("flags de histórico recalculadas", flush=True)
+        if "demand" in targets:
+            n = refresh_demand(conn, full=True)
+            print(f"demanda recalculada ({n} movimentos)", flush=True)
+        if "checkpoints" in targets:
+            created = ensure_monthly_snapshots(conn)
+            print(f"checkpoints mensais criados: {len(created)}", flush=True)
+        cache.invalidate()
+    finally:
+        conn.close()
+    return 0
+
+
+def cmd_vacuum(args: argparse.Namespace) -> int:
+    from .db.database import DB_PATH
+
+    path = Path(args.db or DB_PATH)
+    before = path.stat().st_size if path.exists() else 0
+    conn = _open(args)
+    try:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    after = path.stat().st_size
+    print(f"{path}: {before / 1024:.0f} KB -> {after / 1024:.0f} KB")
+    return 0
+
+
+def cmd_archive(args: argparse.Namespace) -> int:
+    from .db import cache
+    from .services.archive_service import archive_period, get_archive_cutoff, list_archives
+
+    conn = _open(args)
+    try:
+        if args.until is None:
+            print(f"arquivado até: {get_archive_cutoff(conn) or '-'}")
+            for year, path in list_archives(conn).items():
+                print(f"{year}\t{path}\t{path.stat().st_size / 1024:.0f} KB")
+            return 0
+        r = archive_period(conn, args.until, dry_run=args.dry_run)
+        cache.invalidate()
+    finally:
+        conn.close()
+    prefix = "arquivaria" if args.dry_run else "arquivado"
+    print(
+        f"{prefix} até {r['cutoff']}: {r['sales']} vendas, {r['sale_items']} itens, "
+        f"{r['stock_moves']} movimentos (anos {', '.join(map(str, r['years'])) or '-'}); "
+        f"{r['openings']} saldos iniciais"
+    )
+    if not args.dry_run:
+        print("rode `vacuum` para devolver o espaço ao disco")
+    return 0
+
+
+def cmd_compact(args: argparse.Namespace) -> int:
+    from .db import cache
+    from .services.archive_service import compact_ledger
+
+    conn = _open(args)
+    try:
+        r = compact_ledger(conn, args.until, keep_detail=not args.drop_detail, dry_run=args.dry_run)
+        cache.invalidate()
+    finally:
+        conn.close()
+    prefix = "compactaria" if args.dry_run else "compactado"
+    files = ", ".join(f"archive_{year}.db" for year in r["years"]) or "-"
+    where = f"detalhe em {files}" if r["kept_detail"] else "detalhe descartado"
+    print(
+        f"{prefix} até {r['cutoff']}: {r['stock_moves']} movimentos de {r['variants']} variações "
+        f"-> {r['openings']} saldos iniciais ({where})"
+    )
+    if not args.dry_run:
+        print("saldos conferidos (get_variant_stock_levels igual antes/depois); rode `vacuum` para devolver o espaço")
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    from .bench.runner import main as bench_main
+
+    return bench_main(args.bench_args)
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    from .api.server import run
+
+    options = {k: getattr(args, k) for k in ("host", "port", "workers", "readers") if getattr(args, k) is not None}
+    run(db_path=args.db, **options)
+    return 0
+
+
+# =========================
+# ENTRADA
+# =========================
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="venda_app.cli", description="Relatórios, importação e manutenção sem interface.")
+    parser.add_argument("--db", type=Path, help="arquivo do banco (padrão: db/app.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("summary", help="resumo financeiro do período (padrão: mês atual)")
+    p.add_argument("--from", dest="date_from", help="data inicial YYYY-MM-DD")
+    p.add_argument("--to", dest="date_to", help="data final YYYY-MM-DD")
+    p.add_argument("--json", action="store_true", help="saída em JSON")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("stock", help="estoque por variação em CSV")
+    p.add_argument("--all", action="store_true", help="inclui produtos/variações inativos")
+    p.add_argument("--below-min", action="store_true", help="só produtos abaixo do mínimo")
+    p.set_defaults(func=cmd_stock)
+
+    p = sub.add_parser("export", help="exporta uma tabela em CSV")
+    p.add_argument("table", choices=sorted(EXPORT_TABLES))
+    p.add_argument("--from", dest="date_from", help="data inicial (tabelas com data)")
+    p.add_argument("--to", dest="date_to", help="data final (tabelas com data)")
+    p.add_argument("--out", type=Path, help="arquivo de saída (padrão: stdout)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="importa CSV (tudo ou nada)")
+    p.add_argument("kind", choices=sorted(_IMPORTERS))
+    p.add_argument("file", type=Path)
+    p.add_argument("--dry-run", action="store_true", help="só valida")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("rebuild", help="recalcula tabelas materializadas")
+    p.add_argument("--only", nargs="+", choices=REBUILD_TARGETS)
+    p.set_defaults(func=cmd_rebuild)
+
+    p = sub.add_parser("vacuum", help="compacta o banco")
+    p.set_defaults(func=cmd_vacuum)
+
+    p = sub.add_parser("archive", help="arquiva período fechado (sem --until: lista os arquivos)")
+    p.add_argument("--until", help="último dia arquivado YYYY-MM-DD (inclusive)")
+    p.add_argument("--dry-run", action="store_true", help="só conta o que sairia")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("compact", help="resume o razão até uma data em saldos iniciais")
+    p.add_argument("--until", required=True, help="último dia compactado YYYY-MM-DD (inclusive)")
+    p.add_argument("--drop-detail", action="store_true", help="não guarda os movimentos em archive_YYYY.db (recusado se houver compras no período)")
+    p.add_argument("--dry-run", action="store_true", help="só conta o que sairia")
+    p.set_defaults(func=cmd_compact)
+
+    # opções desconhecidas vão direto para o runner (ver main)
+    p = sub.add_parser("bench", help="benchmarks (repassa as opções)", add_help=False)
+    p.set_defaults(func=cmd_bench)
+
+    # padrões ficam em api.server (importado só pelo comando)
+    p = sub.add_parser("serve", help="API HTTP local (JSON)")
+    p.add_argument("--host", help="padrão 127.0.0.1")
+    p.add_argument("--port", type=int, help="padrão 8765 (VENDA_APP_API_PORT)")
+    p.add_argument("--workers", type=int, help="threads que atendem requisições (padrão 8)")
+    p.add_argument("--readers", type=int, help="conexões de leitura (padrão 4)")
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .utils.metrics import METRICS_DIR, set_metrics_file
+
+    set_metrics_file(METRICS_DIR / "metrics_cli.json")  # não sobrescreve o da interface
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"argumentos não reconhecidos: {' '.join(extra)}")
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # ex: `... stock | head`
+        sys.stderr.close()
+        return 0
+    except (ValueError, OSError) as e:
+        print(f"erro: {e}", file=sys.stderr)
+        return 1
+
+
+__all__ = ["EXPORT_TABLES", "build_parser", "main"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
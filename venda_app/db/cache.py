@@ -0,0 +1,208 @@
+"""venda_app.db.cache
+
+Cache de leitura (LRU) para consultas de cadastro muito repetidas
+(categorias, produto por id, variação por SKU).
+
+Regras:
+  - Um conjunto de caches por conexão (WeakKeyDictionary), para que bancos
+    diferentes (ex: benchmarks) não se misturem. Conexões que não aceitam
+    weakref (sqlite3.Connection puro) simplesmente não usam cache.
+  - Cada cache tem nome e tamanho máximo; ao estourar, sai o item usado
+    há mais tempo.
+  - Os métodos de escrita dos repositórios chamam `invalidate(...)`, que
+    limpa o cache com aquele nome em TODAS as conexões (o dado mudou no
+    banco, não só na conexão que escreveu).
+  - Quem escreve direto via SQL em products/product_variants/categories
+    deve chamar `invalidate()` (sem nomes = tudo).
+  - Gravações de OUTRAS conexões (outro processo usando o mesmo app.db, a
+    WriteQueue da API) não passam por `invalidate()`: cada conexão guarda
+    o `PRAGMA data_version` e esvazia seus caches quando ele muda. Para o
+    acerto continuar custando só um acesso a dicionário, a versão é
+    consultada no máximo a cada VENDA_APP_CACHE_RECHECK_MS (padrão 250 ms);
+    quem precisa do cadastro exato confere no banco sob a trava de escrita
+    (ex: create_sale_resolved).
+  - Resultados "não encontrado" (None) também ficam em cache. Um valor
+    carregado enquanto o cache era limpo (outra thread) não é guardado.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List
+
+import sqlite3
+
+
+DEFAULT_MAXSIZE = int(os.environ.get("VENDA_APP_CACHE_SIZE", "2048"))
+RECHECK_S = int(os.environ.get("VENDA_APP_CACHE_RECHECK_MS", "250")) / 1000.0
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Dicionário com tamanho máximo (LRU) e contadores de acerto/erro."""
+
+    __slots__ = ("name", "maxsize", "_data", "hits", "misses", "invalidations")
+
+    def __init__(self, name: str, maxsize: int = DEFAULT_MAXSIZE):
+        self.name = name
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            # limpo por invalidate() de outra thread (db.pool) entre as duas linhas
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        if self._data:
+            self._data.clear()
+        self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _ConnCaches:
+    """Caches de uma conexão, o `data_version` em que foram preenchidos e quando ele foi conferido."""
+
+    __slots__ = ("data_version", "checked_at", "caches")
+
+    def __init__(self) -> None:
+        self.data_version: Any = None
+        self.checked_at = float("-inf")
+        self.caches: Dict[str, LRUCache] = {}
+
+
+_lock = threading.Lock()
+_enabled = os.environ.get("VENDA_APP_CACHE", "1") not in ("", "0")
+# conexão -> caches da conexão
+_caches: "weakref.WeakKeyDictionary[sqlite3.Connection, _ConnCaches]" = weakref.WeakKeyDictionary()
+
+
+def _sync_data_version(conn: sqlite3.Connection, state: _ConnCaches) -> None:
+    """Esvazia os caches da conexão se outra conexão gravou no banco (conferido a cada RECHECK_S)."""
+    now = time.monotonic()
+    if now - state.checked_at < RECHECK_S:
+        return
+    state.checked_at = now
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if version != state.data_version:
+        if state.data_version is not None:
+            for cache in list(state.caches.values()):
+                cache.clear()
+        state.data_version = version
+
+
+def get_cache(conn: sqlite3.Connection, name: str, maxsize: int = DEFAULT_MAXSIZE):
+    """Cache `name` da conexão (ou None se cache desligado / conexão sem weakref)."""
+    if not _enabled:
+        return None
+    try:
+        state = _caches.get(conn)
+    except TypeError:
+        return None
+    if state is None:
+        with _lock:
+            try:
+                state = _caches.setdefault(conn, _ConnCaches())
+            except TypeError:
+                return None
+    _sync_data_version(conn, state)
+    cache = state.caches.get(name)
+    if cache is None:
+        cache = state.caches.setdefault(name, LRUCache(name, maxsize))
+    return cache
+
+
+def cached_lookup(conn: sqlite3.Connection, name: str, key: Hashable, loader):
+    """Devolve o valor em cache ou chama `loader()` e guarda o resultado."""
+    cache = get_cache(conn, name)
+    if cache is None:
+        return loader()
+    value = cache.get(key)
+    if value is _MISSING:
+        generation = cache.invalidations
+        value = loader()
+        # invalidate() no meio da carga: o valor pode ser anterior à gravação
+        if cache.invalidations == generation:
+            cache.put(key, value)
+    return value
+
+
+def invalidate(*names: str) -> None:
+    """Limpa os caches `names` (ou todos) em todas as conexões."""
+    with _lock:
+        groups = list(_caches.values())
+    for state in groups:
+        for name, cache in list(state.caches.items()):
+            if not names or name in names:
+                cache.clear()
+
+
+def cache_stats() -> List[Dict[str, Any]]:
+    """Totais por nome de cache (somando as conexões)."""
+    totals: Dict[str, Dict[str, Any]] = {}
+    with _lock:
+        groups = list(_caches.values())
+    for state in groups:
+        for name, cache in list(state.caches.items()):
+            t = totals.setdefault(name, {"name": name, "size": 0, "hits": 0, "misses": 0, "invalidations": 0})
+            t["size"] += len(cache)
+            t["hits"] += cache.hits
+            t["misses"] += cache.misses
+            t["invalidations"] += cache.invalidations
+    for t in totals.values():
+        lookups = t["hits"] + t["misses"]
+        t["hit_rate"] = t["hits"] / lookups if lookups else 0.0
+    return sorted(totals.values(), key=lambda t: t["name"])
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable_cache() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable_cache() -> None:
+    """Desliga e esvazia os caches (ex: para medir sem cache)."""
+    global _enabled
+    _enabled = False
+    invalidate()
+
+
+__all__ = [
+    "LRUCache",
+    "cache_stats",
+    "cached_lookup",
+    "disable_cache",
+    "enable_cache",
+    "get_cache",
+    "invalidate",
+    "is_enabled",
+]
@@ -8,33 +8,78 @@ armazenado no mesmo diretório do pacote `db` e é criado
 automaticamente caso ainda não exista.
 """
 
+import hashlib
 import sqlite3
+from collections import namedtuple
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Tuple
 
+from .profiling import ProfilingConnection
 
 # Caminho do arquivo do banco de dados. Ele será criado no mesmo
 # diretório deste módulo, com o nome `app.db`.
 DB_PATH = Path(__file__).resolve().parent / "app.db"
 
 
-def get_connection() -> sqlite3.Connection:
+def get_connection(db_path: Optional[Path] = None, check_same_thread: bool = True) -> sqlite3.Connection:
     """Obtém uma conexão com o banco de dados SQLite.
 
     A função define a `row_factory` para retornar linhas como objetos
-    do tipo `sqlite3.Row`, permitindo acesso às colunas por nome.
+    do tipo `sqlite3.Row`, permitindo acesso às colunas por nome. A
+    conexão é uma `ProfilingConnection` (ver `db.profiling`), que só mede
+    as consultas quando o profiling está ligado.
+
+    Args:
+        db_path (Optional[Path]): Arquivo alternativo (ex: benchmarks);
+            padrão = `DB_PATH`.
+        check_same_thread (bool): False para conexões compartilhadas entre
+            threads (uma por vez), como as do `db.pool`.
 
     Returns:
         sqlite3.Connection: Conexão aberta com o banco de dados.
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path or DB_PATH, factory=ProfilingConnection, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
 
     return conn
 
 
-def init_db(schema_path: Optional[Path] = None) -> None:
+@lru_cache(maxsize=256)
+def _row_class(fields: Tuple[str, ...]):
+    return namedtuple("Row", fields)
+
+
+def namedtuple_factory(cursor: sqlite3.Cursor, row: Tuple[Any, ...]):
+    """row_factory que devolve namedtuples (acesso por nome, sem o custo do sqlite3.Row)."""
+    return _row_class(tuple(d[0] for d in cursor.description))._make(row)
+
+
+def tuple_cursor(conn: sqlite3.Connection, named: bool = False) -> sqlite3.Cursor:
+    """Cursor para leituras em massa: linhas como tuplas simples (ou namedtuples).
+
+    A conexão continua com `sqlite3.Row`; só este cursor muda a row_factory.
+    """
+    cur = conn.cursor()
+    cur.row_factory = namedtuple_factory if named else None
+    return cur
+
+
+_SCHEMA_HASH_KEY = "schema_hash"
+
+
+def _schema_is_current(conn: sqlite3.Connection, schema_hash: str) -> bool:
+    """True se o banco já foi inicializado com este mesmo schema.sql."""
+    try:
+        row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (_SCHEMA_HASH_KEY,)).fetchone()
+    except sqlite3.OperationalError:
+        # banco novo ou anterior à tabela app_meta
+        return False
+    return row is not None and row[0] == schema_hash
+
+
+def init_db(schema_path: Optional[Path] = None, db_path: Optional[Path] = None, force: bool = False) -> None:
     """Inicializa o banco de dados executando o script de esquema.
 
     Esta função cria o banco de dados se ele não existir e executa
@@ -46,6 +91,14 @@ def init_db(schema_path: Optional[Path] = None) -> None:
     Args:
         schema_path (Optional[Path]): Caminho alternativo para o
             arquivo de definição do esquema.
+        db_path (Optional[Path]): Arquivo de banco alternativo; padrão =
+            `DB_PATH`.
+        force (bool): Executa o script e as migrações mesmo que o banco
+            já esteja na versão atual do esquema.
+
+    O hash de `schema.sql` é gravado em `app_meta` ao final; nas próximas
+    aberturas, se o hash bater, o script e as verificações de migração
+    são pulados (uma única consulta em vez de dezenas de DDLs).
     """
     # Determina o caminho do arquivo de esquema
     if schema_path is None:
@@ -54,9 +107,20 @@ def init_db(schema_path: Optional[Path] = None) -> None:
     # Lê o conteúdo do arquivo de esquema
     with open(schema_path, "r", encoding="utf-8") as f:
         script = f.read()
+    schema_hash = hashlib.sha1(script.encode("utf-8")).hexdigest()
 
-    conn = get_connection()
+    conn = get_connection(db_path)
     try:
+        if not force and _schema_is_current(conn, schema_hash):
+            return
+
+        existing_tables = {
+            r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        }
+        had_balances = {"stock_balances", "product_balances"} <= existing_tables
+        had_history = "variant_history" in existing_tables
+        had_reservations = "stock_reservations" in existing_tables
+
         conn.executescript(script)
         conn.commit()
 
@@ -81,8 +145,32 @@ def init_db(schema_path: Optional[Path] = None) -> None:
             conn.execute("ALTER TABLE sales ADD COLUMN packaging_env_variant_id INTEGER")
 
         conn.commit()
+
+        # tabelas de saldo acabaram de ser criadas: popula a partir do histórico existente
+        # (daqui em diante os triggers de stock_moves mantêm o saldo)
+        if not had_balances:
+            from .repositories import StockBalanceRepository
+
+            StockBalanceRepository.rebuild_balances(conn)
+        elif not had_reservations:
+            from .repositories import StockBalanceRepository
+
+            StockBalanceRepository.rebuild_reservations(conn)
+        if not had_history:
+            from .repositories import VariantRepository
+
+            VariantRepository.rebuild_history_flags(conn)
+
+        conn.execute(
+            """
+            INSERT INTO app_meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """,
+            (_SCHEMA_HASH_KEY, schema_hash),
+        )
+        conn.commit()
     finally:
         conn.close()
 
 
-__all__ = ["get_connection", "init_db", "DB_PATH"]
\ No newline at end of file
+__all__ = ["get_connection", "init_db", "namedtuple_factory", "tuple_cursor", "DB_PATH"]
\ No newline at end of file
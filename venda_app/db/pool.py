@@ -0,0 +1,257 @@
+"""venda_app.db.pool
+
+Conexões para uso concorrente do mesmo arquivo (servidor HTTP, integrações).
+
+Regras:
+  - Escrita: uma única conexão, dona de uma thread (`WriteQueue`). Quem
+    quer gravar enfileira uma função `fn(conn, ...)` e recebe um Future;
+    as gravações saem em série, na ordem de chegada, sem disputa de lock
+    entre conexões.
+  - Leitura: `ReaderPool` com N conexões reaproveitadas (uma por vez por
+    thread); em WAL, leitores não esperam o escritor.
+  - O banco é colocado em `journal_mode=WAL` na abertura do escritor
+    (fica gravado no arquivo) e todas as conexões usam `busy_timeout`.
+
+Group commit (`submit_grouped`): gravações pequenas que chegam juntas
+(sincronização de marketplace, várias estações) saem numa transação só.
+O escritor junta o que estiver na fila, esperando até
+VENDA_APP_GROUP_COMMIT_MS (padrão 2 ms) por mais, até
+VENDA_APP_GROUP_COMMIT_MAX operações (padrão 200). Cada operação roda
+dentro de um SAVEPOINT e recebe `commit=False`: se falhar, só ela é
+desfeita (ROLLBACK TO) e recebe a exceção; as demais entram no COMMIT
+único. Os Futures só são resolvidos depois do COMMIT.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+import sqlite3
+
+from ..utils.logger import logger
+from .database import get_connection
+
+
+BUSY_TIMEOUT_MS = int(os.environ.get("VENDA_APP_BUSY_TIMEOUT_MS", "5000"))
+GROUP_COMMIT_MS = float(os.environ.get("VENDA_APP_GROUP_COMMIT_MS", "2"))
+GROUP_COMMIT_MAX = int(os.environ.get("VENDA_APP_GROUP_COMMIT_MAX", "200"))
+
+_STOP = object()
+
+# (future, fn, args, kwargs, agrupável)
+_Job = Tuple["Future[Any]", Callable[..., Any], tuple, dict, bool]
+
+
+def _configure(conn: sqlite3.Connection) -> sqlite3.Connection:
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return conn
+
+
+class ReaderPool:
+    """Conexões de leitura reaproveitadas (criadas sob demanda, até `size`)."""
+
+    def __init__(self, db_path: Optional[Path] = None, size: int = 4):
+        self.db_path = db_path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ReaderPool fechado")
+            if len(self._all) < self.size:
+                conn = _configure(get_connection(self.db_path, check_same_thread=False))
+                self._all.append(conn)
+                return conn
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Empresta uma conexão de leitura (devolvida ao sair do bloco)."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            conns, self._all = self._all, []
+        for conn in conns:
+            conn.close()
+
+
+class WriteQueue:
+    """Fila de gravação atendida por uma thread com a única conexão de escrita."""
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        name: str = "venda-writer",
+        group_window_ms: float = GROUP_COMMIT_MS,
+        group_max: int = GROUP_COMMIT_MAX,
+    ):
+        self.db_path = db_path
+        self.group_window = max(0.0, group_window_ms) / 1000.0
+        self.group_max = max(1, group_max)
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, fn: Callable[..., Any], args: tuple, kwargs: dict, grouped: bool) -> "Future[Any]":
+        if not self._thread.is_alive():
+            raise RuntimeError("WriteQueue encerrada")
+        future: "Future[Any]" = Future()
+        self._queue.put((future, fn, args, kwargs, grouped))
+        return future
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "Future[Any]":
+        """Enfileira `fn(conn, *args, **kwargs)` (transação própria); o Future recebe o retorno ou a exceção."""
+        return self._put(fn, args, kwargs, False)
+
+    def submit_grouped(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "Future[Any]":
+        """Como `submit`, mas pode dividir o commit com outras gravações.
+
+        `fn` é chamada com `commit=False` dentro de um SAVEPOINT e não deve
+        fazer commit nem rollback (ex: create_sale, cancel_sale,
+        update_sale_status, insert_stock_move).
+        """
+        return self._put(fn, args, kwargs, True)
+
+    def call(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Como `submit`, mas espera o resultado."""
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def call_grouped(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Como `submit_grouped`, mas espera o resultado."""
+        return self.submit_grouped(fn, *args, **kwargs).result(timeout)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Termina o que já está na fila e fecha a conexão."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            conn = _configure(get_connection(self.db_path))
+            conn.execute("PRAGMA journal_mode = WAL")
+        except BaseException as e:  # noqa: BLE001 - repassado ao construtor
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        held: Any = None
+        try:
+            while True:
+                job = held if held is not None else self._queue.get()
+                held = None
+                if job is _STOP:
+                    break
+                if not job[4]:
+                    self._run_single(conn, job)
+                    continue
+                group, held = self._collect(job)
+                self._run_group(conn, group)
+                if held is _STOP:
+                    break
+        finally:
+            conn.close()
+
+    def _collect(self, first: _Job) -> Tuple[List[_Job], Any]:
+        """Junta gravações agrupáveis até a janela/limite; devolve também a que interrompeu."""
+        group = [first]
+        deadline = time.perf_counter() + self.group_window
+        while len(group) < self.group_max:
+            try:
+                remaining = deadline - time.perf_counter()
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP or not job[4]:
+                return group, job
+            group.append(job)
+        return group, None
+
+    def _run_single(self, conn: sqlite3.Connection, job: _Job) -> None:
+        future, fn, args, kwargs, _ = job
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = fn(conn, *args, **kwargs)
+        except BaseException as e:  # noqa: BLE001 - vai para o Future
+            if conn.in_transaction:
+                conn.rollback()
+            future.set_exception(e)
+        else:
+            if conn.in_transaction:
+                # função que esqueceu o commit não pode segurar o lock de escrita
+                logger.warning("Gravação sem commit explícito: %s", getattr(fn, "__qualname__", fn))
+                conn.commit()
+            future.set_result(result)
+
+    def _run_group(self, conn: sqlite3.Connection, group: List[_Job]) -> None:
+        jobs = [job for job in group if job[0].set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        outcomes: List[Tuple["Future[Any]", bool, Any]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, fn, args, kwargs, _ in jobs:
+                conn.execute("SAVEPOINT venda_job")
+                try:
+                    result = fn(conn, *args, commit=False, **kwargs)
+                except Exception as e:  # noqa: BLE001 - só esta operação falha
+                    conn.execute("ROLLBACK TO venda_job")
+                    conn.execute("RELEASE venda_job")
+                    outcomes.append((future, False, e))
+                else:
+                    conn.execute("RELEASE venda_job")
+                    outcomes.append((future, True, result))
+            conn.commit()
+        except BaseException as e:  # noqa: BLE001 - COMMIT/SAVEPOINT falhou: ninguém foi gravado
+            if conn.in_transaction:
+                conn.rollback()
+            done = {id(f) for f, _, _ in outcomes}
+            for future, ok, value in outcomes:
+                future.set_exception(e if ok else value)
+            for future, *_ in jobs:
+                if id(future) not in done:
+                    future.set_exception(e)
+            return
+
+        logger.debug("Group commit: %d operações (%d com erro)", len(jobs), sum(1 for _, ok, _ in outcomes if not ok))
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+__all__ = ["BUSY_TIMEOUT_MS", "GROUP_COMMIT_MAX", "GROUP_COMMIT_MS", "ReaderPool", "WriteQueue"]
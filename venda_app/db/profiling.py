@@ -0,0 +1,294 @@
+"""
+Instrumentação de consultas SQLite (profiling e slow-query log).
+
+`get_connection()` cria conexões do tipo `ProfilingConnection`. Enquanto o
+profiling está desligado, os cursores apenas repassam as chamadas; ao
+ligar (`enable_profiling()` ou variável de ambiente
+`VENDA_APP_SQL_PROFILE=1`), cada instrução passa a registrar:
+
+- tempo de execução + leitura das linhas (ms);
+- linhas lidas (SELECT) ou afetadas (INSERT/UPDATE/DELETE);
+- passos da VM do SQLite (via `set_progress_handler`);
+- local de chamada (primeiro frame fora de sqlite3/profiling);
+- total de instruções iniciadas, inclusive de executescript (via
+  `set_trace_callback`).
+
+Instruções acima de `slow_query_ms` (padrão 50 ms, ou
+`VENDA_APP_SLOW_QUERY_MS`) são registradas no logger junto com o
+`EXPLAIN QUERY PLAN`. As estatísticas agregadas por SQL ficam em memória
+e são exibidas na tela de Diagnóstico.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+
+from ..utils.logger import logger
+
+
+# Passos da VM entre chamadas do progress handler
+PROGRESS_STEP = 1000
+
+_THIS_FILE = os.path.normcase(os.path.abspath(__file__))
+
+_lock = threading.Lock()
+_enabled = os.environ.get("VENDA_APP_SQL_PROFILE", "") not in ("", "0")
+_slow_query_ms = float(os.environ.get("VENDA_APP_SLOW_QUERY_MS", "50"))
+_stats: Dict[str, Dict[str, Any]] = {}
+_totals = {"statements": 0}
+_plans: Dict[str, str] = {}
+_connections: "weakref.WeakSet[ProfilingConnection]" = weakref.WeakSet()
+
+
+def _normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def _call_site() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.normcase(os.path.abspath(frame.f_code.co_filename))
+        if filename != _THIS_FILE:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "?"
+
+
+def _explain(conn: sqlite3.Connection, sql: str, params: Any) -> str:
+    key = _normalize(sql)
+    if key in _plans:
+        return _plans[key]
+    try:
+        cur = sqlite3.Cursor(conn)
+        rows = cur.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        plan = "\n".join(f"  {r[3]}" for r in rows)
+    except sqlite3.Error as e:
+        plan = f"  (plano indisponível: {e})"
+    _plans[key] = plan
+    return plan
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor que mede execute/fetch enquanto o profiling está ligado."""
+
+    _record: Optional[Dict[str, Any]] = None
+    _sql: Optional[str] = None
+    _params: Any = None
+    _elapsed: float = 0.0
+    _logged: bool = False
+
+    def _begin(self, sql: str, params: Any) -> None:
+        self._sql = sql
+        self._params = params
+        self._elapsed = 0.0
+        self._logged = False
+        key = _normalize(sql)
+        with _lock:
+            rec = _stats.get(key)
+            if rec is None:
+                rec = _stats[key] = {
+                    "sql": key,
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": 0,
+                    "vm_steps": 0,
+                    "slow": 0,
+                    "call_site": "",
+                }
+            rec["calls"] += 1
+            rec["call_site"] = _call_site()
+        self._record = rec
+
+    def _account(self, elapsed: float, rows: int, steps: int) -> None:
+        rec = self._record
+        if rec is None:
+            return
+        self._elapsed += elapsed
+        with _lock:
+            rec["total_ms"] += elapsed * 1000.0
+            rec["rows"] += rows
+            rec["vm_steps"] += steps
+            if self._elapsed * 1000.0 > rec["max_ms"]:
+                rec["max_ms"] = self._elapsed * 1000.0
+
+    def _check_slow(self, plan_params: Any) -> None:
+        ms = self._elapsed * 1000.0
+        if self._logged or ms < _slow_query_ms or self._record is None:
+            return
+        self._logged = True
+        with _lock:
+            self._record["slow"] += 1
+        plan = _explain(self.connection, self._sql, plan_params) if plan_params is not None else "  (executemany)"
+        logger.warning(
+            "SQL lenta (%.1f ms) em %s:\n%s\nPlano:\n%s",
+            ms,
+            self._record["call_site"],
+            self._record["sql"],
+            plan,
+        )
+
+    def _steps(self) -> int:
+        conn = self.connection
+        return getattr(conn, "_vm_steps", 0) if isinstance(conn, ProfilingConnection) else 0
+
+    def execute(self, sql, parameters=(), /):
+        if not _enabled:
+            return super().execute(sql, parameters)
+        self._begin(sql, parameters)
+        steps0 = self._steps()
+        t0 = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - t0
+        rows = self.rowcount if self.rowcount > 0 else 0
+        self._account(elapsed, rows, (self._steps() - steps0) * PROGRESS_STEP)
+        self._check_slow(parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters, /):
+        if not _enabled:
+            return super().executemany(sql, seq_of_parameters)
+        self._begin(sql, None)
+        steps0 = self._steps()
+        t0 = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        elapsed = time.perf_counter() - t0
+        rows = self.rowcount if self.rowcount > 0 else 0
+        self._account(elapsed, rows, (self._steps() - steps0) * PROGRESS_STEP)
+        self._check_slow(None)
+        return self
+
+    def _timed_fetch(self, fn, *args):
+        if not _enabled or self._record is None:
+            return fn(*args)
+        steps0 = self._steps()
+        t0 = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - t0
+        if isinstance(result, list):
+            n = len(result)
+        else:
+            n = 0 if result is None else 1
+        self._account(elapsed, n, (self._steps() - steps0) * PROGRESS_STEP)
+        self._check_slow(self._params)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._timed_fetch(super().fetchmany)
+        return self._timed_fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive de conn.execute) são ProfilingCursor."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._vm_steps = 0
+        _connections.add(self)
+        if _enabled:
+            self._install_hooks()
+
+    def _on_progress(self) -> int:
+        self._vm_steps += 1
+        return 0
+
+    def _install_hooks(self) -> None:
+        self.set_progress_handler(self._on_progress, PROGRESS_STEP)
+        self.set_trace_callback(_on_trace)
+
+    def _remove_hooks(self) -> None:
+        self.set_progress_handler(None, PROGRESS_STEP)
+        self.set_trace_callback(None)
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _on_trace(_statement: str) -> None:
+    _totals["statements"] += 1
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable_profiling(slow_query_ms: Optional[float] = None) -> None:
+    """Liga o profiling (inclusive em conexões já abertas)."""
+    global _enabled, _slow_query_ms
+    if slow_query_ms is not None:
+        _slow_query_ms = float(slow_query_ms)
+    _enabled = True
+    for conn in list(_connections):
+        try:
+            conn._install_hooks()
+        except sqlite3.ProgrammingError:
+            # conexão já fechada
+            pass
+
+
+def disable_profiling() -> None:
+    global _enabled
+    _enabled = False
+    for conn in list(_connections):
+        try:
+            conn._remove_hooks()
+        except sqlite3.ProgrammingError:
+            pass
+
+
+def get_slow_query_ms() -> float:
+    return _slow_query_ms
+
+
+def get_query_stats(order_by: str = "total_ms") -> List[Dict[str, Any]]:
+    """Estatísticas agregadas por SQL (cópias), ordenadas de forma decrescente."""
+    with _lock:
+        rows = [dict(r) for r in _stats.values()]
+    for r in rows:
+        r["avg_ms"] = r["total_ms"] / r["calls"] if r["calls"] else 0.0
+    rows.sort(key=lambda r: r.get(order_by, 0), reverse=True)
+    return rows
+
+
+def get_totals() -> Dict[str, int]:
+    with _lock:
+        return dict(_totals, distinct_queries=len(_stats))
+
+
+def reset_query_stats() -> None:
+    with _lock:
+        _stats.clear()
+        _plans.clear()
+        _totals["statements"] = 0
+
+
+__all__ = [
+    "ProfilingConnection",
+    "ProfilingCursor",
+    "disable_profiling",
+    "enable_profiling",
+    "get_query_stats",
+    "get_slow_query_ms",
+    "get_totals",
+    "is_enabled",
+    "reset_query_stats",
+]
@@ -8,25 +8,39 @@ banco de dados, separando persistência da UI e da lógica de negócios.
 
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import sqlite3
 
+from . import cache as _cache
+from .database import tuple_cursor
+
+
+# Nomes dos caches de leitura (db.cache)
+CACHE_CATEGORIES = "categories"
+CACHE_PRODUCT_BY_ID = "product_by_id"
+CACHE_VARIANT_BY_SKU = "variant_by_sku"
+CACHE_SKU_INDEX = "sku_index"
+
 
 # =========================
 # MODELOS (dataclasses)
 # =========================
+# Imutáveis e com __slots__: são compartilhados pelo cache de leitura
+# (db.cache) e ficam bem menores em listas grandes. Para alterar, use
+# dataclasses.replace(obj, campo=valor).
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Category:
     id: Optional[int]
     name: str
     is_active: bool = True
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Product:
     id: Optional[int]
     sku: str
@@ -40,7 +54,7 @@ class Product:
     is_active: bool = True
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ProductVariant:
     id: Optional[int]
     product_id: int
@@ -52,6 +66,14 @@ class ProductVariant:
     is_active: bool = True
 
 
+_VARIANT_COLUMNS = "id, product_id, variant_sku, variant_value, is_default, cost_override, price_override, is_active"
+
+
+def _variant_from_tuple(t: Tuple[Any, ...]) -> ProductVariant:
+    # ordem de _VARIANT_COLUMNS = ordem dos campos de ProductVariant
+    return ProductVariant(t[0], t[1], t[2], t[3], bool(t[4]), t[5], t[6], bool(t[7]))
+
+
 # =========================
 # REPOSITÓRIO: CATEGORIAS
 # =========================
@@ -71,6 +93,7 @@ class CategoryRepository:
             (name.strip(), 1 if is_active else 0),
         )
         conn.commit()
+        _cache.invalidate(CACHE_CATEGORIES)
         return cur.lastrowid
 
     @staticmethod
@@ -86,37 +109,28 @@ class CategoryRepository:
             (name.strip(), 1 if is_active else 0, category_id),
         )
         conn.commit()
+        _cache.invalidate(CACHE_CATEGORIES)
 
     @staticmethod
     def delete_category(conn: sqlite3.Connection, category_id: int) -> None:
         conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
         conn.commit()
+        _cache.invalidate(CACHE_CATEGORIES)
 
     @staticmethod
     def list_categories(conn: sqlite3.Connection, only_active: bool = False) -> List[Category]:
-        cur = conn.cursor()
-        if only_active:
-            cur.execute(
-                """
-                SELECT id, name, is_active
-                  FROM categories
-                 WHERE is_active = 1
-                 ORDER BY name
-                """
-            )
-        else:
-            cur.execute(
-                """
-                SELECT id, name, is_active
-                  FROM categories
-                 ORDER BY name
-                """
-            )
-        rows = cur.fetchall()
-        return [
-            Category(id=r["id"], name=r["name"], is_active=bool(r["is_active"]))
-            for r in rows
-        ]
+        """Lista categorias por nome (cacheado até a próxima escrita em categorias)."""
+        cats = _cache.cached_lookup(
+            conn, CACHE_CATEGORIES, bool(only_active), lambda: CategoryRepository._load_categories(conn, only_active)
+        )
+        return list(cats)
+
+    @staticmethod
+    def _load_categories(conn: sqlite3.Connection, only_active: bool) -> List[Category]:
+        cur = tuple_cursor(conn)
+        where = "WHERE is_active = 1" if only_active else ""
+        cur.execute(f"SELECT id, name, is_active FROM categories {where} ORDER BY name")
+        return [Category(r[0], r[1], bool(r[2])) for r in cur.fetchall()]
 
 
 # =========================
@@ -128,7 +142,7 @@ class ProductRepository:
     """CRUD de produtos."""
 
     @staticmethod
-    def add_product(conn: sqlite3.Connection, product: Product) -> int:
+    def add_product(conn: sqlite3.Connection, product: Product, commit: bool = True) -> int:
         cur = conn.cursor()
         cur.execute(
             """
@@ -150,11 +164,13 @@ class ProductRepository:
                 1 if product.is_active else 0,
             ),
         )
-        conn.commit()
+        if commit:
+            conn.commit()
+        _cache.invalidate(CACHE_PRODUCT_BY_ID, CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
         return cur.lastrowid
 
     @staticmethod
-    def update_product(conn: sqlite3.Connection, product: Product) -> None:
+    def update_product(conn: sqlite3.Connection, product: Product, commit: bool = True) -> None:
         if product.id is None:
             raise ValueError("Produto deve ter ID para ser atualizado")
         conn.execute(
@@ -185,12 +201,15 @@ class ProductRepository:
                 int(product.id),
             ),
         )
-        conn.commit()
+        if commit:
+            conn.commit()
+        _cache.invalidate(CACHE_PRODUCT_BY_ID, CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
 
     @staticmethod
     def delete_product(conn: sqlite3.Connection, product_id: int) -> None:
         conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
         conn.commit()
+        _cache.invalidate(CACHE_PRODUCT_BY_ID, CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
 
     @staticmethod
     def get_all_products_rows(conn: sqlite3.Connection) -> List[sqlite3.Row]:
@@ -225,6 +244,13 @@ class ProductRepository:
 
     @staticmethod
     def get_product_by_id(conn: sqlite3.Connection, product_id: int) -> Optional[Product]:
+        """Produto pelo id (cacheado até a próxima escrita em produtos)."""
+        return _cache.cached_lookup(
+            conn, CACHE_PRODUCT_BY_ID, int(product_id), lambda: ProductRepository._load_product_by_id(conn, product_id)
+        )
+
+    @staticmethod
+    def _load_product_by_id(conn: sqlite3.Connection, product_id: int) -> Optional[Product]:
         cur = conn.cursor()
         cur.execute(
             """
@@ -256,8 +282,13 @@ class ProductRepository:
     # =========================
 
     @staticmethod
-    def apply_purchase_cost_from_variant(conn: sqlite3.Connection, variant_id: int, unit_cost: float) -> None:
-        """Ao registrar uma COMPRA (IN), atualiza o custo padrão do produto e o override da variação."""
+    def apply_purchase_cost_from_variant(
+        conn: sqlite3.Connection, variant_id: int, unit_cost: float, commit: bool = True
+    ) -> None:
+        """Ao registrar uma COMPRA (IN), atualiza o custo padrão do produto e o override da variação.
+
+        commit=False: sem commit (transação do chamador, ex: importação em lote).
+        """
         cur = conn.cursor()
         cur.execute("SELECT product_id FROM product_variants WHERE id = ?", (int(variant_id),))
         r = cur.fetchone()
@@ -286,7 +317,9 @@ class ProductRepository:
             """,
             (float(unit_cost), int(variant_id)),
         )
-        conn.commit()
+        if commit:
+            conn.commit()
+        _cache.invalidate(CACHE_PRODUCT_BY_ID, CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
 
     @staticmethod
     def recompute_purchase_costs(conn: sqlite3.Connection, variant_id: int) -> None:
@@ -359,6 +392,7 @@ class ProductRepository:
             (float(pr[0]) if pr else 0.0, product_id),
         )
         conn.commit()
+        _cache.invalidate(CACHE_PRODUCT_BY_ID, CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
 
     @staticmethod
     def get_product_by_sku(conn: sqlite3.Connection, sku: str) -> Optional[Product]:
@@ -417,16 +451,75 @@ class VariantRepository:
         text = re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-")
         return text.upper() or "VAR"
 
+    @staticmethod
+    def list_skus_with_prefix(conn: sqlite3.Connection, prefix: str) -> set[str]:
+        """SKUs de variação que começam com `prefix` (uma consulta por faixa no índice de SKU)."""
+        if not prefix:
+            return {r[0] for r in tuple_cursor(conn).execute("SELECT variant_sku FROM product_variants")}
+        # [prefix, prefix com o último caractere + 1): mesma ordem BINARY do índice
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        cur = tuple_cursor(conn)
+        cur.execute(
+            "SELECT variant_sku FROM product_variants WHERE variant_sku >= ? AND variant_sku < ?",
+            (prefix, upper),
+        )
+        return {r[0] for r in cur.fetchall()}
+
+    @staticmethod
+    def generate_unique_variant_skus(
+        conn: sqlite3.Connection,
+        product_sku: str,
+        variant_values: Sequence[str],
+        reserved: Sequence[str] = (),
+    ) -> List[str]:
+        """Gera SKUs únicos para várias variações de uma vez (PRODUTO-VALOR, -2, -3...).
+
+        Busca numa única consulta todos os SKUs já existentes com o prefixo
+        do produto e resolve os sufixos em memória, inclusive entre valores
+        repetidos da própria lista. `reserved` são SKUs ainda não gravados
+        (ex: linhas do editor) que também devem ser evitados.
+        """
+        prefix = f"{product_sku.strip()}-"
+        taken = VariantRepository.list_skus_with_prefix(conn, prefix)
+        taken.update(s.strip() for s in reserved)
+
+        result: List[str] = []
+        for value in variant_values:
+            base = f"{prefix}{VariantRepository._slug(value)}"
+            candidate = base
+            n = 2
+            while candidate in taken:
+                candidate = f"{base}-{n}"
+                n += 1
+            taken.add(candidate)
+            result.append(candidate)
+        return result
+
     @staticmethod
     def generate_unique_variant_sku(conn: sqlite3.Connection, product_sku: str, variant_value: str) -> str:
         """Gera um SKU de variação único. Se o padrão já existir, adiciona sufixo -2, -3..."""
-        base = f"{product_sku.strip()}-{VariantRepository._slug(variant_value)}"
-        candidate = base
-        n = 2
-        while VariantRepository.variant_sku_exists(conn, candidate):
-            candidate = f"{base}-{n}"
-            n += 1
-        return candidate
+        return VariantRepository.generate_unique_variant_skus(conn, product_sku, [variant_value])[0]
+
+    @staticmethod
+    def rebuild_history_flags(conn: sqlite3.Connection) -> None:
+        """Recria `variant_history` a partir de stock_moves e sale_items.
+
+        Depois de um arquivamento (app_meta.archive_cutoff) o histórico
+        antigo não está mais no banco: as flags existentes são mantidas e
+        só as que faltam são recriadas.
+        """
+        conn.execute(
+            "DELETE FROM variant_history WHERE NOT EXISTS (SELECT 1 FROM app_meta WHERE key = 'archive_cutoff')"
+        )
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO variant_history (variant_id)
+            SELECT variant_id FROM stock_moves
+            UNION
+            SELECT variant_id FROM sale_items
+            """
+        )
+        conn.commit()
 
     @staticmethod
     def add_variant(conn: sqlite3.Connection, v: ProductVariant) -> int:
@@ -450,6 +543,7 @@ class VariantRepository:
             ),
         )
         conn.commit()
+        _cache.invalidate(CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
         return cur.lastrowid
 
     @staticmethod
@@ -479,50 +573,105 @@ class VariantRepository:
             ),
         )
         conn.commit()
+        _cache.invalidate(CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
 
     @staticmethod
     def list_variants_by_product(conn: sqlite3.Connection, product_id: int, only_active: bool = False) -> List[ProductVariant]:
-        cur = conn.cursor()
-        if only_active:
-            cur.execute(
-                """
-                SELECT id, product_id, variant_sku, variant_value, is_default,
-                       cost_override, price_override, is_active
-                  FROM product_variants
-                 WHERE product_id = ? AND is_active = 1
-                 ORDER BY is_default DESC, variant_value
-                """,
-                (product_id,),
-            )
-        else:
-            cur.execute(
-                """
-                SELECT id, product_id, variant_sku, variant_value, is_default,
-                       cost_override, price_override, is_active
-                  FROM product_variants
-                 WHERE product_id = ?
-                 ORDER BY is_default DESC, variant_value
-                """,
-                (product_id,),
-            )
-        rows = cur.fetchall()
-        return [
-            ProductVariant(
-                id=r["id"],
-                product_id=r["product_id"],
-                variant_sku=r["variant_sku"],
-                variant_value=r["variant_value"],
-                is_default=bool(r["is_default"]),
-                cost_override=r["cost_override"],
-                price_override=r["price_override"],
-                is_active=bool(r["is_active"]),
-            )
-            for r in rows
-        ]
+        cur = tuple_cursor(conn)
+        active = "AND is_active = 1" if only_active else ""
+        cur.execute(
+            f"""
+            SELECT {_VARIANT_COLUMNS}
+              FROM product_variants
+             WHERE product_id = ? {active}
+             ORDER BY is_default DESC, variant_value
+            """,
+            (product_id,),
+        )
+        return [_variant_from_tuple(r) for r in cur.fetchall()]
+
+    @staticmethod
+    def list_all_variants(conn: sqlite3.Connection, only_active: bool = False) -> List[ProductVariant]:
+        """Todas as variações (leitura em massa: tuplas -> ProductVariant direto)."""
+        cur = tuple_cursor(conn)
+        where = "WHERE is_active = 1" if only_active else ""
+        cur.execute(f"SELECT {_VARIANT_COLUMNS} FROM product_variants {where} ORDER BY id")
+        return [_variant_from_tuple(r) for r in cur.fetchall()]
+
+    @staticmethod
+    def get_variant_columns(conn: sqlite3.Connection, only_active: bool = False, chunk: int = 5000) -> Dict[str, Sequence]:
+        """Variações em formato de colunas (sem um objeto por linha).
+
+        Ids e flags vão para `array` (inteiros compactos); SKU e valor ficam
+        em listas de str. Útil para mapas SKU -> id e varreduras grandes.
+
+        Returns:
+            {"id", "product_id", "is_active": array; "variant_sku", "variant_value": list}
+        """
+        ids = array("q")
+        product_ids = array("q")
+        actives = array("b")
+        skus: List[str] = []
+        values: List[str] = []
+
+        cur = tuple_cursor(conn)
+        where = "WHERE is_active = 1" if only_active else ""
+        cur.execute(f"SELECT id, product_id, variant_sku, variant_value, is_active FROM product_variants {where} ORDER BY id")
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            for vid, pid, sku, value, active in rows:
+                ids.append(vid)
+                product_ids.append(pid)
+                skus.append(sku)
+                values.append(value)
+                actives.append(active)
+
+        return {"id": ids, "product_id": product_ids, "variant_sku": skus, "variant_value": values, "is_active": actives}
+
+    @staticmethod
+    def get_sku_index(conn: sqlite3.Connection) -> Dict[str, tuple]:
+        """Mapa SKU -> namedtuple com tudo que a venda precisa (leitor de código de barras).
+
+        Campos: variant_sku, variant_id, is_active, unit_cost, unit_price
+        (override > padrão do produto), product_name, variant_value. Inclui
+        inativas (para avisar em vez de "não encontrado"). Montado numa
+        consulta e cacheado até a próxima escrita em produtos/variações.
+        """
+        return _cache.cached_lookup(conn, CACHE_SKU_INDEX, None, lambda: VariantRepository._load_sku_index(conn))
+
+    @staticmethod
+    def _load_sku_index(conn: sqlite3.Connection) -> Dict[str, tuple]:
+        cur = tuple_cursor(conn, named=True)
+        cur.execute(
+            """
+            SELECT v.variant_sku,
+                   v.id AS variant_id,
+                   v.is_active,
+                   COALESCE(v.cost_override, p.cost_default) AS unit_cost,
+                   COALESCE(v.price_override, p.price_default) AS unit_price,
+                   p.name AS product_name,
+                   v.variant_value
+              FROM product_variants v
+              JOIN products p ON p.id = v.product_id
+            """
+        )
+        return {r.variant_sku: r for r in cur.fetchall()}
 
     @staticmethod
     def get_variant_by_sku(conn: sqlite3.Connection, variant_sku: str) -> Optional[sqlite3.Row]:
-        """Retorna uma Row com infos do variant + produto (para custo/preço)."""
+        """Retorna uma Row com infos do variant + produto (para custo/preço).
+
+        Cacheado por SKU até a próxima escrita em produtos/variações.
+        """
+        variant_sku = variant_sku.strip()
+        return _cache.cached_lookup(
+            conn, CACHE_VARIANT_BY_SKU, variant_sku, lambda: VariantRepository._load_variant_by_sku(conn, variant_sku)
+        )
+
+    @staticmethod
+    def _load_variant_by_sku(conn: sqlite3.Connection, variant_sku: str) -> Optional[sqlite3.Row]:
         cur = conn.cursor()
         cur.execute(
             """
@@ -555,6 +704,8 @@ class VariantRepository:
         """
         Retorna sugestões de variantes por prefixo de SKU ou por texto (nome produto/valor).
         Se category_name for informado, filtra pela categoria (case-insensitive).
+        Cada linha já traz variant_id, is_active, unit_cost e unit_price resolvidos
+        (override da variação > padrão do produto), para a tela não buscar o SKU de novo.
         """
         q = (q or "").strip()
         if not q:
@@ -579,7 +730,10 @@ class VariantRepository:
               v.variant_sku,
               p.name AS product_name,
               COALESCE(p.variant_attribute_name, 'Variação') AS attr_name,
-              v.variant_value
+              v.variant_value,
+              v.is_active,
+              COALESCE(v.cost_override, p.cost_default) AS unit_cost,
+              COALESCE(v.price_override, p.price_default) AS unit_price
             FROM product_variants v
             JOIN products p ON p.id = v.product_id
             JOIN categories c ON c.id = p.category_id
@@ -607,7 +761,7 @@ class VariantRepository:
 
 class SaleRepository:
     @staticmethod
-    def insert_sale(conn: sqlite3.Connection, sale_data: Dict[str, Any]) -> int:
+    def insert_sale(conn: sqlite3.Connection, sale_data: Dict[str, Any], commit: bool = True) -> int:
         cur = conn.cursor()
         cur.execute(
             """
@@ -628,11 +782,12 @@ class SaleRepository:
             """,
             sale_data,
         )
-        conn.commit()
+        if commit:
+            conn.commit()
         return cur.lastrowid
 
     @staticmethod
-    def insert_sale_item(conn: sqlite3.Connection, item_data: Dict[str, Any]) -> int:
+    def insert_sale_item(conn: sqlite3.Connection, item_data: Dict[str, Any], commit: bool = True) -> int:
         cur = conn.cursor()
         cur.execute(
             """
@@ -647,7 +802,8 @@ class SaleRepository:
             """,
             item_data,
         )
-        conn.commit()
+        if commit:
+            conn.commit()
         return cur.lastrowid
 
     @staticmethod
@@ -698,7 +854,7 @@ class SaleRepository:
 
 class StockMoveRepository:
     @staticmethod
-    def insert_stock_move(conn: sqlite3.Connection, move_data: Dict[str, Any]) -> int:
+    def insert_stock_move(conn: sqlite3.Connection, move_data: Dict[str, Any], commit: bool = True) -> int:
         cur = conn.cursor()
         cur.execute(
             """
@@ -713,7 +869,8 @@ class StockMoveRepository:
             """,
             move_data,
         )
-        conn.commit()
+        if commit:
+            conn.commit()
         return cur.lastrowid
 
     @staticmethod
@@ -744,6 +901,82 @@ class StockMoveRepository:
         conn.commit()
 
 
+# =========================
+# REPOSITÓRIO: SALDOS DE ESTOQUE
+# =========================
+
+
+class StockBalanceRepository:
+    """Saldos materializados (tabelas stock_balances, product_balances e
+    stock_reservations).
+
+    As tabelas são mantidas por triggers (stock_moves, products,
+    product_variants); aqui ficam apenas leitura e reconstrução completa
+    (ex: após importar dados antigos).
+    """
+
+    @staticmethod
+    def rebuild_balances(conn: sqlite3.Connection) -> None:
+        """Recalcula todos os saldos a partir do histórico de stock_moves."""
+        conn.execute("DELETE FROM stock_balances")
+        conn.execute(
+            """
+            INSERT INTO stock_balances (variant_id, qty)
+            SELECT variant_id,
+                   SUM(CASE WHEN move_type = 'OUT' THEN -qty ELSE qty END)
+              FROM stock_moves
+             GROUP BY variant_id
+            """
+        )
+        conn.execute("DELETE FROM product_balances")
+        conn.execute(
+            """
+            INSERT INTO product_balances (product_id, qty, stock_min, is_active)
+            SELECT p.id,
+                   COALESCE((
+                       SELECT SUM(b.qty)
+                         FROM product_variants v
+                         JOIN stock_balances b ON b.variant_id = v.id
+                        WHERE v.product_id = p.id AND v.is_active = 1
+                   ), 0),
+                   p.stock_min,
+                   p.is_active
+              FROM products p
+            """
+        )
+        StockBalanceRepository.rebuild_reservations(conn)
+
+    @staticmethod
+    def rebuild_reservations(conn: sqlite3.Connection) -> None:
+        """Recalcula as reservas (saídas de vendas ainda A_ENVIAR)."""
+        conn.execute("DELETE FROM stock_reservations")
+        conn.execute(
+            """
+            INSERT INTO stock_reservations (variant_id, qty)
+            SELECT sm.variant_id, SUM(sm.qty)
+              FROM stock_moves sm
+              JOIN sales s ON s.id = sm.ref_id
+             WHERE sm.ref_type = 'SALE' AND sm.move_type = 'OUT' AND s.status = 'A_ENVIAR'
+             GROUP BY sm.variant_id
+            """
+        )
+        conn.commit()
+
+    @staticmethod
+    def get_balance(conn: sqlite3.Connection, variant_id: int) -> int:
+        cur = conn.cursor()
+        cur.execute("SELECT qty FROM stock_balances WHERE variant_id = ?", (int(variant_id),))
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+
+    @staticmethod
+    def get_reserved(conn: sqlite3.Connection, variant_id: int) -> int:
+        cur = conn.cursor()
+        cur.execute("SELECT qty FROM stock_reservations WHERE variant_id = ?", (int(variant_id),))
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+
+
 # =========================
 # REPOSITÓRIO: GASTOS
 # =========================
@@ -764,6 +997,10 @@ class ExpenseRepository:
         return cur.lastrowid
 
 __all__ = [
+    "CACHE_CATEGORIES",
+    "CACHE_PRODUCT_BY_ID",
+    "CACHE_SKU_INDEX",
+    "CACHE_VARIANT_BY_SKU",
     "Category",
     "Product",
     "ProductVariant",
@@ -772,5 +1009,6 @@ __all__ = [
     "VariantRepository",
     "SaleRepository",
     "StockMoveRepository",
+    "StockBalanceRepository",
     "ExpenseRepository",
 ]
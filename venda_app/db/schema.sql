@@ -124,6 +124,7 @@ CREATE TABLE IF NOT EXISTS stock_moves (
 
 CREATE INDEX IF NOT EXISTS idx_stock_moves_variant_id ON stock_moves(variant_id);
 CREATE INDEX IF NOT EXISTS idx_stock_moves_date ON stock_moves(move_date);
+CREATE INDEX IF NOT EXISTS idx_stock_moves_ref ON stock_moves(ref_type, ref_id);
 
 -- =====================
 -- GASTOS
@@ -140,3 +141,334 @@ CREATE TABLE IF NOT EXISTS expenses (
 );
 
 CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(exp_date);
+
+-- =====================
+-- METADADOS DA APLICAÇÃO (marcas d'água de processos incrementais etc.)
+-- =====================
+CREATE TABLE IF NOT EXISTS app_meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+
+-- =====================
+-- SALDO DE ESTOQUE (materializado por variação)
+-- Mantido pelos triggers abaixo a cada INSERT/UPDATE/DELETE em stock_moves,
+-- para que consultas de saldo não precisem somar todo o histórico.
+-- =====================
+CREATE TABLE IF NOT EXISTS stock_balances (
+  variant_id INTEGER PRIMARY KEY,
+  qty INTEGER NOT NULL DEFAULT 0,
+  updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY (variant_id) REFERENCES product_variants(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_balance_ins
+AFTER INSERT ON stock_moves
+BEGIN
+  INSERT OR IGNORE INTO stock_balances (variant_id, qty) VALUES (NEW.variant_id, 0);
+  UPDATE stock_balances
+     SET qty = qty + (CASE WHEN NEW.move_type = 'OUT' THEN -NEW.qty ELSE NEW.qty END),
+         updated_at = datetime('now')
+   WHERE variant_id = NEW.variant_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_balance_del
+AFTER DELETE ON stock_moves
+BEGIN
+  UPDATE stock_balances
+     SET qty = qty - (CASE WHEN OLD.move_type = 'OUT' THEN -OLD.qty ELSE OLD.qty END),
+         updated_at = datetime('now')
+   WHERE variant_id = OLD.variant_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_balance_upd
+AFTER UPDATE OF variant_id, move_type, qty ON stock_moves
+BEGIN
+  UPDATE stock_balances
+     SET qty = qty - (CASE WHEN OLD.move_type = 'OUT' THEN -OLD.qty ELSE OLD.qty END),
+         updated_at = datetime('now')
+   WHERE variant_id = OLD.variant_id;
+  INSERT OR IGNORE INTO stock_balances (variant_id, qty) VALUES (NEW.variant_id, 0);
+  UPDATE stock_balances
+     SET qty = qty + (CASE WHEN NEW.move_type = 'OUT' THEN -NEW.qty ELSE NEW.qty END),
+         updated_at = datetime('now')
+   WHERE variant_id = NEW.variant_id;
+END;
+
+-- =====================
+-- SALDO POR PRODUTO (soma das variações ativas) + mínimo
+-- Espelha products.stock_min/is_active e é mantido por triggers, permitindo
+-- listar "abaixo do mínimo" pelo índice parcial (custo proporcional aos alertas).
+-- =====================
+CREATE TABLE IF NOT EXISTS product_balances (
+  product_id INTEGER PRIMARY KEY,
+  qty INTEGER NOT NULL DEFAULT 0,
+  stock_min INTEGER NOT NULL DEFAULT 0,
+  is_active INTEGER NOT NULL DEFAULT 1,
+  FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_product_balances_low
+  ON product_balances(product_id)
+  WHERE is_active = 1 AND qty < stock_min;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_balance_ins
+AFTER INSERT ON products
+BEGIN
+  INSERT OR IGNORE INTO product_balances (product_id, qty, stock_min, is_active)
+  VALUES (NEW.id, 0, NEW.stock_min, NEW.is_active);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_balance_upd
+AFTER UPDATE OF stock_min, is_active ON products
+BEGIN
+  UPDATE product_balances
+     SET stock_min = NEW.stock_min,
+         is_active = NEW.is_active
+   WHERE product_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_balances_product_ins
+AFTER INSERT ON stock_balances
+BEGIN
+  UPDATE product_balances
+     SET qty = qty + NEW.qty
+   WHERE product_id = (SELECT product_id FROM product_variants WHERE id = NEW.variant_id AND is_active = 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_balances_product_upd
+AFTER UPDATE OF qty ON stock_balances
+BEGIN
+  UPDATE product_balances
+     SET qty = qty + NEW.qty - OLD.qty
+   WHERE product_id = (SELECT product_id FROM product_variants WHERE id = NEW.variant_id AND is_active = 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_balances_product_del
+AFTER DELETE ON stock_balances
+BEGIN
+  UPDATE product_balances
+     SET qty = qty - OLD.qty
+   WHERE product_id = (SELECT product_id FROM product_variants WHERE id = OLD.variant_id AND is_active = 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_variants_product_balance_upd
+AFTER UPDATE OF is_active, product_id ON product_variants
+BEGIN
+  UPDATE product_balances
+     SET qty = qty - COALESCE((SELECT qty FROM stock_balances WHERE variant_id = OLD.id), 0)
+   WHERE product_id = OLD.product_id AND OLD.is_active = 1;
+  UPDATE product_balances
+     SET qty = qty + COALESCE((SELECT qty FROM stock_balances WHERE variant_id = NEW.id), 0)
+   WHERE product_id = NEW.product_id AND NEW.is_active = 1;
+END;
+
+-- =====================
+-- DEMANDA (reposição)
+-- Média móvel exponencial da demanda diária por variação (saídas de VENDA),
+-- atualizada incrementalmente a partir de stock_moves.
+-- avg_daily está "posicionada" em last_day; o decaimento até hoje é aplicado no refresh.
+-- =====================
+CREATE TABLE IF NOT EXISTS variant_demand (
+  variant_id INTEGER PRIMARY KEY,
+  avg_daily REAL NOT NULL DEFAULT 0,
+  last_day TEXT NOT NULL,
+  updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY (variant_id) REFERENCES product_variants(id) ON DELETE CASCADE
+);
+
+-- =====================
+-- SNAPSHOTS DE ESTOQUE (checkpoints de fechamento)
+-- stock_snapshots guarda o saldo por variação ao FINAL de snapshot_date
+-- (todos os movimentos com move_date <= snapshot_date). Variações com saldo 0
+-- não são gravadas. Movimentos retroativos invalidam os checkpoints afetados
+-- (triggers abaixo); eles são recriados sob demanda.
+-- =====================
+CREATE TABLE IF NOT EXISTS stock_checkpoints (
+  snapshot_date TEXT PRIMARY KEY,
+  created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS stock_snapshots (
+  snapshot_date TEXT NOT NULL,
+  variant_id INTEGER NOT NULL,
+  qty INTEGER NOT NULL,
+  PRIMARY KEY (snapshot_date, variant_id),
+  FOREIGN KEY (snapshot_date) REFERENCES stock_checkpoints(snapshot_date) ON DELETE CASCADE,
+  FOREIGN KEY (variant_id) REFERENCES product_variants(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_checkpoint_ins
+AFTER INSERT ON stock_moves
+BEGIN
+  DELETE FROM stock_snapshots WHERE snapshot_date >= NEW.move_date;
+  DELETE FROM stock_checkpoints WHERE snapshot_date >= NEW.move_date;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_checkpoint_del
+AFTER DELETE ON stock_moves
+BEGIN
+  DELETE FROM stock_snapshots WHERE snapshot_date >= OLD.move_date;
+  DELETE FROM stock_checkpoints WHERE snapshot_date >= OLD.move_date;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_checkpoint_upd
+AFTER UPDATE OF move_date, variant_id, move_type, qty ON stock_moves
+BEGIN
+  DELETE FROM stock_snapshots WHERE snapshot_date >= MIN(OLD.move_date, NEW.move_date);
+  DELETE FROM stock_checkpoints WHERE snapshot_date >= MIN(OLD.move_date, NEW.move_date);
+END;
+
+-- =====================
+-- VERSÃO DO INVENTÁRIO (invalidação de caches de valorização)
+-- Incrementada a cada mudança de saldo, custo ou cadastro que afete o
+-- valor em estoque; caches comparam a versão antes de reutilizar o resultado.
+-- =====================
+INSERT OR IGNORE INTO app_meta (key, value) VALUES ('inventory_version', '0');
+
+CREATE TRIGGER IF NOT EXISTS trg_inventory_version_balance_ins
+AFTER INSERT ON stock_balances
+BEGIN
+  UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'inventory_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_inventory_version_balance_upd
+AFTER UPDATE OF qty ON stock_balances
+BEGIN
+  UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'inventory_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_inventory_version_balance_del
+AFTER DELETE ON stock_balances
+BEGIN
+  UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'inventory_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_inventory_version_products_upd
+AFTER UPDATE ON products
+BEGIN
+  UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'inventory_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_inventory_version_variants_upd
+AFTER UPDATE ON product_variants
+BEGIN
+  UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'inventory_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_inventory_version_categories_upd
+AFTER UPDATE ON categories
+BEGIN
+  UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'inventory_version';
+END;
+
+-- =====================
+-- HISTÓRICO POR VARIAÇÃO (flag "já teve movimento ou venda")
+-- Uma linha por variação com histórico, gravada no primeiro movimento/item
+-- de venda. É "pegajosa": apagar movimentos não remove a flag (decisões de
+-- excluir/inativar ficam do lado seguro). Reconstrução:
+-- VariantRepository.rebuild_history_flags.
+-- =====================
+CREATE TABLE IF NOT EXISTS variant_history (
+  variant_id INTEGER PRIMARY KEY,
+  FOREIGN KEY (variant_id) REFERENCES product_variants(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_history_ins
+AFTER INSERT ON stock_moves
+BEGIN
+  INSERT OR IGNORE INTO variant_history (variant_id) VALUES (NEW.variant_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_history_upd
+AFTER UPDATE OF variant_id ON stock_moves
+BEGIN
+  INSERT OR IGNORE INTO variant_history (variant_id) VALUES (NEW.variant_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sale_items_history_ins
+AFTER INSERT ON sale_items
+BEGIN
+  INSERT OR IGNORE INTO variant_history (variant_id) VALUES (NEW.variant_id);
+END;
+
+-- =====================
+-- RESERVAS (vendido e ainda não enviado, por variação)
+-- A venda baixa o estoque (OUT) na criação; enquanto está A_ENVIAR as
+-- saídas ref_type='SALE' continuam fisicamente na prateleira e são somadas
+-- aqui. Assim:
+--   disponível = stock_balances.qty
+--   reservado  = stock_reservations.qty
+--   físico     = disponível + reservado
+-- Mantida pelos triggers abaixo (movimentos da venda e mudança de status,
+-- inclusive o CANCELADO gravado por cancel_sale). Reconstrução:
+-- StockBalanceRepository.rebuild_reservations.
+-- =====================
+CREATE TABLE IF NOT EXISTS stock_reservations (
+  variant_id INTEGER PRIMARY KEY,
+  qty INTEGER NOT NULL DEFAULT 0,
+  FOREIGN KEY (variant_id) REFERENCES product_variants(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_reservation_ins
+AFTER INSERT ON stock_moves
+WHEN NEW.ref_type = 'SALE' AND NEW.move_type = 'OUT'
+BEGIN
+  INSERT INTO stock_reservations (variant_id, qty)
+  SELECT NEW.variant_id, NEW.qty
+   WHERE EXISTS (SELECT 1 FROM sales WHERE id = NEW.ref_id AND status = 'A_ENVIAR')
+  ON CONFLICT(variant_id) DO UPDATE SET qty = qty + excluded.qty;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_reservation_del
+AFTER DELETE ON stock_moves
+WHEN OLD.ref_type = 'SALE' AND OLD.move_type = 'OUT'
+BEGIN
+  UPDATE stock_reservations
+     SET qty = qty - OLD.qty
+   WHERE variant_id = OLD.variant_id
+     AND EXISTS (SELECT 1 FROM sales WHERE id = OLD.ref_id AND status = 'A_ENVIAR');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stock_moves_reservation_upd
+AFTER UPDATE OF variant_id, move_type, qty, ref_type, ref_id ON stock_moves
+WHEN (OLD.ref_type = 'SALE' AND OLD.move_type = 'OUT')
+  OR (NEW.ref_type = 'SALE' AND NEW.move_type = 'OUT')
+BEGIN
+  UPDATE stock_reservations
+     SET qty = qty - OLD.qty
+   WHERE variant_id = OLD.variant_id
+     AND OLD.ref_type = 'SALE' AND OLD.move_type = 'OUT'
+     AND EXISTS (SELECT 1 FROM sales WHERE id = OLD.ref_id AND status = 'A_ENVIAR');
+  INSERT INTO stock_reservations (variant_id, qty)
+  SELECT NEW.variant_id, NEW.qty
+   WHERE NEW.ref_type = 'SALE' AND NEW.move_type = 'OUT'
+     AND EXISTS (SELECT 1 FROM sales WHERE id = NEW.ref_id AND status = 'A_ENVIAR')
+  ON CONFLICT(variant_id) DO UPDATE SET qty = qty + excluded.qty;
+END;
+
+-- saiu de A_ENVIAR (enviado, concluído, cancelado): libera a reserva
+CREATE TRIGGER IF NOT EXISTS trg_sales_reservation_release
+AFTER UPDATE OF status ON sales
+WHEN OLD.status = 'A_ENVIAR' AND NEW.status <> 'A_ENVIAR'
+BEGIN
+  INSERT INTO stock_reservations (variant_id, qty)
+  SELECT variant_id, -SUM(qty)
+    FROM stock_moves
+   WHERE ref_type = 'SALE' AND ref_id = NEW.id AND move_type = 'OUT'
+   GROUP BY variant_id
+  ON CONFLICT(variant_id) DO UPDATE SET qty = qty + excluded.qty;
+END;
+
+-- voltou para A_ENVIAR: reserva de novo
+CREATE TRIGGER IF NOT EXISTS trg_sales_reservation_hold
+AFTER UPDATE OF status ON sales
+WHEN OLD.status <> 'A_ENVIAR' AND NEW.status = 'A_ENVIAR'
+BEGIN
+  INSERT INTO stock_reservations (variant_id, qty)
+  SELECT variant_id, SUM(qty)
+    FROM stock_moves
+   WHERE ref_type = 'SALE' AND ref_id = NEW.id AND move_type = 'OUT'
+   GROUP BY variant_id
+  ON CONFLICT(variant_id) DO UPDATE SET qty = qty + excluded.qty;
+END;
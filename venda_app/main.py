@@ -8,7 +8,11 @@ definida em `ui.dashboard`. Para iniciar a aplicação execute:
 python3 main.py
 ```
 """
-from .ui.dashboard import run_app
+import time
+
+_STARTED_AT = time.perf_counter()
+
+from .ui.dashboard import run_app  # noqa: E402  (import medido no relatório de inicialização)
 
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    run_app(started_at=_STARTED_AT)
\ No newline at end of file
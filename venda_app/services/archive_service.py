@@ -0,0 +1,609 @@
+"""venda_app.services.archive_service
+
+Arquivo de períodos fechados: tira do banco principal as vendas, itens e
+movimentos antigos, para que varreduras, backups e o VACUUM fiquem no
+tamanho do movimento recente.
+
+Regras de `archive_period(conn, cutoff)`:
+  - Vão para o arquivo as vendas com sale_date <= cutoff que não estão
+    A_ENVIAR (a reserva continua valendo) e cujos movimentos também são
+    <= cutoff, com seus itens e movimentos (SALE e SALE_CANCEL); e os
+    demais movimentos com move_date <= cutoff.
+  - Cada linha vai para `archive_YYYY.db` (ano da data), na pasta do
+    banco principal. Ids são preservados; a cópia usa INSERT OR REPLACE,
+    então repetir um arquivamento interrompido não duplica nada.
+  - No banco principal fica, por variação, a abertura ADJ SALDO_INICIAL
+    em `cutoff` (ref_type ARCHIVE): uma linha por camada de custo que
+    sobra em FIFO (normalmente uma), somando o que saiu. Saldos
+    materializados (stock_balances, product_balances) não mudam: os
+    triggers somam a abertura e descontam os movimentos apagados. O
+    saldo do razão (get_variant_stock_levels) é conferido antes do commit.
+  - SALDO_INICIAL anteriores (de arquivamentos passados) entram na nova
+    abertura e não são copiados: o arquivo guarda só o detalhe real.
+  - app_meta.archive_cutoff guarda a data; saldo em data anterior
+    (get_stock_as_of, valorização com as_of) passa a ser recusado.
+
+`compact_ledger(conn, cutoff)` faz o mesmo só com stock_moves (vendas e
+itens continuam no banco principal), guardando o detalhe no arquivo
+(keep_detail=True) ou descartando-o.
+
+Leitura: `attached_archives(conn, date_from, date_to)` anexa (ATTACH) os
+arquivos dos anos pedidos que estão antes do corte e devolve os schemas a
+consultar ("main", "arch_2023", ...); `union_sql` monta o UNION ALL. É o
+que `reports_service.get_financial_summary` usa para períodos antigos.
+
+ATTACH não pode ocorrer dentro de transação: a cópia para cada arquivo é
+confirmada antes da limpeza do banco principal (uma transação só). Como
+outras conexões (API, WriteQueue) podem gravar no meio, a limpeza
+seleciona de novo os candidatos já com a trava de escrita e compara o
+conteúdo (hash das linhas) com o que foi copiado; se mudou (ex: venda
+cancelada entre a cópia e a limpeza), nada é apagado, as cópias desta
+rodada saem do arquivo e a operação levanta ValueError (basta repetir).
+Quem chama não pode ter transação aberta.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import sqlite3
+
+from ..db.database import tuple_cursor
+from ..utils.logger import logger
+from ..utils.metrics import timed
+from .inventory_service import get_variant_stock_levels
+
+
+ARCHIVED_TABLES = ("sales", "sale_items", "stock_moves")
+OPENING_REASON = "SALDO_INICIAL"
+OPENING_REF_TYPE = "ARCHIVE"
+
+_META_CUTOFF = "archive_cutoff"
+_ARCHIVE_FILE = re.compile(r"^archive_(\d{4})\.db$")
+
+# Índices do arquivo (consultas por período)
+_ARCHIVE_INDEXES = {
+    "sales": "sale_date",
+    "sale_items": "sale_id",
+    "stock_moves": "move_date",
+}
+
+
+def _db_dir(conn: sqlite3.Connection) -> Path:
+    for row in conn.execute("PRAGMA database_list"):
+        if row[1] == "main":
+            if not row[2]:
+                raise ValueError("Arquivamento exige banco em arquivo (não em memória)")
+            return Path(row[2]).parent
+    raise ValueError("Banco principal não encontrado")
+
+
+def archive_path(conn: sqlite3.Connection, year: int) -> Path:
+    """Arquivo de um ano, ao lado do banco principal."""
+    return _db_dir(conn) / f"archive_{int(year)}.db"
+
+
+def list_archives(conn: sqlite3.Connection) -> Dict[int, Path]:
+    """Anos com arquivo existente -> caminho."""
+    found = {}
+    for path in sorted(_db_dir(conn).glob("archive_*.db")):
+        m = _ARCHIVE_FILE.match(path.name)
+        if m:
+            found[int(m.group(1))] = path
+    return found
+
+
+def get_archive_cutoff(conn: sqlite3.Connection) -> Optional[str]:
+    """Última data arquivada (None se nunca arquivou)."""
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (_META_CUTOFF,)).fetchone()
+    return row[0] if row else None
+
+
+def check_live_date(conn: sqlite3.Connection, as_of: str) -> None:
+    """Levanta ValueError se o saldo em `as_of` depende de detalhe já arquivado."""
+    cutoff = get_archive_cutoff(conn)
+    if cutoff and as_of < cutoff:
+        raise ValueError(f"Saldo anterior a {cutoff} está arquivado")
+
+
+def _attach(conn: sqlite3.Connection, path: Path, schema: str) -> None:
+    conn.execute("ATTACH DATABASE ? AS " + schema, (str(path),))
+
+
+def _detach(conn: sqlite3.Connection, schema: str) -> None:
+    conn.execute("DETACH DATABASE " + schema)
+
+
+def _ensure_archive_tables(conn: sqlite3.Connection, schema: str) -> None:
+    """Cria/completa as tabelas do arquivo com as colunas atuais do banco principal (sem FKs/triggers)."""
+    for table in ARCHIVED_TABLES:
+        columns = [(r[1], r[2]) for r in conn.execute(f"PRAGMA main.table_info({table})")]
+        existing = {r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})")}
+        if not existing:
+            cols = ", ".join("id INTEGER PRIMARY KEY" if name == "id" else f"{name} {ctype}" for name, ctype in columns)
+            conn.execute(f"CREATE TABLE {schema}.{table} ({cols})")
+        else:
+            for name, ctype in columns:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {name} {ctype}")
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_{_ARCHIVE_INDEXES[table]} "
+            f"ON {table}({_ARCHIVE_INDEXES[table]})"
+        )
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> str:
+    return ", ".join(r[1] for r in conn.execute(f"PRAGMA main.table_info({table})"))
+
+
+def _select_candidates(conn: sqlite3.Connection, cutoff: str) -> None:
+    """Preenche temp.archive_sales / temp.archive_moves com o que vai sair do banco principal."""
+    conn.execute("DROP TABLE IF EXISTS temp.archive_sales")
+    conn.execute("DROP TABLE IF EXISTS temp.archive_moves")
+    conn.execute(
+        """
+        CREATE TEMP TABLE archive_sales AS
+        SELECT s.id, CAST(substr(s.sale_date, 1, 4) AS INTEGER) AS year
+          FROM sales s
+         WHERE s.sale_date <= :cutoff
+           AND s.status <> 'A_ENVIAR'
+           AND NOT EXISTS (
+                SELECT 1 FROM stock_moves m
+                 WHERE m.ref_type IN ('SALE', 'SALE_CANCEL')
+                   AND m.ref_id = s.id
+                   AND m.move_date > :cutoff
+           )
+        """,
+        {"cutoff": cutoff},
+    )
+    conn.execute("CREATE UNIQUE INDEX temp.idx_archive_sales ON archive_sales(id)")
+    conn.execute(
+        """
+        CREATE TEMP TABLE archive_moves AS
+        SELECT m.id, CAST(substr(m.move_date, 1, 4) AS INTEGER) AS year,
+               (m.ref_type = :opening_ref AND m.reason = :opening_reason) AS is_opening
+          FROM stock_moves m
+         WHERE m.move_date <= :cutoff
+           AND (
+                COALESCE(m.ref_type, '') NOT IN ('SALE', 'SALE_CANCEL')
+                OR m.ref_id IN (SELECT id FROM temp.archive_sales)
+           )
+        """,
+        {"cutoff": cutoff, "opening_ref": OPENING_REF_TYPE, "opening_reason": OPENING_REASON},
+    )
+    conn.execute("CREATE UNIQUE INDEX temp.idx_archive_moves ON archive_moves(id)")
+
+
+def _copy_year(conn: sqlite3.Connection, year: int, with_sales: bool = True) -> Dict[str, int]:
+    schema = f"arch_{year}"
+    _attach(conn, archive_path(conn, year), schema)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _ensure_archive_tables(conn, schema)
+            copied = {}
+            if with_sales:
+                cols = _columns(conn, "sales")
+                copied["sales"] = conn.execute(
+                    f"""
+                    INSERT OR REPLACE INTO {schema}.sales ({cols})
+                    SELECT {cols} FROM main.sales
+                     WHERE id IN (SELECT id FROM temp.archive_sales WHERE year = ?)
+                    """,
+                    (year,),
+                ).rowcount
+                cols = _columns(conn, "sale_items")
+                copied["sale_items"] = conn.execute(
+                    f"""
+                    INSERT OR REPLACE INTO {schema}.sale_items ({cols})
+                    SELECT {cols} FROM main.sale_items
+                     WHERE sale_id IN (SELECT id FROM temp.archive_sales WHERE year = ?)
+                    """,
+                    (year,),
+                ).rowcount
+            cols = _columns(conn, "stock_moves")
+            copied["stock_moves"] = conn.execute(
+                f"""
+                INSERT OR REPLACE INTO {schema}.stock_moves ({cols})
+                SELECT {cols} FROM main.stock_moves
+                 WHERE id IN (SELECT id FROM temp.archive_moves WHERE year = ? AND NOT is_opening)
+                """,
+                (year,),
+            ).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        _detach(conn, schema)
+    return copied
+
+
+def _uncopy_years(conn: sqlite3.Connection, years: Iterable[int], with_sales: bool = True) -> None:
+    """Tira dos arquivos as linhas que continuam no banco principal (cópias de uma rodada desfeita)."""
+    tables = ARCHIVED_TABLES if with_sales else ("stock_moves",)
+    for year in years:
+        schema = f"arch_{year}"
+        _attach(conn, archive_path(conn, year), schema)
+        try:
+            with conn:
+                for table in tables:
+                    conn.execute(f"DELETE FROM {schema}.{table} WHERE id IN (SELECT id FROM main.{table})")
+        finally:
+            _detach(conn, schema)
+
+
+def _candidate_digest(conn: sqlite3.Connection, with_sales: bool = True) -> str:
+    """Hash das linhas candidatas (ids e conteúdo): muda se outra conexão gravou nelas."""
+    queries = [("stock_moves", "SELECT * FROM stock_moves WHERE id IN (SELECT id FROM temp.archive_moves) ORDER BY id")]
+    if with_sales:
+        queries += [
+            ("sales", "SELECT * FROM sales WHERE id IN (SELECT id FROM temp.archive_sales) ORDER BY id"),
+            ("sale_items", "SELECT * FROM sale_items WHERE sale_id IN (SELECT id FROM temp.archive_sales) ORDER BY id"),
+        ]
+    digest = hashlib.sha1()
+    cur = tuple_cursor(conn)
+    for table, sql in queries:
+        digest.update(table.encode())
+        for row in cur.execute(sql):
+            digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def _reselect_unchanged(conn: sqlite3.Connection, cutoff: str, digest: str, with_sales: bool = True) -> None:
+    """Já com a trava de escrita: os candidatos ainda são os que foram copiados?"""
+    _select_candidates(conn, cutoff)
+    if _candidate_digest(conn, with_sales) != digest:
+        raise ValueError(
+            "O período mudou durante a operação (gravação de outra conexão); "
+            "nada foi apagado, tente de novo"
+        )
+
+
+# Movimentos que saem, na ordem em que as camadas de custo se formaram
+_LAYER_MOVES_SQL = """
+    SELECT m.variant_id, m.move_type, m.qty, m.unit_cost
+      FROM stock_moves m
+      JOIN temp.archive_moves a ON a.id = m.id
+     ORDER BY m.variant_id, m.move_date, m.id
+"""
+
+
+def _fifo_layers(moves: Iterable[Tuple[str, int, float]]) -> List[Tuple[int, float]]:
+    """Camadas (qtd, custo) que sobram de uma variação consumindo as saídas em FIFO.
+
+    Entradas (IN, ADJ positivo) abrem camadas; saídas (OUT, ADJ negativo)
+    consomem as mais antigas. Saída sem camada vira déficit, coberto pela
+    próxima entrada; se sobrar, volta como uma camada negativa.
+    Soma das quantidades = saldo líquido dos movimentos.
+    """
+    layers: Deque[List[Any]] = deque()
+    deficit = 0
+    last_cost = 0.0
+    for move_type, qty, unit_cost in moves:
+        signed = -int(qty) if move_type == "OUT" else int(qty)
+        if signed > 0:
+            last_cost = float(unit_cost or 0)
+            covered = min(deficit, signed)
+            deficit -= covered
+            signed -= covered
+            if signed:
+                layers.append([signed, last_cost])
+        elif signed < 0:
+            need = -signed
+            while need and layers:
+                take = min(need, layers[0][0])
+                layers[0][0] -= take
+                need -= take
+                if not layers[0][0]:
+                    layers.popleft()
+            deficit += need
+
+    merged: List[Tuple[int, float]] = []
+    for qty, cost in layers:
+        if merged and abs(merged[-1][1] - cost) < 1e-9:
+            merged[-1] = (merged[-1][0] + qty, cost)
+        else:
+            merged.append((qty, cost))
+    if deficit:
+        merged.append((-deficit, last_cost))
+    return merged
+
+
+def _opening_layers(conn: sqlite3.Connection) -> List[Tuple[int, int, float]]:
+    """(variant_id, qtd, custo) das aberturas que substituem temp.archive_moves."""
+    cur = tuple_cursor(conn)
+    cur.execute(_LAYER_MOVES_SQL)
+    openings: List[Tuple[int, int, float]] = []
+    for variant_id, rows in groupby(cur, key=itemgetter(0)):
+        for qty, cost in _fifo_layers(r[1:] for r in rows):
+            openings.append((int(variant_id), qty, cost))
+    return openings
+
+
+def _insert_openings(conn: sqlite3.Connection, cutoff: str, openings: List[Tuple[int, int, float]], note: str) -> None:
+    conn.executemany(
+        """
+        INSERT INTO stock_moves (move_date, variant_id, move_type, reason, qty, unit_cost, ref_type, ref_id, notes)
+        VALUES (?, ?, 'ADJ', ?, ?, ?, ?, NULL, ?)
+        """,
+        [
+            (cutoff, variant_id, OPENING_REASON, qty, round(cost, 4), OPENING_REF_TYPE, note)
+            for variant_id, qty, cost in openings
+        ],
+    )
+
+
+def _set_cutoff(conn: sqlite3.Connection, cutoff: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO app_meta (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """,
+        (_META_CUTOFF, cutoff),
+    )
+
+
+def _verify_levels(conn: sqlite3.Connection, before: Dict[int, int]) -> None:
+    """Saldo do razão (get_variant_stock_levels) e o materializado têm de bater com `before`."""
+    after = get_variant_stock_levels(conn)
+    changed = [vid for vid in set(before) | set(after) if before.get(vid, 0) != after.get(vid, 0)]
+    balances = dict(conn.execute("SELECT variant_id, qty FROM stock_balances").fetchall())
+    drift = [vid for vid, qty in after.items() if balances.get(vid, 0) != qty]
+    if changed or drift:
+        raise ValueError(
+            f"Verificação falhou: saldo mudou em {len(changed)} variações, "
+            f"stock_balances divergente em {len(drift)}; nada foi gravado"
+        )
+
+
+def _check_cutoff(conn: sqlite3.Connection, cutoff: str) -> str:
+    cutoff = date.fromisoformat(cutoff).isoformat()
+    if cutoff >= date.today().isoformat():
+        raise ValueError("Só períodos fechados (data de corte anterior a hoje) podem ser arquivados")
+    previous = get_archive_cutoff(conn)
+    if previous and cutoff < previous:
+        raise ValueError(f"Já arquivado até {previous}")
+    if conn.in_transaction:
+        raise ValueError("Arquivamento não pode rodar com transação aberta na conexão (faça commit antes)")
+    return cutoff
+
+
+def _drop_candidates(conn: sqlite3.Connection) -> None:
+    conn.execute("DROP TABLE IF EXISTS temp.archive_sales")
+    conn.execute("DROP TABLE IF EXISTS temp.archive_moves")
+
+
+@timed()
+def archive_period(conn: sqlite3.Connection, cutoff: str, dry_run: bool = False) -> Dict[str, Any]:
+    """Arquiva vendas/itens/movimentos até `cutoff` (inclusive), ver regras no módulo.
+
+    Args:
+        cutoff: último dia do período fechado (YYYY-MM-DD), anterior a hoje
+            e não anterior a um arquivamento já feito.
+        dry_run: só conta o que sairia (nada é gravado).
+
+    Returns:
+        {"cutoff", "years", "sales", "sale_items", "stock_moves", "openings"}
+    """
+    started = time.perf_counter()
+    cutoff = _check_cutoff(conn, cutoff)
+
+    _select_candidates(conn, cutoff)
+    try:
+        years = [r[0] for r in conn.execute("SELECT year FROM temp.archive_sales UNION SELECT year FROM temp.archive_moves WHERE NOT is_opening ORDER BY 1")]
+        counts = {
+            "sales": conn.execute("SELECT COUNT(1) FROM temp.archive_sales").fetchone()[0],
+            "sale_items": conn.execute(
+                "SELECT COUNT(1) FROM sale_items WHERE sale_id IN (SELECT id FROM temp.archive_sales)"
+            ).fetchone()[0],
+            "stock_moves": conn.execute("SELECT COUNT(1) FROM temp.archive_moves WHERE NOT is_opening").fetchone()[0],
+        }
+        openings = _opening_layers(conn)
+        result: Dict[str, Any] = {"cutoff": cutoff, "years": years, **counts, "openings": len(openings)}
+        if dry_run:
+            return result
+
+        digest = _candidate_digest(conn)
+        copied_years: List[int] = []
+        committed = False
+        try:
+            for year in years:
+                copied_years.append(year)
+                copied = _copy_year(conn, year)
+                logger.info("Arquivo %d: %s", year, copied, extra={"operation": "archive_period"})
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                _reselect_unchanged(conn, cutoff, digest)
+                before = get_variant_stock_levels(conn)
+                conn.execute("DELETE FROM stock_moves WHERE id IN (SELECT id FROM temp.archive_moves)")
+                conn.execute("DELETE FROM sales WHERE id IN (SELECT id FROM temp.archive_sales)")  # itens: ON DELETE CASCADE
+                _insert_openings(conn, cutoff, openings, f"Saldo até {cutoff} (arquivo)")
+                _verify_levels(conn, before)
+                _set_cutoff(conn, cutoff)
+                conn.commit()
+                committed = True
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            if not committed:
+                _uncopy_years(conn, copied_years)
+    finally:
+        _drop_candidates(conn)
+
+    logger.info(
+        "Período arquivado até %s (%d vendas, %d movimentos)",
+        cutoff,
+        counts["sales"],
+        counts["stock_moves"],
+        extra={
+            "operation": "archive_period",
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+        },
+    )
+    return result
+
+
+@timed()
+def compact_ledger(
+    conn: sqlite3.Connection,
+    cutoff: str,
+    keep_detail: bool = True,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Resume os movimentos até `cutoff` em aberturas SALDO_INICIAL por camada de custo.
+
+    Diferente de `archive_period`, as vendas e itens ficam no banco
+    principal; só o razão (stock_moves) é compactado, com os mesmos
+    critérios (vendas A_ENVIAR ou com movimento depois do corte ficam
+    inteiras). Cada variação fica com uma abertura por camada FIFO
+    restante (qtd e custo), normalmente uma só.
+
+    Args:
+        keep_detail: copia os movimentos para archive_YYYY.db antes de
+            apagar (relatórios de compras do período continuam via ATTACH).
+            False descarta o detalhe e é recusado se houver compras (IN
+            COMPRA) no período: elas são as despesas de estoque do resumo
+            financeiro, que mudaria sem aviso.
+        dry_run: só conta o que sairia (nada é gravado).
+
+    O saldo por variação (`get_variant_stock_levels`) é conferido antes e
+    depois, dentro da transação; se mudar, tudo é desfeito.
+
+    Returns:
+        {"cutoff", "years", "stock_moves", "variants", "purchases", "openings", "kept_detail"}
+    """
+    started = time.perf_counter()
+    cutoff = _check_cutoff(conn, cutoff)
+
+    _select_candidates(conn, cutoff)
+    try:
+        years = [r[0] for r in conn.execute("SELECT DISTINCT year FROM temp.archive_moves WHERE NOT is_opening ORDER BY 1")]
+        moves, variants, purchases = conn.execute(
+            """
+            SELECT COUNT(1), COUNT(DISTINCT m.variant_id),
+                   COALESCE(SUM(m.move_type = 'IN' AND UPPER(m.reason) = 'COMPRA'), 0)
+              FROM stock_moves m
+              JOIN temp.archive_moves a ON a.id = m.id
+            """
+        ).fetchone()
+        if purchases and not keep_detail:
+            raise ValueError(
+                f"{purchases} compras (IN COMPRA) até {cutoff} contam como despesa nos relatórios; "
+                "descartar o detalhe mudaria o resultado desses períodos. Compacte guardando o detalhe."
+            )
+        openings = _opening_layers(conn)
+        result: Dict[str, Any] = {
+            "cutoff": cutoff,
+            "years": years if keep_detail else [],
+            "stock_moves": moves,
+            "variants": variants,
+            "purchases": purchases,
+            "openings": len(openings),
+            "kept_detail": keep_detail,
+        }
+        if dry_run:
+            return result
+
+        digest = _candidate_digest(conn, with_sales=False)
+        copied_years: List[int] = []
+        committed = False
+        try:
+            if keep_detail:
+                for year in years:
+                    copied_years.append(year)
+                    copied = _copy_year(conn, year, with_sales=False)
+                    logger.info("Arquivo %d: %s", year, copied, extra={"operation": "compact_ledger"})
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                _reselect_unchanged(conn, cutoff, digest, with_sales=False)
+                before = get_variant_stock_levels(conn)
+                conn.execute("DELETE FROM stock_moves WHERE id IN (SELECT id FROM temp.archive_moves)")
+                _insert_openings(conn, cutoff, openings, f"Saldo compactado até {cutoff}")
+                _verify_levels(conn, before)
+                _set_cutoff(conn, cutoff)
+                conn.commit()
+                committed = True
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            if not committed:
+                _uncopy_years(conn, copied_years, with_sales=False)
+    finally:
+        _drop_candidates(conn)
+
+    logger.info(
+        "Razão compactado até %s (%d movimentos -> %d aberturas)",
+        cutoff,
+        moves,
+        len(openings),
+        extra={
+            "operation": "compact_ledger",
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+        },
+    )
+    return result
+
+
+# =========================
+# LEITURA (ATTACH sob demanda)
+# =========================
+
+
+@contextmanager
+def attached_archives(conn: sqlite3.Connection, date_from: str, date_to: str) -> Iterator[List[str]]:
+    """Anexa os arquivos necessários para o período e devolve os schemas a consultar.
+
+    Sem arquivamento (ou período todo depois do corte) devolve só ["main"]
+    e não anexa nada. Os arquivos são desanexados na saída do bloco.
+    """
+    cutoff = get_archive_cutoff(conn)
+    if not cutoff or date_from > cutoff:
+        yield ["main"]
+        return
+
+    first, last = int(date_from[:4]), int(min(date_to, cutoff)[:4])
+    attached: List[str] = []
+    try:
+        for year, path in list_archives(conn).items():
+            if first <= year <= last:
+                schema = f"arch_{year}"
+                _attach(conn, path, schema)
+                attached.append(schema)
+        yield ["main", *attached]
+    finally:
+        for schema in attached:
+            _detach(conn, schema)
+
+
+def union_sql(schemas: Sequence[str], select: str) -> str:
+    """Repete `select` (com `{db}` no lugar do schema) unindo com UNION ALL."""
+    return "\nUNION ALL\n".join(select.format(db=schema) for schema in schemas)
+
+
+__all__ = [
+    "ARCHIVED_TABLES",
+    "OPENING_REASON",
+    "OPENING_REF_TYPE",
+    "archive_path",
+    "archive_period",
+    "attached_archives",
+    "check_live_date",
+    "compact_ledger",
+    "get_archive_cutoff",
+    "list_archives",
+    "union_sql",
+]
@@ -0,0 +1,155 @@
+"""venda_app.services.async_service
+
+Fachada asyncio sobre os serviços (que são síncronos e recebem uma
+`sqlite3.Connection`), para integrações assíncronas (robôs de marketplace,
+webhooks) não travarem o event loop.
+
+Execução:
+  - Gravações vão para a `WriteQueue` (db.pool): uma conexão, uma thread,
+    em série. `await` espera o commit. Vendas, cancelamentos e mudanças
+    de status usam o group commit da fila: chamadas concorrentes dividem
+    um COMMIT, mas cada uma tem seu SAVEPOINT e seu próprio resultado/erro.
+  - Leituras rodam num ThreadPoolExecutor próprio, cada chamada com uma
+    conexão emprestada do `ReaderPool` (WAL: não esperam o escritor).
+  - `write_batch` junta várias gravações pequenas numa única transação
+    (um commit); tudo ou nada. As funções do lote precisam aceitar
+    `commit=False` (create_sale, cancel_sale, update_sale_status...).
+
+Cancelar a corrotina de uma gravação só a tira da fila se ela ainda não
+começou; depois disso a gravação termina normalmente.
+
+Uso:
+    async with AsyncServices(db_path) as svc:
+        sale_id = await svc.create_sale(sale_date=..., channel="ML", items=[...])
+        resumo = await svc.get_financial_summary("2025-01-01", "2025-01-31")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import sqlite3
+
+from ..db.database import init_db
+from ..db.pool import ReaderPool, WriteQueue
+from .inventory_service import get_stock_table_rows, get_variant_stock_by_sku, list_products_below_min
+from .reports_service import get_financial_summary
+from .sales_service import cancel_sale, create_sale, update_sale_status
+
+
+# (função, args, kwargs) de uma gravação dentro de um lote
+WriteCall = Tuple[Callable[..., Any], tuple, Dict[str, Any]]
+
+
+def _run_batch(conn: sqlite3.Connection, calls: Sequence[WriteCall]) -> List[Any]:
+    """Executa as gravações numa transação só; qualquer erro desfaz o lote inteiro."""
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        results = [fn(conn, *args, commit=False, **kwargs) for fn, args, kwargs in calls]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results
+
+
+class AsyncServices:
+    """Serviços com `await`: escritor em série e leitores em paralelo."""
+
+    def __init__(self, db_path: Optional[Path] = None, readers: int = 4):
+        init_db(db_path=db_path)
+        self.writer = WriteQueue(db_path, name="venda-async-writer")
+        self.readers = ReaderPool(db_path, size=readers)
+        self._executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="venda-async-read")
+
+    async def __aenter__(self) -> "AsyncServices":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    # -------------------------
+    # execução
+    # -------------------------
+
+    def _read_call(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        with self.readers.connection() as conn:
+            return fn(conn, *args, **kwargs)
+
+    async def read(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Roda `fn(conn, ...)` numa thread de leitura."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._read_call, fn, args, kwargs))
+
+    async def write(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Enfileira `fn(conn, ...)` no escritor e espera o resultado."""
+        return await asyncio.wrap_future(self.writer.submit(fn, *args, **kwargs))
+
+    async def write_grouped(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Como `write`, pelo group commit (`fn` recebe `commit=False`)."""
+        return await asyncio.wrap_future(self.writer.submit_grouped(fn, *args, **kwargs))
+
+    async def write_batch(self, calls: Sequence[WriteCall]) -> List[Any]:
+        """Várias gravações numa transação (um commit); devolve os resultados na ordem."""
+        if not calls:
+            return []
+        return await self.write(_run_batch, list(calls))
+
+    # -------------------------
+    # vendas
+    # -------------------------
+
+    async def create_sale(self, **sale: Any) -> int:
+        """Mesmos argumentos de `sales_service.create_sale` (sem a conexão)."""
+        return await self.write_grouped(create_sale, **sale)
+
+    async def create_sales(self, sales: Sequence[Dict[str, Any]]) -> List[int]:
+        """Registra várias vendas num único commit (tudo ou nada)."""
+        return await self.write_batch([(create_sale, (), dict(sale)) for sale in sales])
+
+    async def cancel_sale(self, sale_id: int) -> None:
+        await self.write_grouped(cancel_sale, sale_id)
+
+    async def update_sale_status(self, sale_id: int, status: str) -> None:
+        await self.write_grouped(update_sale_status, sale_id, status)
+
+    # -------------------------
+    # consultas
+    # -------------------------
+
+    async def get_financial_summary(self, date_from: str, date_to: str) -> Dict[str, float]:
+        return await self.read(get_financial_summary, date_from, date_to)
+
+    async def get_stock_table_rows(self) -> List[Dict[str, Any]]:
+        rows = await self.read(get_stock_table_rows)
+        return [dict(r) for r in rows]
+
+    async def get_variant_stock(self, sku: str) -> Optional[Dict[str, Any]]:
+        row = await self.read(get_variant_stock_by_sku, sku)
+        return dict(row) if row is not None else None
+
+    async def list_products_below_min(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = await self.read(list_products_below_min, limit)
+        return [dict(r) for r in rows]
+
+    # -------------------------
+    # encerramento
+    # -------------------------
+
+    async def aclose(self) -> None:
+        """Espera as gravações pendentes e fecha conexões e threads."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
+
+    def close(self) -> None:
+        self.writer.close()
+        self._executor.shutdown(wait=True)
+        self.readers.close()
+
+
+__all__ = ["AsyncServices", "WriteCall"]
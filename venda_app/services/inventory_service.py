@@ -5,15 +5,20 @@ Serviços para cálculos de estoque.
 Regra do projeto:
   - Estoque é SEMPRE controlado por variação (product_variants).
   - Mesmo produtos sem variação têm uma variação "Única".
+  - Disponível = stock_balances; reservado (vendas A_ENVIAR) =
+    stock_reservations; físico = disponível + reservado.
 """
 
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
 import sqlite3
 
+from ..utils.metrics import timed
 
+
+@timed()
 def get_variant_stock_levels(conn: sqlite3.Connection) -> Dict[int, int]:
     """Retorna um mapa variant_id -> estoque atual."""
     query = """
@@ -37,69 +42,131 @@ def get_variant_stock_levels(conn: sqlite3.Connection) -> Dict[int, int]:
 
 
 def get_product_stock_levels(conn: sqlite3.Connection) -> Dict[int, int]:
-    """Retorna um mapa product_id -> estoque total (soma das variações ativas)."""
-    query = """
-        SELECT p.id AS product_id,
-               COALESCE(SUM(
-                   CASE
-                       WHEN sm.move_type = 'IN'  THEN sm.qty
-                       WHEN sm.move_type = 'OUT' THEN -sm.qty
-                       WHEN sm.move_type = 'ADJ' THEN sm.qty
-                       ELSE 0
-                   END
-               ), 0) AS stock
-          FROM products p
-          JOIN product_variants v ON v.product_id = p.id AND v.is_active = 1
-     LEFT JOIN stock_moves sm ON sm.variant_id = v.id
-      GROUP BY p.id
+    """Retorna um mapa product_id -> estoque total (soma das variações ativas).
+
+    Lê o saldo materializado em `product_balances` (mantido por triggers).
     """
     cur = conn.cursor()
-    cur.execute(query)
+    cur.execute("SELECT product_id, qty FROM product_balances")
     rows = cur.fetchall()
-    return {int(r["product_id"]): int(r["stock"]) for r in rows}
+    return {int(r["product_id"]): int(r["qty"]) for r in rows}
 
 
-def get_stock_table_rows(conn: sqlite3.Connection) -> List[sqlite3.Row]:
-    """Retorna linhas completas para tela de estoque (por variação)."""
-    query = """
+# Mesmo predicado do índice parcial idx_product_balances_low (schema.sql);
+# precisa ser idêntico para o SQLite usar o índice.
+_BELOW_MIN_WHERE = "pb.is_active = 1 AND pb.qty < pb.stock_min"
+
+
+def count_products_below_min(conn: sqlite3.Connection) -> int:
+    """Quantidade de produtos ativos com estoque total abaixo do mínimo."""
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(1) FROM product_balances pb WHERE {_BELOW_MIN_WHERE}")
+    return int(cur.fetchone()[0])
+
+
+def list_products_below_min(conn: sqlite3.Connection, limit: Optional[int] = None) -> List[sqlite3.Row]:
+    """Lista produtos ativos abaixo do mínimo (maior falta primeiro)."""
+    query = f"""
         SELECT
-            c.name AS category_name,
             p.id AS product_id,
             p.sku AS product_sku,
             p.name AS product_name,
-            p.stock_min,
-            p.is_active AS product_active,
-            p.variant_attribute_name,
-
-            v.id AS variant_id,
-            v.variant_sku,
-            v.variant_value,
-            v.is_default,
-            v.is_active AS variant_active,
-
-            COALESCE(SUM(
-                CASE
-                    WHEN sm.move_type = 'IN'  THEN sm.qty
-                    WHEN sm.move_type = 'OUT' THEN -sm.qty
-                    WHEN sm.move_type = 'ADJ' THEN sm.qty
-                    ELSE 0
-                END
-            ), 0) AS stock
-
-        FROM products p
-        JOIN categories c ON c.id = p.category_id
-        JOIN product_variants v ON v.product_id = p.id
-        LEFT JOIN stock_moves sm ON sm.variant_id = v.id
-        GROUP BY v.id
-        ORDER BY p.name, v.is_default DESC, v.variant_value
+            c.name AS category_name,
+            pb.qty AS stock,
+            pb.stock_min,
+            pb.stock_min - pb.qty AS missing
+          FROM product_balances pb
+          JOIN products p ON p.id = pb.product_id
+          JOIN categories c ON c.id = p.category_id
+         WHERE {_BELOW_MIN_WHERE}
+         ORDER BY missing DESC, p.name
     """
+    params: tuple = ()
+    if limit is not None:
+        query += " LIMIT ?"
+        params = (int(limit),)
     cur = conn.cursor()
-    cur.execute(query)
+    cur.execute(query, params)
+    return cur.fetchall()
+
+
+_STOCK_TABLE_SQL = """
+    SELECT
+        c.name AS category_name,
+        p.id AS product_id,
+        p.sku AS product_sku,
+        p.name AS product_name,
+        p.stock_min,
+        p.is_active AS product_active,
+        p.variant_attribute_name,
+
+        v.id AS variant_id,
+        v.variant_sku,
+        v.variant_value,
+        v.is_default,
+        v.is_active AS variant_active,
+
+        COALESCE(b.qty, 0) AS stock,
+        COALESCE(r.qty, 0) AS reserved,
+        COALESCE(b.qty, 0) + COALESCE(r.qty, 0) AS on_hand
+
+    FROM products p
+    JOIN categories c ON c.id = p.category_id
+    JOIN product_variants v ON v.product_id = p.id
+    LEFT JOIN stock_balances b ON b.variant_id = v.id
+    LEFT JOIN stock_reservations r ON r.variant_id = v.id
+    ORDER BY p.name, v.is_default DESC, v.variant_value
+"""
+
+
+@timed()
+def get_stock_table_rows(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+    """Retorna linhas completas para tela de estoque (por variação).
+
+    `stock` = disponível, `reserved` = vendido A_ENVIAR, `on_hand` = físico;
+    lidos das tabelas materializadas (sem somar stock_moves).
+    """
+    cur = conn.cursor()
+    cur.execute(_STOCK_TABLE_SQL)
     return cur.fetchall()
 
 
+def get_variant_stock_by_sku(conn: sqlite3.Connection, sku: str) -> Optional[sqlite3.Row]:
+    """Disponível / reservado / físico de uma variação (None se o SKU não existe)."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT v.id AS variant_id, v.variant_sku, v.is_active,
+               COALESCE(b.qty, 0) AS stock,
+               COALESCE(r.qty, 0) AS reserved,
+               COALESCE(b.qty, 0) + COALESCE(r.qty, 0) AS on_hand
+          FROM product_variants v
+     LEFT JOIN stock_balances b ON b.variant_id = v.id
+     LEFT JOIN stock_reservations r ON r.variant_id = v.id
+         WHERE v.variant_sku = ?
+        """,
+        (sku,),
+    )
+    return cur.fetchone()
+
+
+def iter_stock_table_rows(conn: sqlite3.Connection, chunk: int = 1000) -> Iterator[sqlite3.Row]:
+    """Mesmas linhas de `get_stock_table_rows`, em lotes (para exportar sem carregar tudo)."""
+    cur = conn.cursor()
+    cur.execute(_STOCK_TABLE_SQL)
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            return
+        yield from rows
+
+
 __all__ = [
     "get_variant_stock_levels",
     "get_product_stock_levels",
     "get_stock_table_rows",
+    "get_variant_stock_by_sku",
+    "iter_stock_table_rows",
+    "count_products_below_min",
+    "list_products_below_min",
 ]
@@ -0,0 +1,211 @@
+"""venda_app.services.product_service
+
+Cadastro de produto + variações em uma única transação.
+
+Regras (mesmas da tela de Produtos):
+  - Produto com variações: a variação default ("Única") fica inativa
+    (mantida pelo histórico); as linhas do editor são criadas/atualizadas;
+    variações que saíram do editor são inativadas, exceto as que já têm
+    histórico (vendas/movimentos), que continuam ativas.
+  - Produto sem variações: variações não-default são inativadas e existe
+    sempre uma default ativa com o SKU do produto.
+  - Linhas sem SKU recebem SKU gerado (em lote, ver
+    VariantRepository.generate_unique_variant_skus).
+
+O estado atual é lido uma vez, a diferença é calculada em memória e
+aplicada com executemany; o histórico das variações removidas é checado
+numa única consulta (usage_service). Um único commit no final (rollback em erro).
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import sqlite3
+
+from ..db import cache
+from ..db.database import tuple_cursor
+from ..db.repositories import (
+    CACHE_PRODUCT_BY_ID,
+    CACHE_SKU_INDEX,
+    CACHE_VARIANT_BY_SKU,
+    Product,
+    ProductRepository,
+    VariantRepository,
+)
+from ..utils.logger import logger
+from ..utils.metrics import timed
+from .usage_service import variants_with_history
+
+
+_INSERT_VARIANT = """
+    INSERT INTO product_variants (product_id, variant_sku, variant_value, is_default, is_active)
+    VALUES (?, ?, ?, ?, 1)
+"""
+
+_UPDATE_VARIANT = """
+    UPDATE product_variants
+       SET variant_sku = ?,
+           variant_value = ?,
+           is_default = ?,
+           is_active = ?,
+           updated_at = datetime('now')
+     WHERE id = ?
+"""
+
+_DEACTIVATE_VARIANT = "UPDATE product_variants SET is_active = 0, updated_at = datetime('now') WHERE id = ?"
+
+_INSERT_INITIAL_MOVE = """
+    INSERT INTO stock_moves (move_date, variant_id, move_type, reason, qty, unit_cost, ref_type, ref_id, notes)
+    VALUES (?, ?, 'IN', 'ESTOQUE_INICIAL', ?, ?, 'MANUAL', NULL, '')
+"""
+
+
+def _normalize_rows(variant_rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    for r in variant_rows:
+        rid = r.get("id")
+        rows.append(
+            {
+                "id": int(rid) if rid is not None and str(rid).isdigit() else None,
+                "value": str(r.get("value") or "").strip(),
+                "sku": str(r.get("sku") or "").strip(),
+                "stock_initial": int(r.get("stock_initial") or 0),
+            }
+        )
+    return rows
+
+
+@timed()
+def save_product_with_variants(
+    conn: sqlite3.Connection,
+    product: Product,
+    variant_rows: Sequence[Dict[str, Any]],
+    has_variants: bool,
+    move_date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Cria (product.id None) ou atualiza um produto e suas variações.
+
+    Args:
+        variant_rows: linhas do editor com chaves `value`, `sku` (vazio =
+            gerar), `id` (variação existente) e `stock_initial` (entrada
+            ESTOQUE_INICIAL para variações novas, com o custo do produto).
+        has_variants: se False, `variant_rows` é ignorado e o produto fica
+            só com a variação default.
+        move_date: data dos movimentos de estoque inicial (padrão = hoje).
+
+    Returns:
+        {"product_id", "inserted", "updated", "deactivated", "kept_in_use"}
+        (`kept_in_use` = ids removidos do editor mas mantidos por histórico)
+    """
+    started = time.perf_counter()
+    rows = _normalize_rows(variant_rows) if has_variants else []
+    product_sku = product.sku.strip()
+
+    inserts: List[tuple] = []
+    updates: List[tuple] = []
+    deactivate: List[int] = []
+    kept_in_use: List[int] = []
+    initial_stock: Dict[str, int] = {}
+
+    try:
+        if product.id is None:
+            product_id = ProductRepository.add_product(conn, product, commit=False)
+            existing = []
+        else:
+            product_id = int(product.id)
+            ProductRepository.update_product(conn, product, commit=False)
+            existing = VariantRepository.list_variants_by_product(conn, product_id)
+        existing_by_id = {int(v.id): v for v in existing}
+
+        if has_variants:
+            missing = [r for r in rows if not r["sku"]]
+            if missing:
+                generated = VariantRepository.generate_unique_variant_skus(
+                    conn, product_sku, [r["value"] for r in missing], reserved=[r["sku"] for r in rows if r["sku"]]
+                )
+                for r, sku in zip(missing, generated):
+                    r["sku"] = sku
+
+            desired: Set[int] = set()
+            for r in rows:
+                current = existing_by_id.get(r["id"]) if r["id"] is not None else None
+                if current is None or current.is_default:
+                    inserts.append((product_id, r["sku"], r["value"], 0))
+                    if r["stock_initial"] > 0:
+                        initial_stock[r["sku"]] = r["stock_initial"]
+                    continue
+                desired.add(int(current.id))
+                if (current.variant_sku, current.variant_value, current.is_active) != (r["sku"], r["value"], True):
+                    updates.append((r["sku"], r["value"], 0, 1, int(current.id)))
+
+            candidates = []
+            for v in existing:
+                if not v.is_active:
+                    continue
+                if v.is_default:
+                    # default "Única" fica inativa (mantida pelo histórico)
+                    deactivate.append(int(v.id))
+                elif int(v.id) not in desired:
+                    candidates.append(int(v.id))
+
+            in_use = variants_with_history(conn, candidates) if candidates else set()
+            for vid in candidates:
+                (kept_in_use if vid in in_use else deactivate).append(vid)
+        else:
+            default = next((v for v in existing if v.is_default), None)
+            deactivate.extend(int(v.id) for v in existing if v.is_active and not v.is_default)
+            if default is None:
+                inserts.append((product_id, product_sku, "Única", 1))
+            elif not default.is_active or default.variant_sku != product_sku:
+                updates.append((product_sku, default.variant_value, 1, 1, int(default.id)))
+
+        if deactivate:
+            conn.executemany(_DEACTIVATE_VARIANT, [(vid,) for vid in deactivate])
+        if updates:
+            conn.executemany(_UPDATE_VARIANT, updates)
+        if inserts:
+            conn.executemany(_INSERT_VARIANT, inserts)
+
+        if initial_stock:
+            cur = tuple_cursor(conn)
+            cur.execute("SELECT variant_sku, id FROM product_variants WHERE product_id = ?", (product_id,))
+            ids_by_sku = dict(cur.fetchall())
+            day = move_date or date.today().isoformat()
+            conn.executemany(
+                _INSERT_INITIAL_MOVE,
+                [
+                    (day, ids_by_sku[sku], qty, float(product.cost_default))
+                    for sku, qty in initial_stock.items()
+                ],
+            )
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cache.invalidate(CACHE_PRODUCT_BY_ID, CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
+
+    logger.info(
+        "Produto salvo (%d novas, %d alteradas, %d inativadas)",
+        len(inserts),
+        len(updates),
+        len(deactivate),
+        extra={
+            "operation": "save_product_with_variants",
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+        },
+    )
+    return {
+        "product_id": product_id,
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deactivated": len(deactivate),
+        "kept_in_use": kept_in_use,
+    }
+
+
+__all__ = ["save_product_with_variants"]
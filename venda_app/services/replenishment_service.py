@@ -0,0 +1,236 @@
+"""venda_app.services.replenishment_service
+
+Motor de reposição: demanda diária, dias de cobertura e sugestão de compra.
+
+Regras:
+  - Demanda = saídas OUT com motivo VENDA. Reversões de cancelamento
+    (ref_type SALE_CANCEL) de itens vendidos descontam a demanda.
+  - A média diária é uma média móvel exponencial (EWMA) por variação,
+    materializada em `variant_demand` e atualizada incrementalmente: cada
+    refresh processa apenas os movimentos com id acima da marca d'água
+    guardada em `app_meta`.
+  - Como a EWMA é linear, um movimento do dia d entra como
+    alpha * qty * (1 - alpha) ** (T - d), onde T é o dia de referência da
+    linha; por isso movimentos retroativos também são incorporados sem
+    recalcular o histórico.
+  - Saldo vem de `stock_balances` (mantido por triggers), então a lista de
+    sugestões é uma única consulta, sem somar o histórico de movimentos.
+
+Edições/remoções de movimentos antigos não são vistas pelo modo
+incremental; use `refresh_demand(conn, full=True)` para reconstruir.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import sqlite3
+
+from ..utils.metrics import timed
+
+
+# Janela equivalente de ~30 dias (alpha = 2 / (N + 1))
+DEMAND_WINDOW_DAYS = 30
+DEFAULT_ALPHA = 2.0 / (DEMAND_WINDOW_DAYS + 1)
+
+_META_LAST_MOVE_ID = "demand_last_move_id"
+_META_ALPHA = "demand_alpha"
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO app_meta (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """,
+        (key, value),
+    )
+
+
+def _load_demand_state(conn: sqlite3.Connection, variant_ids: List[int]) -> Dict[int, Tuple[float, date]]:
+    state: Dict[int, Tuple[float, date]] = {}
+    for i in range(0, len(variant_ids), 500):
+        chunk = variant_ids[i : i + 500]
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT variant_id, avg_daily, last_day FROM variant_demand WHERE variant_id IN ({marks})",
+            chunk,
+        ).fetchall()
+        for r in rows:
+            state[int(r[0])] = (float(r[1]), date.fromisoformat(r[2]))
+    return state
+
+
+@timed()
+def refresh_demand(
+    conn: sqlite3.Connection,
+    as_of: Optional[str] = None,
+    alpha: float = DEFAULT_ALPHA,
+    full: bool = False,
+) -> int:
+    """Atualiza a demanda média diária materializada.
+
+    Args:
+        as_of: data de referência (YYYY-MM-DD); padrão = hoje.
+        alpha: fator de suavização (0 < alpha <= 1).
+        full: se True, descarta o estado e reprocessa todo o histórico.
+
+    Returns:
+        Quantidade de movimentos de demanda processados.
+    """
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha deve estar entre 0 (exclusivo) e 1")
+
+    ref_day = date.fromisoformat(as_of) if as_of else date.today()
+    keep = 1.0 - alpha
+
+    stored_alpha = _get_meta(conn, _META_ALPHA)
+    if stored_alpha is not None and abs(float(stored_alpha) - alpha) > 1e-12:
+        full = True
+
+    if full:
+        conn.execute("DELETE FROM variant_demand")
+        last_move_id = 0
+    else:
+        last_move_id = int(_get_meta(conn, _META_LAST_MOVE_ID) or 0)
+
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM stock_moves").fetchone()[0]
+
+    rows = conn.execute(
+        """
+        SELECT sm.variant_id,
+               sm.move_date,
+               SUM(CASE WHEN sm.move_type = 'OUT' THEN sm.qty ELSE -sm.qty END) AS qty,
+               COUNT(1) AS n
+          FROM stock_moves sm
+         WHERE sm.id > ? AND sm.id <= ?
+           AND (
+                (sm.move_type = 'OUT' AND UPPER(sm.reason) = 'VENDA')
+             OR (
+                    sm.move_type = 'IN'
+                AND sm.ref_type = 'SALE_CANCEL'
+                AND EXISTS (
+                        SELECT 1 FROM sale_items si
+                         WHERE si.sale_id = sm.ref_id AND si.variant_id = sm.variant_id
+                    )
+                )
+           )
+         GROUP BY sm.variant_id, sm.move_date
+        """,
+        (last_move_id, max_id),
+    ).fetchall()
+
+    by_variant: Dict[int, List[Tuple[date, int]]] = defaultdict(list)
+    processed = 0
+    for r in rows:
+        by_variant[int(r[0])].append((date.fromisoformat(r[1]), int(r[2])))
+        processed += int(r[3])
+
+    state = _load_demand_state(conn, list(by_variant.keys()))
+
+    upserts = []
+    for variant_id, points in by_variant.items():
+        avg, last_day = state.get(variant_id, (0.0, min(d for d, _ in points)))
+        for day, qty in sorted(points):
+            if day > last_day:
+                avg *= keep ** (day - last_day).days
+                last_day = day
+            avg += alpha * qty * keep ** (last_day - day).days
+        upserts.append((variant_id, max(0.0, avg), last_day.isoformat()))
+
+    conn.executemany(
+        """
+        INSERT INTO variant_demand (variant_id, avg_daily, last_day, updated_at)
+        VALUES (?, ?, ?, datetime('now'))
+        ON CONFLICT(variant_id) DO UPDATE
+           SET avg_daily = excluded.avg_daily,
+               last_day = excluded.last_day,
+               updated_at = excluded.updated_at
+        """,
+        upserts,
+    )
+
+    # Decaimento dos dias sem venda até a data de referência
+    stale = conn.execute(
+        "SELECT variant_id, avg_daily, last_day FROM variant_demand WHERE last_day < ?",
+        (ref_day.isoformat(),),
+    ).fetchall()
+    conn.executemany(
+        "UPDATE variant_demand SET avg_daily = ?, last_day = ? WHERE variant_id = ?",
+        [
+            (float(r[1]) * keep ** (ref_day - date.fromisoformat(r[2])).days, ref_day.isoformat(), int(r[0]))
+            for r in stale
+        ],
+    )
+
+    _set_meta(conn, _META_LAST_MOVE_ID, str(max_id))
+    _set_meta(conn, _META_ALPHA, repr(alpha))
+    conn.commit()
+    return processed
+
+
+def list_reorder_suggestions(
+    conn: sqlite3.Connection,
+    lead_time_days: int = 7,
+    cover_days: int = 30,
+    only_needed: bool = True,
+) -> List[sqlite3.Row]:
+    """Lista variações com demanda, dias de cobertura e quantidade sugerida.
+
+    - reorder_point = demanda diária * lead_time_days
+    - alvo = demanda diária * (lead_time_days + cover_days)
+    - suggested_qty = alvo (arredondado pra cima) - saldo, quando saldo <= reorder_point
+
+    Usa a demanda materializada; chame `refresh_demand` antes para incluir
+    os movimentos mais recentes.
+    """
+    query = """
+        SELECT *,
+               CASE
+                   WHEN on_hand <= reorder_point
+                   THEN MAX(0, CAST(target AS INTEGER) + (target > CAST(target AS INTEGER)) - on_hand)
+                   ELSE 0
+               END AS suggested_qty
+          FROM (
+                SELECT
+                    c.name AS category_name,
+                    p.id AS product_id,
+                    p.name AS product_name,
+                    p.variant_attribute_name,
+                    v.id AS variant_id,
+                    v.variant_sku,
+                    v.variant_value,
+                    COALESCE(b.qty, 0) AS on_hand,
+                    d.avg_daily,
+                    COALESCE(b.qty, 0) / d.avg_daily AS days_of_cover,
+                    d.avg_daily * ? AS reorder_point,
+                    d.avg_daily * (? + ?) AS target
+                  FROM variant_demand d
+                  JOIN product_variants v ON v.id = d.variant_id AND v.is_active = 1
+                  JOIN products p ON p.id = v.product_id AND p.is_active = 1
+                  JOIN categories c ON c.id = p.category_id
+             LEFT JOIN stock_balances b ON b.variant_id = d.variant_id
+                 WHERE d.avg_daily > 0
+               )
+    """
+    if only_needed:
+        query += " WHERE on_hand <= reorder_point"
+    query += " ORDER BY days_of_cover, product_name, variant_value"
+
+    cur = conn.cursor()
+    cur.execute(query, (int(lead_time_days), int(lead_time_days), int(cover_days)))
+    return cur.fetchall()
+
+
+__all__ = [
+    "DEFAULT_ALPHA",
+    "refresh_demand",
+    "list_reorder_suggestions",
+]
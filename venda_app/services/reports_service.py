@@ -4,12 +4,34 @@ Serviços de relatórios e DRE.
 Este módulo contém funções de alto nível para gerar relatórios
 financeiros, como a Demonstração de Resultados (DRE) simples por
 período. As implementações são esboços e podem ser expandidas.
+
+Períodos anteriores ao corte de arquivamento (ver archive_service) leem
+também os arquivos `archive_YYYY.db`, anexados só durante a consulta.
 """
 
 from typing import Dict
 import sqlite3
 
+from ..utils.metrics import timed
+from .archive_service import attached_archives, union_sql
+
+
+_SALES_TOTALS = """
+        SELECT total_net, total_cost, total_profit
+          FROM {db}.sales
+         WHERE sale_date BETWEEN :date_from AND :date_to
+"""
+
+_PURCHASES = """
+        SELECT qty * unit_cost AS amount
+          FROM {db}.stock_moves
+         WHERE move_type = 'IN'
+           AND UPPER(reason) = 'COMPRA'
+           AND move_date BETWEEN :date_from AND :date_to
+"""
+
 
+@timed()
 def get_financial_summary(conn: sqlite3.Connection, date_from: str, date_to: str) -> Dict[str, float]:
     """Calcula um resumo financeiro entre duas datas (inclusivas).
 
@@ -25,18 +47,23 @@ def get_financial_summary(conn: sqlite3.Connection, date_from: str, date_to: str
         Dict[str, float]: Um dicionário com chaves `revenue`, `cost`,
             `profit`, `expenses` e `result`.
     """
+    with attached_archives(conn, date_from, date_to) as schemas:
+        return _financial_summary(conn, schemas, date_from, date_to)
+
+
+def _financial_summary(conn: sqlite3.Connection, schemas, date_from: str, date_to: str) -> Dict[str, float]:
     cur = conn.cursor()
-    # Soma os valores de venda no intervalo
+    params = {"date_from": date_from, "date_to": date_to}
+    # Soma os valores de venda no intervalo (banco principal + arquivos do período)
     cur.execute(
-        """
+        f"""
         SELECT
             COALESCE(SUM(total_net), 0) AS revenue,
             COALESCE(SUM(total_cost), 0) AS cost,
             COALESCE(SUM(total_profit), 0) AS profit
-        FROM sales
-        WHERE sale_date BETWEEN ? AND ?
+        FROM ({union_sql(schemas, _SALES_TOTALS)})
         """,
-        (date_from, date_to),
+        params,
     )
     revenue, cost, profit = cur.fetchone()
 
@@ -46,24 +73,15 @@ def get_financial_summary(conn: sqlite3.Connection, date_from: str, date_to: str
         """
         SELECT COALESCE(SUM(amount), 0) AS expenses
         FROM expenses
-        WHERE exp_date BETWEEN ? AND ?
+        WHERE exp_date BETWEEN :date_from AND :date_to
           AND UPPER(category) <> 'COMPRA_ESTOQUE'
         """,
-        (date_from, date_to),
+        params,
     )
     expenses = cur.fetchone()[0]
 
     # Compras registradas via movimentações (IN + COMPRA) contam como gasto
-    cur.execute(
-        """
-        SELECT COALESCE(SUM(qty * unit_cost), 0) AS purchases
-          FROM stock_moves
-         WHERE move_type = 'IN'
-           AND UPPER(reason) = 'COMPRA'
-           AND move_date BETWEEN ? AND ?
-        """,
-        (date_from, date_to),
-    )
+    cur.execute(f"SELECT COALESCE(SUM(amount), 0) AS purchases FROM ({union_sql(schemas, _PURCHASES)})", params)
     purchases = cur.fetchone()[0]
 
     expenses_total = float(expenses) + float(purchases)
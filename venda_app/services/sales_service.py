@@ -4,17 +4,165 @@ Serviço para registrar vendas e seus itens.
 
 Regra: itens e estoque são SEMPRE por variação (variant_id).
 Mesmo produtos sem variação têm uma variação "Única".
+
+Venda sem estoque (oversell): `create_sale` abre a transação com
+BEGIN IMMEDIATE (trava de escrita antes de ler o saldo), confere o saldo
+de todas as variações do carrinho numa consulta em `stock_balances` e
+grava venda, itens e movimentos no mesmo commit. Política:
+  - "block": levanta InsufficientStockError (nada é gravado);
+  - "warn": grava e registra aviso no log;
+  - "allow": não confere (saldo pode ficar negativo).
+Padrão: VENDA_APP_OVERSELL_POLICY (block).
+
+Transação: com commit=True (padrão) as funções que gravam abrem e fecham
+a própria transação e recusam (RuntimeError) conexão com transação já
+aberta; com commit=False entram na transação de quem chama.
+
+Reservas: a saída (OUT) é gravada na criação, mas enquanto a venda está
+A_ENVIAR a mercadoria ainda está na prateleira. `stock_reservations`
+(triggers em schema.sql) soma essas saídas; `update_sale_status` para
+ENVIADO/CONCLUIDO e `cancel_sale` liberam a reserva.
 """
 
 from __future__ import annotations
 
+import os
+import time
+from collections import defaultdict
 from typing import Any, Dict, List, Optional
 
 import sqlite3
 
 from ..db.repositories import SaleRepository, StockMoveRepository, VariantRepository
+from ..utils.logger import logger
+from ..utils.metrics import timed
+from .archive_service import get_archive_cutoff
+
+
+OVERSELL_POLICIES = ("block", "warn", "allow")
+SALE_STATUSES = ("A_ENVIAR", "ENVIADO", "CONCLUIDO", "CANCELADO")
+DEFAULT_OVERSELL_POLICY = os.environ.get("VENDA_APP_OVERSELL_POLICY", "block").lower()
+
+
+class InsufficientStockError(ValueError):
+    """Venda bloqueada por falta de saldo; `shortages` traz os detalhes por variação."""
+
+    def __init__(self, shortages: List[Dict[str, Any]]):
+        self.shortages = shortages
+        lines = [f"{s['sku']}: disponível {s['available']}, pedido {s['requested']}" for s in shortages]
+        super().__init__("Estoque insuficiente:\n" + "\n".join(lines))
+
+
+def check_availability(
+    conn: sqlite3.Connection,
+    requested: Dict[int, int],
+    labels: Optional[Dict[int, str]] = None,
+) -> List[Dict[str, Any]]:
+    """Confere saldo (stock_balances) para várias variações numa consulta.
+
+    Args:
+        requested: variant_id -> quantidade pedida (já somada por variação).
+        labels: variant_id -> SKU, só para a mensagem.
+
+    Returns:
+        Lista de faltas: {"variant_id", "sku", "available", "requested"}.
+    """
+    if not requested:
+        return []
+    ids = list(requested)
+    marks = ",".join("?" * len(ids))
+    rows = conn.execute(f"SELECT variant_id, qty FROM stock_balances WHERE variant_id IN ({marks})", ids).fetchall()
+    available = {int(r[0]): int(r[1]) for r in rows}
+
+    shortages = []
+    for variant_id, qty in requested.items():
+        have = available.get(variant_id, 0)
+        if qty > have:
+            shortages.append(
+                {
+                    "variant_id": variant_id,
+                    "sku": (labels or {}).get(variant_id, str(variant_id)),
+                    "available": have,
+                    "requested": qty,
+                }
+            )
+    return shortages
+
+
+def resolve_sale_items(conn: sqlite3.Connection, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Converte itens digitados (por SKU) em linhas resolvidas para `create_sale_resolved`.
 
+    Todo item é buscado por SKU (variação precisa existir e estar ativa) e
+    o custo vem do cadastro; `variant_id`/`unit_cost` vindos de fora são
+    ignorados. Linhas já resolvidas (autocomplete da tela) vão direto para
+    `create_sale_resolved`.
 
+    Returns:
+        Linhas com chaves variant_id, sku, qty, unit_price, unit_cost, fees, discount.
+    """
+    lines: List[Dict[str, Any]] = []
+    for item in items:
+        variant_sku = str(item.get("sku", "")).strip()
+        if not variant_sku:
+            raise ValueError("SKU do item não informado")
+        vrow = VariantRepository.get_variant_by_sku(conn, variant_sku)
+        if not vrow:
+            raise ValueError(f"Variação/SKU não encontrado: {variant_sku}")
+        if not bool(vrow["is_active"]):
+            raise ValueError(f"Variação inativa: {variant_sku}")
+        variant_id = vrow["variant_id"]
+        # custo unitário: override > custo padrão do produto
+        unit_cost = vrow["cost_override"] if vrow["cost_override"] is not None else vrow["cost_default"]
+
+        lines.append(
+            {
+                "variant_id": int(variant_id),
+                "sku": variant_sku,
+                "qty": int(item.get("qty", 0)),
+                "unit_price": float(item.get("unit_price", 0)),
+                "unit_cost": float(unit_cost),
+                "fees": float(item.get("fees", 0)),
+                "discount": float(item.get("discount", 0)),
+            }
+        )
+    return lines
+
+
+def check_active_variants(
+    conn: sqlite3.Connection,
+    variant_ids: List[int],
+    labels: Optional[Dict[int, str]] = None,
+) -> None:
+    """Levanta ValueError se alguma variação não existe ou está inativa (uma consulta)."""
+    if not variant_ids:
+        return
+    marks = ",".join("?" * len(variant_ids))
+    rows = conn.execute(
+        f"SELECT id, is_active FROM product_variants WHERE id IN ({marks})", variant_ids
+    ).fetchall()
+    active = {int(r[0]): bool(r[1]) for r in rows}
+    for variant_id in variant_ids:
+        label = (labels or {}).get(variant_id, str(variant_id))
+        if variant_id not in active:
+            raise ValueError(f"Variação/SKU não encontrado: {label}")
+        if not active[variant_id]:
+            raise ValueError(f"Variação inativa: {label}")
+
+
+def _begin_write(conn: sqlite3.Connection, commit: bool) -> None:
+    """Abre a transação com a trava de escrita (BEGIN IMMEDIATE) antes das leituras.
+
+    Com commit=True a função faz commit/rollback no fim, então não pode
+    haver transação aberta de quem chamou (o commit levaria junto trabalho
+    alheio). Com commit=False usa a transação do chamador, se houver.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    elif commit:
+        raise RuntimeError("Transação já aberta na conexão: use commit=False ou faça commit antes")
+
+
+@timed()
 def create_sale(
     conn: sqlite3.Connection,
     sale_date: str,
@@ -28,6 +176,8 @@ def create_sale(
     packaging_volumes: int = 1,
     packaging_box_sku: str = "",
     packaging_env_sku: str = "",
+    oversell_policy: Optional[str] = None,
+    commit: bool = True,
 ) -> int:
     """Registra uma nova venda.
 
@@ -38,10 +188,68 @@ def create_sale(
             - unit_price
             - fees
             - discount
+            Variação e custo vêm sempre do cadastro (busca por SKU).
+        oversell_policy: "block" | "warn" | "allow" (padrão DEFAULT_OVERSELL_POLICY).
+        commit: False = não faz commit nem rollback; quem chama controla a
+            transação (ex: várias vendas num lote).
+
+    Raises:
+        InsufficientStockError: saldo insuficiente com política "block".
 
     Returns:
         sale_id
     """
+    return create_sale_resolved(
+        conn,
+        sale_date,
+        channel,
+        status,
+        order_ref,
+        customer_name,
+        notes,
+        resolve_sale_items(conn, items),
+        packaging_enabled=packaging_enabled,
+        packaging_volumes=packaging_volumes,
+        packaging_box_sku=packaging_box_sku,
+        packaging_env_sku=packaging_env_sku,
+        oversell_policy=oversell_policy,
+        commit=commit,
+    )
+
+
+@timed()
+def create_sale_resolved(
+    conn: sqlite3.Connection,
+    sale_date: str,
+    channel: str,
+    status: str,
+    order_ref: str,
+    customer_name: str,
+    notes: str,
+    lines: List[Dict[str, Any]],
+    packaging_enabled: bool = False,
+    packaging_volumes: int = 1,
+    packaging_box_sku: str = "",
+    packaging_env_sku: str = "",
+    oversell_policy: Optional[str] = None,
+    commit: bool = True,
+) -> int:
+    """Registra uma venda a partir de linhas já resolvidas (sem buscar SKU).
+
+    Args:
+        lines: saída de `resolve_sale_items` (ou equivalente montado pela
+            tela): variant_id, sku, qty, unit_price, unit_cost, fees, discount.
+            Sob a trava de escrita, as variações são conferidas (existem e
+            estão ativas) numa consulta só; o custo da linha é usado como veio.
+
+    Demais argumentos, exceções e retorno: ver `create_sale`.
+    """
+    started = time.perf_counter()
+    policy = (oversell_policy or DEFAULT_OVERSELL_POLICY).lower()
+    if policy not in OVERSELL_POLICIES:
+        raise ValueError(f"Política de venda sem estoque inválida: {policy}")
+    if status and status not in SALE_STATUSES:
+        raise ValueError(f"Status inválido: {status}")
 
     totals = {
         "total_gross": 0.0,
@@ -54,29 +262,22 @@ def create_sale(
 
     sale_items_data: List[Dict[str, Any]] = []
     stock_moves_data: List[Dict[str, Any]] = []
+    requested: Dict[int, int] = defaultdict(int)
+    labels: Dict[int, str] = {}
 
-    for item in items:
-        variant_sku = str(item.get("sku", "")).strip()
-        qty = int(item.get("qty", 0))
-        unit_price = float(item.get("unit_price", 0))
-        fees = float(item.get("fees", 0))
-        discount = float(item.get("discount", 0))
+    for line in lines:
+        variant_id = int(line["variant_id"])
+        qty = int(line["qty"])
+        unit_price = float(line["unit_price"])
+        unit_cost = float(line["unit_cost"])
+        fees = float(line.get("fees", 0))
+        discount = float(line.get("discount", 0))
 
-        if not variant_sku:
-            raise ValueError("SKU do item não informado")
         if qty <= 0:
             raise ValueError("Quantidade deve ser maior que zero")
 
-        vrow = VariantRepository.get_variant_by_sku(conn, variant_sku)
-        if not vrow:
-            raise ValueError(f"Variação/SKU não encontrado: {variant_sku}")
-        if not bool(vrow["is_active"]):
-            raise ValueError(f"Variação inativa: {variant_sku}")
-
-        variant_id = int(vrow["variant_id"])
-
-        # custo unitário: override > custo padrão do produto
-        unit_cost = float(vrow["cost_override"]) if vrow["cost_override"] is not None else float(vrow["cost_default"])
+        requested[variant_id] += qty
+        labels[variant_id] = line.get("sku") or str(variant_id)
 
         gross = qty * unit_price
         net = gross - fees - discount
@@ -118,145 +319,262 @@ def create_sale(
             }
         )
 
-    # Embalagem (opcional)
-    box_variant_id: Optional[int] = None
-    env_variant_id: Optional[int] = None
     volumes = max(1, int(packaging_volumes or 1))
 
-    if packaging_enabled:
-        if packaging_box_sku.strip():
-            box = VariantRepository.get_variant_by_sku(conn, packaging_box_sku.strip())
-            if not box:
-                raise ValueError(f"Caixa (SKU variação) não encontrada: {packaging_box_sku}")
-            box_variant_id = int(box["variant_id"])
-        if packaging_env_sku.strip():
-            env = VariantRepository.get_variant_by_sku(conn, packaging_env_sku.strip())
-            if not env:
-                raise ValueError(f"Envelope (SKU variação) não encontrado: {packaging_env_sku}")
-            env_variant_id = int(env["variant_id"])
-
-    sale_data = {
-        "sale_date": sale_date,
-        "channel": channel,
-        "status": status or "A_ENVIAR",
-        "order_ref": order_ref,
-        "customer_name": customer_name,
-        "notes": notes,
-        "packaging_enabled": 1 if packaging_enabled else 0,
-        "packaging_volumes": volumes,
-        "packaging_box_variant_id": box_variant_id,
-        "packaging_env_variant_id": env_variant_id,
-        **totals,
-    }
-
-    sale_id = SaleRepository.insert_sale(conn, sale_data)
-
-    for item_data, move_data in zip(sale_items_data, stock_moves_data):
-        item_data["sale_id"] = sale_id
-        move_data["ref_id"] = sale_id
-        SaleRepository.insert_sale_item(conn, item_data)
-        StockMoveRepository.insert_stock_move(conn, move_data)
+    # Trava de escrita antes de ler cadastro e saldo: ninguém grava entre a conferência e o commit
+    _begin_write(conn, commit)
+    try:
+        check_active_variants(conn, list(requested), labels)
+
+        # Embalagem (opcional)
+        box_variant_id: Optional[int] = None
+        env_variant_id: Optional[int] = None
+        if packaging_enabled:
+            if packaging_box_sku.strip():
+                box = VariantRepository.get_variant_by_sku(conn, packaging_box_sku.strip())
+                if not box:
+                    raise ValueError(f"Caixa (SKU variação) não encontrada: {packaging_box_sku}")
+                box_variant_id = int(box["variant_id"])
+                requested[box_variant_id] += volumes
+                labels[box_variant_id] = packaging_box_sku.strip()
+            if packaging_env_sku.strip():
+                env = VariantRepository.get_variant_by_sku(conn, packaging_env_sku.strip())
+                if not env:
+                    raise ValueError(f"Envelope (SKU variação) não encontrado: {packaging_env_sku}")
+                env_variant_id = int(env["variant_id"])
+                requested[env_variant_id] += volumes
+                labels[env_variant_id] = packaging_env_sku.strip()
+
+        sale_data = {
+            "sale_date": sale_date,
+            "channel": channel,
+            "status": status or "A_ENVIAR",
+            "order_ref": order_ref,
+            "customer_name": customer_name,
+            "notes": notes,
+            "packaging_enabled": 1 if packaging_enabled else 0,
+            "packaging_volumes": volumes,
+            "packaging_box_variant_id": box_variant_id,
+            "packaging_env_variant_id": env_variant_id,
+            **totals,
+        }
+
+        if policy != "allow":
+            shortages = check_availability(conn, requested, labels)
+            if shortages and policy == "block":
+                raise InsufficientStockError(shortages)
+            for sh in shortages:
+                logger.warning(
+                    "Venda sem estoque: %s (disponível %d, pedido %d)",
+                    sh["sku"],
+                    sh["available"],
+                    sh["requested"],
+                    extra={"operation": "create_sale", "variant_id": sh["variant_id"]},
+                )
+
+        sale_id = SaleRepository.insert_sale(conn, sale_data, commit=False)
+
+        for item_data, move_data in zip(sale_items_data, stock_moves_data):
+            item_data["sale_id"] = sale_id
+            move_data["ref_id"] = sale_id
+            SaleRepository.insert_sale_item(conn, item_data, commit=False)
+            StockMoveRepository.insert_stock_move(conn, move_data, commit=False)
+
+        # Baixa de embalagem (se habilitado)
+        if packaging_enabled:
+            # caixa
+            if box_variant_id is not None:
+                StockMoveRepository.insert_stock_move(
+                    conn,
+                    {
+                        "move_date": sale_date,
+                        "variant_id": box_variant_id,
+                        "move_type": "OUT",
+                        "reason": "EMBALAGEM",
+                        "qty": volumes,
+                        "unit_cost": 0,
+                        "ref_type": "SALE",
+                        "ref_id": sale_id,
+                        "notes": f"Caixa | {order_ref}".strip(),
+                    },
+                    commit=False,
+                )
+            # envelope
+            if env_variant_id is not None:
+                StockMoveRepository.insert_stock_move(
+                    conn,
+                    {
+                        "move_date": sale_date,
+                        "variant_id": env_variant_id,
+                        "move_type": "OUT",
+                        "reason": "EMBALAGEM",
+                        "qty": volumes,
+                        "unit_cost": 0,
+                        "ref_type": "SALE",
+                        "ref_id": sale_id,
+                        "notes": f"Envelope | {order_ref}".strip(),
+                    },
+                    commit=False,
+                )
+
+        if commit:
+            conn.commit()
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+
+    logger.info(
+        "Venda registrada (%d itens)",
+        len(sale_items_data),
+        extra={
+            "operation": "create_sale",
+            "sale_id": sale_id,
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+        },
+    )
+    return sale_id
 
-    # Baixa de embalagem (se habilitado)
-    if packaging_enabled:
-        # caixa
-        if box_variant_id is not None:
-            StockMoveRepository.insert_stock_move(
-                conn,
-                {
-                    "move_date": sale_date,
-                    "variant_id": box_variant_id,
-                    "move_type": "OUT",
-                    "reason": "EMBALAGEM",
-                    "qty": volumes,
-                    "unit_cost": 0,
-                    "ref_type": "SALE",
-                    "ref_id": sale_id,
-                    "notes": f"Caixa | {order_ref}".strip(),
-                },
-            )
-        # envelope
-        if env_variant_id is not None:
-            StockMoveRepository.insert_stock_move(
-                conn,
-                {
-                    "move_date": sale_date,
-                    "variant_id": env_variant_id,
-                    "move_type": "OUT",
-                    "reason": "EMBALAGEM",
-                    "qty": volumes,
-                    "unit_cost": 0,
-                    "ref_type": "SALE",
-                    "ref_id": sale_id,
-                    "notes": f"Envelope | {order_ref}".strip(),
-                },
-            )
 
-    return sale_id
+def _check_not_compacted(conn: sqlite3.Connection, sale_date: str, action: str) -> None:
+    """Levanta ValueError se a venda (sem movimentos SALE) é de período já compactado."""
+    cutoff = get_archive_cutoff(conn)
+    if cutoff and sale_date <= cutoff:
+        raise ValueError(f"Venda de período fechado (até {cutoff}) não pode {action}")
 
 
-def cancel_sale(conn: sqlite3.Connection, sale_id: int) -> None:
+@timed()
+def cancel_sale(conn: sqlite3.Connection, sale_id: int, commit: bool = True) -> None:
     """Cancela uma venda e gera movimentos inversos de estoque.
 
     Regras:
     - Marca a venda como CANCELADO
     - NÃO apaga dados
     - Cria movimentos de reversão para todos os movimentos ref_type='SALE' e ref_id=sale_id
+    - commit=False: sem commit/rollback (transação do chamador)
     """
+    started = time.perf_counter()
     cur = conn.cursor()
 
-    sale = cur.execute("SELECT id, status, sale_date, order_ref FROM sales WHERE id = ?", (sale_id,)).fetchone()
-    if not sale:
-        raise ValueError("Venda não encontrada")
-
-    if sale["status"] == "CANCELADO":
-        return
-
-    moves = cur.execute(
-        """
-        SELECT move_date, variant_id, move_type, reason, qty, unit_cost
-          FROM stock_moves
-         WHERE ref_type = 'SALE' AND ref_id = ?
-        """,
-        (sale_id,),
-    ).fetchall()
-
-    # Cria reversão (IN <-> OUT). ADJ vira ADJ com qty negativo.
-    for m in moves:
-        move_type = m["move_type"]
-        if move_type == "OUT":
-            rev_type = "IN"
-            rev_qty = m["qty"]
-        elif move_type == "IN":
-            rev_type = "OUT"
-            rev_qty = m["qty"]
-        else:
-            rev_type = "ADJ"
-            rev_qty = -int(m["qty"])
-
-        StockMoveRepository.insert_stock_move(
-            conn,
-            {
-                "move_date": m["move_date"],
-                "variant_id": m["variant_id"],
-                "move_type": rev_type,
-                "reason": "CANCELAMENTO",
-                "qty": int(rev_qty),
-                "unit_cost": float(m["unit_cost"]),
-                "ref_type": "SALE_CANCEL",
-                "ref_id": sale_id,
-                "notes": f"Reversão venda {sale_id} ({sale['order_ref'] or ''})".strip(),
-            },
-        )
-
-    # Atualiza status
-    conn.execute("UPDATE sales SET status = 'CANCELADO' WHERE id = ?", (sale_id,))
-    conn.commit()
-
-
-def update_sale_status(conn: sqlite3.Connection, sale_id: int, status: str) -> None:
-    conn.execute("UPDATE sales SET status = ? WHERE id = ?", (status, sale_id))
-    conn.commit()
+    # Trava de escrita antes de ler o status: duas conexões não estornam a mesma venda
+    _begin_write(conn, commit)
+    try:
+        sale = cur.execute("SELECT id, status, sale_date, order_ref FROM sales WHERE id = ?", (sale_id,)).fetchone()
+        if not sale:
+            raise ValueError("Venda não encontrada")
+
+        if sale["status"] == "CANCELADO":
+            if commit:
+                conn.commit()
+            return
+
+        moves = cur.execute(
+            """
+            SELECT move_date, variant_id, move_type, reason, qty, unit_cost
+              FROM stock_moves
+             WHERE ref_type = 'SALE' AND ref_id = ?
+            """,
+            (sale_id,),
+        ).fetchall()
+        if not moves:
+            # movimentos foram resumidos (compact_ledger): não há o que estornar
+            _check_not_compacted(conn, sale["sale_date"], "ser cancelada")
+
+        # Cria reversão (IN <-> OUT). ADJ vira ADJ com qty negativo.
+        for m in moves:
+            move_type = m["move_type"]
+            if move_type == "OUT":
+                rev_type = "IN"
+                rev_qty = m["qty"]
+            elif move_type == "IN":
+                rev_type = "OUT"
+                rev_qty = m["qty"]
+            else:
+                rev_type = "ADJ"
+                rev_qty = -int(m["qty"])
 
+            StockMoveRepository.insert_stock_move(
+                conn,
+                {
+                    "move_date": m["move_date"],
+                    "variant_id": m["variant_id"],
+                    "move_type": rev_type,
+                    "reason": "CANCELAMENTO",
+                    "qty": int(rev_qty),
+                    "unit_cost": float(m["unit_cost"]),
+                    "ref_type": "SALE_CANCEL",
+                    "ref_id": sale_id,
+                    "notes": f"Reversão venda {sale_id} ({sale['order_ref'] or ''})".strip(),
+                },
+                commit=False,
+            )
 
-__all__ = ["create_sale", "cancel_sale", "update_sale_status"]
+        # Atualiza status (libera a reserva, se ainda A_ENVIAR)
+        conn.execute("UPDATE sales SET status = 'CANCELADO' WHERE id = ?", (sale_id,))
+        if commit:
+            conn.commit()
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+
+    logger.info(
+        "Venda cancelada (%d movimentos revertidos)",
+        len(moves),
+        extra={
+            "operation": "cancel_sale",
+            "sale_id": sale_id,
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+        },
+    )
+
+
+@timed()
+def update_sale_status(conn: sqlite3.Connection, sale_id: int, status: str, commit: bool = True) -> None:
+    """Muda o status sem mexer no saldo disponível (já baixou na criação).
+
+    Sair de A_ENVIAR libera a reserva (trigger); CANCELADO é delegado a
+    `cancel_sale` (estorna o estoque) e venda cancelada não muda mais de status.
+    Venda de período compactado (compact_ledger) também não muda. Status fora de SALE_STATUSES levanta ValueError.
+    """
+    if status not in SALE_STATUSES:
+        raise ValueError(f"Status inválido: {status}")
+    if status == "CANCELADO":
+        cancel_sale(conn, sale_id, commit=commit)
+        return
+    # Trava antes de ler: um cancelamento concorrente não passa entre a conferência e o UPDATE
+    _begin_write(conn, commit)
+    try:
+        row = conn.execute("SELECT status, sale_date FROM sales WHERE id = ?", (sale_id,)).fetchone()
+        if not row:
+            raise ValueError("Venda não encontrada")
+        if row[0] == "CANCELADO":
+            raise ValueError("Venda cancelada não pode mudar de status")
+        has_moves = conn.execute(
+            "SELECT 1 FROM stock_moves WHERE ref_type = 'SALE' AND ref_id = ? LIMIT 1", (sale_id,)
+        ).fetchone()
+        if not has_moves:
+            # sem movimentos, voltar para A_ENVIAR não reservaria nada
+            _check_not_compacted(conn, row[1], "mudar de status")
+        conn.execute("UPDATE sales SET status = ? WHERE id = ?", (status, sale_id))
+        if commit:
+            conn.commit()
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+
+
+__all__ = [
+    "DEFAULT_OVERSELL_POLICY",
+    "InsufficientStockError",
+    "OVERSELL_POLICIES",
+    "SALE_STATUSES",
+    "cancel_sale",
+    "check_active_variants",
+    "check_availability",
+    "create_sale",
+    "create_sale_resolved",
+    "resolve_sale_items",
+    "update_sale_status",
+]
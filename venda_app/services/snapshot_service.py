@@ -0,0 +1,166 @@
+"""venda_app.services.snapshot_service
+
+Snapshots (checkpoints) de estoque e consultas de saldo em uma data passada.
+
+Regras:
+  - Um checkpoint em `snapshot_date` guarda o saldo de fechamento daquele
+    dia por variação (stock_snapshots).
+  - Saldo em uma data = checkpoint mais próximo (<= data) + movimentos
+    posteriores a ele até a data. Só os movimentos após o checkpoint são
+    somados (índice idx_stock_moves_date).
+  - Checkpoints mensais (último dia de cada mês fechado) são criados num
+    passo explícito (`ensure_monthly_snapshots`, `cli rebuild`), cada um a
+    partir do anterior. Consultas (`get_stock_as_of`, valorização com
+    as_of) só leem, a não ser que peçam create_checkpoints=True.
+  - Quem grava checkpoints só faz commit da transação que ela mesma abriu
+    (BEGIN IMMEDIATE); com transação aberta de quem chama, entra nela.
+  - Movimentos retroativos apagam os checkpoints afetados via trigger.
+  - Depois de um arquivamento (archive_service) o detalhe anterior ao
+    corte não está mais no banco: saldo em data anterior é recusado.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import sqlite3
+
+from ..utils.metrics import timed
+from .archive_service import check_live_date
+
+
+_BALANCE_AS_OF_SQL = """
+    SELECT variant_id, SUM(q) AS qty
+      FROM (
+            SELECT variant_id, qty AS q
+              FROM stock_snapshots
+             WHERE snapshot_date = :base
+            UNION ALL
+            SELECT variant_id, CASE WHEN move_type = 'OUT' THEN -qty ELSE qty END AS q
+              FROM stock_moves
+             WHERE move_date > :base AND move_date <= :as_of
+           )
+     GROUP BY variant_id
+    HAVING SUM(q) <> 0
+"""
+
+
+def _month_end(d: date) -> date:
+    first_next = (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return first_next - timedelta(days=1)
+
+
+def get_nearest_checkpoint(conn: sqlite3.Connection, as_of: str) -> Optional[str]:
+    """Data do checkpoint mais recente <= as_of (ou None)."""
+    row = conn.execute(
+        "SELECT MAX(snapshot_date) FROM stock_checkpoints WHERE snapshot_date <= ?",
+        (as_of,),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def list_checkpoints(conn: sqlite3.Connection) -> List[str]:
+    return [r[0] for r in conn.execute("SELECT snapshot_date FROM stock_checkpoints ORDER BY snapshot_date")]
+
+
+@contextmanager
+def _write_transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    """Transação própria (BEGIN IMMEDIATE ... COMMIT) ou a de quem chama, sem commit."""
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def create_snapshot(conn: sqlite3.Connection, snapshot_date: str) -> int:
+    """Cria (ou recria) o checkpoint de fechamento de `snapshot_date`.
+
+    Returns:
+        Quantidade de variações com saldo diferente de zero gravadas.
+    """
+    snapshot_date = date.fromisoformat(snapshot_date).isoformat()
+    with _write_transaction(conn):
+        return _create_snapshot(conn, snapshot_date)
+
+
+def _create_snapshot(conn: sqlite3.Connection, snapshot_date: str) -> int:
+    base = conn.execute(
+        "SELECT MAX(snapshot_date) FROM stock_checkpoints WHERE snapshot_date < ?",
+        (snapshot_date,),
+    ).fetchone()[0] or ""
+
+    conn.execute("DELETE FROM stock_snapshots WHERE snapshot_date = ?", (snapshot_date,))
+    conn.execute("DELETE FROM stock_checkpoints WHERE snapshot_date = ?", (snapshot_date,))
+    conn.execute("INSERT INTO stock_checkpoints (snapshot_date) VALUES (?)", (snapshot_date,))
+    cur = conn.execute(
+        f"""
+        INSERT INTO stock_snapshots (snapshot_date, variant_id, qty)
+        SELECT :as_of, variant_id, qty FROM ({_BALANCE_AS_OF_SQL})
+        """,
+        {"base": base, "as_of": snapshot_date},
+    )
+    return cur.rowcount
+
+
+def ensure_monthly_snapshots(conn: sqlite3.Connection, up_to: Optional[str] = None) -> List[str]:
+    """Cria os checkpoints de fim de mês que faltam até `up_to` (padrão = hoje).
+
+    Só meses já fechados (fim de mês <= up_to) recebem checkpoint. Grava
+    tudo numa transação (a própria, ou a de quem chama, sem commit).
+
+    Returns:
+        Datas dos checkpoints criados.
+    """
+    limit = date.fromisoformat(up_to) if up_to else date.today()
+    first = conn.execute("SELECT MIN(move_date) FROM stock_moves").fetchone()[0]
+    if not first:
+        return []
+
+    existing = set(list_checkpoints(conn))
+    missing: List[str] = []
+    month_end = _month_end(date.fromisoformat(first))
+    while month_end <= limit:
+        key = month_end.isoformat()
+        if key not in existing:
+            missing.append(key)
+        month_end = _month_end(month_end + timedelta(days=1))
+    if missing:
+        with _write_transaction(conn):
+            for key in missing:
+                _create_snapshot(conn, key)
+    return missing
+
+
+@timed()
+def get_stock_as_of(conn: sqlite3.Connection, as_of: str, create_checkpoints: bool = False) -> Dict[int, int]:
+    """Retorna um mapa variant_id -> saldo ao final de `as_of` (YYYY-MM-DD).
+
+    Variações com saldo zero não aparecem no mapa (use `.get(vid, 0)`).
+    Só lê. Com `create_checkpoints`, cria antes os checkpoints mensais que
+    faltam (grava), para que consultas futuras partam de um ponto mais próximo.
+    """
+    as_of = date.fromisoformat(as_of).isoformat()
+    check_live_date(conn, as_of)
+    if create_checkpoints:
+        ensure_monthly_snapshots(conn, up_to=as_of)
+
+    base = get_nearest_checkpoint(conn, as_of) or ""
+    cur = conn.execute(_BALANCE_AS_OF_SQL, {"base": base, "as_of": as_of})
+    return {int(r["variant_id"]): int(r["qty"]) for r in cur.fetchall()}
+
+
+__all__ = [
+    "create_snapshot",
+    "ensure_monthly_snapshots",
+    "get_nearest_checkpoint",
+    "get_stock_as_of",
+    "list_checkpoints",
+]
@@ -0,0 +1,101 @@
+"""venda_app.services.usage_service
+
+"Tem histórico?" para variações e produtos (decide excluir x inativar).
+
+Regras:
+  - Histórico = algum movimento de estoque ou item de venda.
+  - A resposta normal vem da flag materializada `variant_history`
+    (gravada por trigger no primeiro movimento/item de venda): uma busca
+    pela chave primária por id, várias ids numa consulta só.
+  - `from_ledger=True` consulta direto stock_moves/sale_items com EXISTS
+    (para na primeira linha, pelos índices idx_stock_moves_variant_id e
+    idx_sale_items_variant_id) em vez de contar o histórico inteiro.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Set
+
+import sqlite3
+
+from ..db.database import tuple_cursor
+
+
+# limite de parâmetros por consulta (SQLite antigo: 999)
+_CHUNK = 400
+
+_VARIANTS_FLAG_SQL = "SELECT variant_id FROM variant_history WHERE variant_id IN ({marks})"
+
+_VARIANTS_LEDGER_SQL = """
+    SELECT v.id
+      FROM product_variants v
+     WHERE v.id IN ({marks})
+       AND (
+            EXISTS (SELECT 1 FROM stock_moves sm WHERE sm.variant_id = v.id)
+         OR EXISTS (SELECT 1 FROM sale_items si WHERE si.variant_id = v.id)
+       )
+"""
+
+_PRODUCTS_FLAG_SQL = """
+    SELECT p.id
+      FROM products p
+     WHERE p.id IN ({marks})
+       AND EXISTS (
+            SELECT 1
+              FROM product_variants v
+              JOIN variant_history h ON h.variant_id = v.id
+             WHERE v.product_id = p.id
+       )
+"""
+
+_PRODUCTS_LEDGER_SQL = """
+    SELECT p.id
+      FROM products p
+     WHERE p.id IN ({marks})
+       AND EXISTS (
+            SELECT 1
+              FROM product_variants v
+             WHERE v.product_id = p.id
+               AND (
+                    EXISTS (SELECT 1 FROM stock_moves sm WHERE sm.variant_id = v.id)
+                 OR EXISTS (SELECT 1 FROM sale_items si WHERE si.variant_id = v.id)
+               )
+       )
+"""
+
+
+def _ids_matching(conn: sqlite3.Connection, sql: str, ids: Iterable[int]) -> Set[int]:
+    id_list: List[int] = sorted({int(i) for i in ids})
+    found: Set[int] = set()
+    for i in range(0, len(id_list), _CHUNK):
+        chunk = id_list[i : i + _CHUNK]
+        cur = tuple_cursor(conn)
+        cur.execute(sql.format(marks=",".join("?" * len(chunk))), chunk)
+        found.update(int(r[0]) for r in cur.fetchall())
+    return found
+
+
+def variants_with_history(conn: sqlite3.Connection, variant_ids: Iterable[int], from_ledger: bool = False) -> Set[int]:
+    """Ids (entre `variant_ids`) de variações com movimento ou venda."""
+    return _ids_matching(conn, _VARIANTS_LEDGER_SQL if from_ledger else _VARIANTS_FLAG_SQL, variant_ids)
+
+
+def products_with_history(conn: sqlite3.Connection, product_ids: Iterable[int], from_ledger: bool = False) -> Set[int]:
+    """Ids (entre `product_ids`) de produtos com alguma variação com histórico."""
+    return _ids_matching(conn, _PRODUCTS_LEDGER_SQL if from_ledger else _PRODUCTS_FLAG_SQL, product_ids)
+
+
+def variant_has_history(conn: sqlite3.Connection, variant_id: int) -> bool:
+    return bool(variants_with_history(conn, [variant_id]))
+
+
+def product_has_history(conn: sqlite3.Connection, product_id: int) -> bool:
+    return bool(products_with_history(conn, [product_id]))
+
+
+__all__ = [
+    "product_has_history",
+    "products_with_history",
+    "variant_has_history",
+    "variants_with_history",
+]
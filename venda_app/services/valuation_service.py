@@ -0,0 +1,155 @@
+"""venda_app.services.valuation_service
+
+Valorização do estoque (quantidade x custo) por categoria, produto ou variação.
+
+Regras:
+  - Custo unitário = cost_override da variação > cost_default do produto
+    (mesma regra de create_sale).
+  - Só saldos positivos entram no valor (saldo negativo é inconsistência
+    de lançamento, não "valor negativo" em estoque).
+  - Saldo atual vem de `stock_balances`; tudo é resolvido em uma única
+    consulta agregada por nível.
+  - O resultado atual fica em cache por conexão (WeakKeyDictionary, como
+    db/cache.py; conexão sem weakref não usa cache) e nível, e é
+    invalidado pela versão `inventory_version` (app_meta), incrementada
+    por triggers a cada mudança de saldo, custo ou cadastro.
+  - `as_of` calcula o valor em uma data passada usando o saldo do
+    snapshot mais próximo (snapshot_service) e o custo ATUAL; checkpoints
+    só são criados com create_checkpoints=True.
+"""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlite3
+
+from .archive_service import check_live_date
+from .snapshot_service import ensure_monthly_snapshots, get_nearest_checkpoint
+from ..utils.metrics import timed
+
+
+_GROUPS = {
+    "category": (
+        "c.id AS category_id, c.name AS category_name",
+        "c.id",
+        "c.name",
+    ),
+    "product": (
+        "c.name AS category_name, p.id AS product_id, p.sku AS product_sku, p.name AS product_name",
+        "p.id",
+        "p.name",
+    ),
+    "variant": (
+        "c.name AS category_name, p.id AS product_id, p.name AS product_name, "
+        "v.id AS variant_id, v.variant_sku, v.variant_value",
+        "v.id",
+        "p.name, v.is_default DESC, v.variant_value",
+    ),
+}
+
+_CURRENT_BALANCES = "SELECT variant_id, qty FROM stock_balances"
+
+_AS_OF_BALANCES = """
+    SELECT variant_id, SUM(q) AS qty
+      FROM (
+            SELECT variant_id, qty AS q FROM stock_snapshots WHERE snapshot_date = :base
+            UNION ALL
+            SELECT variant_id, CASE WHEN move_type = 'OUT' THEN -qty ELSE qty END AS q
+              FROM stock_moves
+             WHERE move_date > :base AND move_date <= :as_of
+           )
+     GROUP BY variant_id
+"""
+
+# conexão -> {group_by -> (inventory_version, linhas)}
+_cache: "weakref.WeakKeyDictionary[sqlite3.Connection, Dict[str, Tuple[int, List[sqlite3.Row]]]]" = (
+    weakref.WeakKeyDictionary()
+)
+_cache_lock = threading.Lock()
+
+
+def get_inventory_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'inventory_version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def invalidate_valuation_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _conn_cache(conn: sqlite3.Connection) -> Optional[Dict[str, Tuple[int, List[sqlite3.Row]]]]:
+    """Cache da conexão (None se a conexão não aceita weakref)."""
+    try:
+        with _cache_lock:
+            return _cache.setdefault(conn, {})
+    except TypeError:
+        return None
+
+
+def _valuation_query(group_by: str, balances_sql: str) -> str:
+    if group_by not in _GROUPS:
+        raise ValueError(f"Nível de agrupamento inválido: {group_by}")
+    columns, group_key, order = _GROUPS[group_by]
+    return f"""
+        SELECT {columns},
+               SUM(b.qty) AS qty,
+               SUM(b.qty * COALESCE(v.cost_override, p.cost_default)) AS value
+          FROM ({balances_sql}) b
+          JOIN product_variants v ON v.id = b.variant_id
+          JOIN products p ON p.id = v.product_id
+          JOIN categories c ON c.id = p.category_id
+         WHERE b.qty > 0
+         GROUP BY {group_key}
+         ORDER BY {order}
+    """
+
+
+@timed()
+def get_inventory_valuation(
+    conn: sqlite3.Connection,
+    group_by: str = "category",
+    as_of: Optional[str] = None,
+    create_checkpoints: bool = False,
+) -> List[sqlite3.Row]:
+    """Valor do estoque agrupado por `category`, `product` ou `variant`.
+
+    Cada linha traz as colunas de identificação do nível, `qty` e `value`.
+    Só lê; `create_checkpoints` (com `as_of`) cria antes os checkpoints
+    mensais que faltam, como em `get_stock_as_of`.
+    """
+    if as_of:
+        check_live_date(conn, as_of)
+        if create_checkpoints:
+            ensure_monthly_snapshots(conn, up_to=as_of)
+        params: Dict[str, Any] = {"base": get_nearest_checkpoint(conn, as_of) or "", "as_of": as_of}
+        cur = conn.execute(_valuation_query(group_by, _AS_OF_BALANCES), params)
+        return cur.fetchall()
+
+    per_conn = _conn_cache(conn)
+    version = get_inventory_version(conn)
+    cached = per_conn.get(group_by) if per_conn is not None else None
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    rows = conn.execute(_valuation_query(group_by, _CURRENT_BALANCES)).fetchall()
+    if per_conn is not None:
+        per_conn[group_by] = (version, rows)
+    return rows
+
+
+def get_inventory_total_value(conn: sqlite3.Connection, as_of: Optional[str] = None) -> float:
+    """Valor total do estoque (soma das categorias)."""
+    rows = get_inventory_valuation(conn, group_by="category", as_of=as_of)
+    return float(sum(float(r["value"] or 0) for r in rows))
+
+
+__all__ = [
+    "get_inventory_valuation",
+    "get_inventory_total_value",
+    "get_inventory_version",
+    "invalidate_valuation_cache",
+]
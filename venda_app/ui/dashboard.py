@@ -6,34 +6,106 @@ utilizando CustomTkinter. Ela inclui um menu lateral de navegação
 permitindo alternar entre diferentes telas (dashboard, produtos,
 vendas, estoque etc.). Para simplicidade, algumas telas são
 placeholders.
+
+Inicialização em etapas, para a janela aparecer o quanto antes:
+  1. monta só a casca (menu lateral + área de conteúdo);
+  2. no primeiro ciclo ocioso do Tk abre o banco (`init_db` pula o
+     script quando o esquema já está em dia) e cria o dashboard vazio;
+  3. depois de desenhar, carrega os KPIs.
+Os módulos das demais telas só são importados na primeira navegação
+(ver `SCREENS`). Os tempos de cada etapa vão para o log e para as
+métricas (`startup.*`).
+
+Depois da inicialização, as telas de `PRELOAD_ORDER` são construídas
+(escondidas) em ciclos ociosos do Tk, no máximo `PRELOAD_BUDGET_MS` por
+ciclo, para que a navegação já encontre o frame pronto. Se houve escrita
+no banco depois do pré-carregamento, a tela é recarregada ao ser aberta
+pela primeira vez.
 """
 
+import importlib
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
 import customtkinter as ctk
 import tkinter as tk
+from tkinter import ttk
 from datetime import date
 
-from ..services.inventory_service import get_product_stock_levels
+from ..services.archive_service import attached_archives, union_sql
+from ..services.inventory_service import count_products_below_min, list_products_below_min
+from ..services.valuation_service import get_inventory_total_value
 from ..utils.validators import parse_flexible_date, format_iso_to_br
 
 from ..db.database import init_db, get_connection
-from .products import ProductsFrame
-from .sales import SalesFrame
-from .stock import StockFrame
-from .moves import MovesFrame
-from .finance import FinanceFrame
-from .expenses import ExpensesFrame
+from ..utils.logger import logger
+from ..utils.metrics import record, timed
+
+
+# Meta de tempo até a primeira pintura da janela (ms)
+FIRST_PAINT_TARGET_MS = 300
+
+# chave -> (módulo relativo a este pacote, classe do frame)
+SCREENS: Dict[str, Tuple[str, str]] = {
+    "products": (".products", "ProductsFrame"),
+    "sales": (".sales", "SalesFrame"),
+    "stock": (".stock", "StockFrame"),
+    "replenishment": (".replenishment", "ReplenishmentFrame"),
+    "moves": (".moves", "MovesFrame"),
+    "finance": (".finance", "FinanceFrame"),
+    "expenses": (".expenses", "ExpensesFrame"),
+    "diagnostics": (".diagnostics", "DiagnosticsFrame"),
+}
+
+# Pré-carregamento em segundo plano (ordem de prioridade)
+PRELOAD_ORDER: Tuple[str, ...] = ("sales", "products", "stock", "moves", "expenses", "finance", "replenishment")
+PRELOAD_ENABLED = os.environ.get("VENDA_APP_PRELOAD", "1") not in ("", "0")
+# Tempo máximo por ciclo ocioso; uma tela é sempre construída inteira
+PRELOAD_BUDGET_MS = float(os.environ.get("VENDA_APP_PRELOAD_BUDGET_MS", "50"))
+# Intervalo entre ciclos, para eventos do usuário serem atendidos no meio
+PRELOAD_GAP_MS = 30
+
+# Método que recarrega os dados de cada tela
+_RELOAD_METHODS = {
+    "products": "load_products",
+    "sales": "refresh_sales_list",
+    "stock": "load_stock",
+    "moves": "load_moves",
+    "expenses": "load_expenses",
+    "replenishment": "load_suggestions",
+}
+
+# KPIs do período, repetidos por schema (banco principal + arquivos anexados)
+_SALES_IN_PERIOD = "SELECT total_net, total_profit FROM {db}.sales WHERE sale_date BETWEEN :f AND :t"
+_PURCHASES_IN_PERIOD = (
+    "SELECT qty, unit_cost FROM {db}.stock_moves "
+    "WHERE move_type = 'IN' AND UPPER(reason) = 'COMPRA' AND move_date BETWEEN :f AND :t"
+)
+
+
+def _load_screen_class(key: str):
+    """Importa (na primeira vez) o módulo da tela e devolve a classe do frame."""
+    module_name, class_name = SCREENS[key]
+    t0 = time.perf_counter()
+    module = importlib.import_module(module_name, __package__)
+    record(f"ui.import.{key}", (time.perf_counter() - t0) * 1000.0)
+    return getattr(module, class_name)
 
 
 class MainApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, started_at: Optional[float] = None):
+        self._t0 = started_at if started_at is not None else time.perf_counter()
+        self._startup_marks: List[Tuple[str, float]] = []
+        self._mark("imports")
+
         super().__init__()
         self.title("Controle de Vendas e Estoque")
         self.geometry("1024x640")
         self.minsize(900, 600)
 
-        # Inicializa o banco de dados
-        init_db()
-        self.conn = get_connection()
+        # Conexão é aberta depois da primeira pintura (ver _finish_startup)
+        self.conn = None
 
         # Configure grid: coluna 0 para menu, coluna 1 para conteúdo
         self.grid_columnconfigure(0, weight=0)
@@ -50,9 +122,11 @@ class MainApp(ctk.CTk):
             ("Produtos", self.show_products),
             ("Vendas", self.show_sales),
             ("Estoque", self.show_stock),
+            ("Reposição", self.show_replenishment),
             ("Movimentações", self.show_moves),
             ("Financeiro", self.show_finance),
             ("Gastos", self.show_expenses),
+            ("Diagnóstico", self.show_diagnostics),
         ]
         for i, (text, callback) in enumerate(btn_specs):
             btn = ctk.CTkButton(
@@ -74,8 +148,83 @@ class MainApp(ctk.CTk):
         # Frames das telas (cache)
         self.frames = {}
 
-        # Exibe tela inicial
-        self.show_dashboard()
+        # Telas pré-carregadas ainda não exibidas -> conn.total_changes na construção
+        self._preloaded: Dict[str, int] = {}
+        self._preload_queue: List[str] = []
+
+        self._mark("shell")
+        self.after_idle(self._finish_startup)
+
+    def _mark(self, phase: str) -> None:
+        self._startup_marks.append((phase, (time.perf_counter() - self._t0) * 1000.0))
+
+    def _finish_startup(self):
+        """Abre o banco e mostra o dashboard; os KPIs vêm depois da pintura."""
+        init_db()
+        self.conn = get_connection()
+        self._mark("db")
+
+        self._show_frame("dashboard", lambda: DashboardFrame(self.content_frame, self.conn, autoload=False))
+        self.update_idletasks()
+        self._mark("first_paint")
+
+        self.after(1, self._load_dashboard_data)
+
+    def _load_dashboard_data(self):
+        f = self.frames.get("dashboard")
+        if f is not None:
+            f.refresh()
+        self._mark("dashboard_data")
+        self._report_startup()
+
+        if PRELOAD_ENABLED:
+            self._preload_queue = [k for k in PRELOAD_ORDER if k in SCREENS]
+            self.after(PRELOAD_GAP_MS, lambda: self.after_idle(self._preload_step))
+
+    def _preload_step(self):
+        """Constrói telas da fila até estourar o orçamento do ciclo ocioso."""
+        t0 = time.perf_counter()
+        while self._preload_queue:
+            key = self._preload_queue.pop(0)
+            if key in self.frames and self.frames[key].winfo_exists():
+                continue
+
+            t_frame = time.perf_counter()
+            try:
+                frame = _load_screen_class(key)(self.content_frame, self.conn)
+            except Exception:
+                logger.exception("Falha ao pré-carregar a tela %s", key)
+                continue
+            # grid + grid_remove: fica escondido, mas lembra a posição para o .grid() do _show_frame
+            frame.grid(row=0, column=0, sticky="nsew")
+            frame.grid_remove()
+            self.frames[key] = frame
+            self._preloaded[key] = self.conn.total_changes
+            record(f"ui.preload.{key}", (time.perf_counter() - t_frame) * 1000.0)
+
+            if (time.perf_counter() - t0) * 1000.0 >= PRELOAD_BUDGET_MS:
+                break
+
+        if self._preload_queue:
+            self.after(PRELOAD_GAP_MS, lambda: self.after_idle(self._preload_step))
+
+    def _report_startup(self):
+        """Loga e registra nas métricas o tempo acumulado de cada etapa."""
+        for phase, ms in self._startup_marks:
+            record(f"startup.{phase}", ms)
+        first_paint = dict(self._startup_marks).get("first_paint", 0.0)
+        logger.info(
+            "Inicialização: %s",
+            " | ".join(f"{phase} {ms:.0f} ms" for phase, ms in self._startup_marks),
+            extra={"operation": "startup", "duration_ms": round(self._startup_marks[-1][1], 1)},
+        )
+        if first_paint > FIRST_PAINT_TARGET_MS:
+            logger.warning(
+                "Primeira pintura em %.0f ms (meta: %d ms)",
+                first_paint,
+                FIRST_PAINT_TARGET_MS,
+                extra={"operation": "startup", "duration_ms": round(first_paint, 1)},
+            )
 
     def clear_content(self):
         """Esconde (não destrói) as telas do frame de conteúdo."""
@@ -105,8 +254,25 @@ class MainApp(ctk.CTk):
             # só mostra de novo
             self.frames[key].grid()
 
+    def _show_screen(self, key: str):
+        """Mostra uma tela de `SCREENS`, importando o módulo na primeira vez."""
+        if self.conn is None:
+            # clique antes do fim da inicialização
+            return
+        self._show_frame(key, lambda: _load_screen_class(key)(self.content_frame, self.conn))
+
+        # primeira exibição de tela pré-carregada: recarrega se o banco mudou desde então
+        changes_at_build = self._preloaded.pop(key, None)
+        if changes_at_build is not None and changes_at_build != self.conn.total_changes:
+            reload = getattr(self.frames[key], _RELOAD_METHODS.get(key, ""), None)
+            if reload is not None:
+                self.after_idle(reload)
+
     # Métodos de exibição para cada tela
     def show_dashboard(self):
+        if self.conn is None:
+            return
+
         def factory():
             frame = DashboardFrame(self.content_frame, self.conn)
             return frame
@@ -122,27 +288,40 @@ class MainApp(ctk.CTk):
             pass
 
     def show_products(self):
-        self._show_frame("products", lambda: ProductsFrame(self.content_frame, self.conn))
+        self._show_screen("products")
 
     def show_sales(self):
-        self._show_frame("sales", lambda: SalesFrame(self.content_frame, self.conn))
+        self._show_screen("sales")
 
     def show_stock(self):
-        self._show_frame("stock", lambda: StockFrame(self.content_frame, self.conn))
+        self._show_screen("stock")
+
+    def show_replenishment(self):
+        self._show_screen("replenishment")
 
     def show_moves(self):
-        self._show_frame("moves", lambda: MovesFrame(self.content_frame, self.conn))
+        self._show_screen("moves")
 
     def show_finance(self):
-        self._show_frame("finance", lambda: FinanceFrame(self.content_frame, self.conn))
+        self._show_screen("finance")
 
     def show_expenses(self):
-        self._show_frame("expenses", lambda: ExpensesFrame(self.content_frame, self.conn))
+        self._show_screen("expenses")
+
+    def show_diagnostics(self):
+        self._show_screen("diagnostics")
+        f = self.frames.get("diagnostics")
+        if f is not None:
+            f.load_stats()
 
 
-def run_app() -> None:
-    """Função de conveniência para iniciar a aplicação."""
-    app = MainApp()
+def run_app(started_at: Optional[float] = None) -> None:
+    """Função de conveniência para iniciar a aplicação.
+
+    `started_at` (time.perf_counter) permite incluir no relatório de
+    inicialização o tempo de import feito antes desta chamada.
+    """
+    app = MainApp(started_at=started_at)
     app.mainloop()
 
 
@@ -153,7 +332,7 @@ if __name__ == "__main__":
 class DashboardFrame(ctk.CTkFrame):
     """Dashboard com KPIs e visual mais vivo."""
 
-    def __init__(self, master, conn):
+    def __init__(self, master, conn, autoload: bool = True):
         super().__init__(master)
         self.conn = conn
 
@@ -191,15 +370,41 @@ class DashboardFrame(ctk.CTkFrame):
         self.cards = ctk.CTkFrame(self)
         self.cards.pack(fill="both", expand=True, padx=14, pady=(0, 14))
         self.cards.grid_columnconfigure((0, 1), weight=1)
-        self.cards.grid_rowconfigure((0, 1), weight=0)
+        self.cards.grid_rowconfigure((0, 1, 2), weight=0)
 
         self.kpi_widgets = {}
         self._make_card(0, 0, "💰 Receita líquida", "0,00", "#1f6aa5")
         self._make_card(0, 1, "🧾 Gastos", "0,00", "#6a1fa5")
         self._make_card(1, 0, "📈 Lucro", "0,00", "#1f8a5a")
         self._make_card(1, 1, "⚠️ Abaixo do mínimo", "0", "#a56a1f")
-
-        self.refresh()
+        self._make_card(2, 0, "📦 Valor em estoque", "0,00", "#1f8a8a")
+
+        # Alertas de estoque (produtos abaixo do mínimo)
+        alerts = ctk.CTkFrame(self)
+        alerts.pack(fill="both", expand=True, padx=14, pady=(0, 14))
+        ctk.CTkLabel(alerts, text="⚠️ Alertas de estoque", font=("Helvetica", 14, "bold")).pack(anchor="w", padx=10, pady=(8, 4))
+
+        self.alerts_tree = ttk.Treeview(
+            alerts,
+            columns=("sku", "product", "category", "stock", "min", "missing"),
+            show="headings",
+            height=6,
+        )
+        for col, text, w in [
+            ("sku", "SKU", 120),
+            ("product", "Produto", 220),
+            ("category", "Categoria", 140),
+            ("stock", "Estoque", 80),
+            ("min", "Mínimo", 80),
+            ("missing", "Falta", 80),
+        ]:
+            self.alerts_tree.heading(col, text=text)
+            self.alerts_tree.column(col, width=w, anchor="center")
+        self.alerts_tree.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        # autoload=False: quem cria chama refresh() depois (ex: após a primeira pintura)
+        if autoload:
+            self.refresh()
 
     def _make_card(self, r: int, c: int, title: str, value: str, accent: str):
         card = ctk.CTkFrame(self.cards)
@@ -214,6 +419,7 @@ class DashboardFrame(ctk.CTkFrame):
 
         self.kpi_widgets[title] = val_lbl
 
+    @timed()
     def refresh(self):
         # Período (aceita formatos variados, ex: 21/05/2000, 21-05-2000, 2000-05-21)
         try:
@@ -231,18 +437,28 @@ class DashboardFrame(ctk.CTkFrame):
 
         cur = self.conn.cursor()
 
-        # Receita líquida e lucro
-        cur.execute(
-            """
-            SELECT
-                COALESCE(SUM(total_net), 0) AS revenue,
-                COALESCE(SUM(total_profit), 0) AS profit
-            FROM sales
-            WHERE sale_date BETWEEN ? AND ?
-            """,
-            (date_from, date_to),
-        )
-        row = cur.fetchone()
+        # Receita líquida e lucro (períodos arquivados: soma também os archive_YYYY.db)
+        with attached_archives(self.conn, date_from, date_to) as schemas:
+            cur.execute(
+                f"""
+                SELECT
+                    COALESCE(SUM(total_net), 0) AS revenue,
+                    COALESCE(SUM(total_profit), 0) AS profit
+                FROM ({union_sql(schemas, _SALES_IN_PERIOD)})
+                """,
+                {"f": date_from, "t": date_to},
+            )
+            row = cur.fetchone()
+
+            # Compras via movimentações (IN + COMPRA) entram como gasto
+            cur.execute(
+                f"""
+                SELECT COALESCE(SUM(qty * unit_cost), 0) AS purchases
+                  FROM ({union_sql(schemas, _PURCHASES_IN_PERIOD)})
+                """,
+                {"f": date_from, "t": date_to},
+            )
+            prow = cur.fetchone()
         revenue = float(row["revenue"]) if row else 0.0
         profit = float(row["profit"]) if row else 0.0
 
@@ -258,30 +474,23 @@ class DashboardFrame(ctk.CTkFrame):
         exp = cur.fetchone()
         expenses = float(exp["expenses"]) if exp else 0.0
 
-        # Compras via movimentações (IN + COMPRA) entram como gasto
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(qty * unit_cost), 0) AS purchases
-              FROM stock_moves
-             WHERE move_type = 'IN'
-               AND UPPER(reason) = 'COMPRA'
-               AND move_date BETWEEN ? AND ?
-            """,
-            (date_from, date_to),
-        )
-        prow = cur.fetchone()
         purchases = float(prow["purchases"]) if prow else 0.0
         expenses_total = expenses + purchases
 
-        # Produtos abaixo do mínimo (estoque total por produto)
-        stock_by_product = get_product_stock_levels(self.conn)
-        cur.execute("SELECT id, stock_min FROM products WHERE is_active = 1")
-        low = 0
-        for r in cur.fetchall():
-            pid = int(r["id"])
-            min_stock = int(r["stock_min"])
-            if int(stock_by_product.get(pid, 0)) < min_stock:
-                low += 1
+        # Produtos abaixo do mínimo (estoque total por produto, via índice parcial)
+        low = count_products_below_min(self.conn)
+
+        for iid in self.alerts_tree.get_children():
+            self.alerts_tree.delete(iid)
+        for r in list_products_below_min(self.conn, limit=50):
+            self.alerts_tree.insert(
+                "",
+                "end",
+                values=(r["product_sku"], r["product_name"], r["category_name"], int(r["stock"]), int(r["stock_min"]), int(r["missing"])),
+            )
+
+        # Valor do estoque (custo x saldo atual; cacheado até mudar saldo/custo)
+        stock_value = get_inventory_total_value(self.conn)
 
         def brl(x: float) -> str:
             return f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -289,4 +498,5 @@ class DashboardFrame(ctk.CTkFrame):
         self.kpi_widgets["💰 Receita líquida"].configure(text=brl(revenue))
         self.kpi_widgets["🧾 Gastos"].configure(text=brl(expenses_total))
         self.kpi_widgets["📈 Lucro"].configure(text=brl(profit))
-        self.kpi_widgets["⚠️ Abaixo do mínimo"].configure(text=str(low))
\ No newline at end of file
+        self.kpi_widgets["⚠️ Abaixo do mínimo"].configure(text=str(low))
+        self.kpi_widgets["📦 Valor em estoque"].configure(text=brl(stock_value))
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""venda_app.ui.diagnostics
+
+Tela de diagnóstico: estatísticas das consultas SQL (db.profiling) e
+tempos das operações (utils.metrics), além dos acertos do cache de
+cadastro (db.cache).
+
+Permite ligar/desligar o profiling, ajustar o limite de "consulta lenta"
+e ver as consultas agregadas por SQL (chamadas, tempo total/médio/máximo,
+linhas, passos da VM e local de chamada). Abaixo, as operações medidas
+(serviços e telas) com contagem, média, p50/p95 aproximados e máximo;
+"Gravar métricas" salva o agregado em metrics.json.
+"""
+
+from __future__ import annotations
+
+import customtkinter as ctk
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from ..db import cache, profiling
+from ..utils import metrics
+from ..utils.validators import is_non_negative_float
+
+
+class DiagnosticsFrame(ctk.CTkFrame):
+    def __init__(self, master, conn):
+        super().__init__(master)
+        self.conn = conn
+        self.create_widgets()
+        self.load_stats()
+
+    def create_widgets(self):
+        top = ctk.CTkFrame(self)
+        top.pack(fill="x", padx=10, pady=10)
+
+        self.enabled_var = tk.IntVar(value=1 if profiling.is_enabled() else 0)
+        ctk.CTkCheckBox(top, text="Profiling SQL ligado", variable=self.enabled_var, command=self.toggle_profiling).pack(
+            side="left", padx=6
+        )
+
+        ctk.CTkLabel(top, text="Lenta acima de (ms):").pack(side="left", padx=(12, 4))
+        self.slow_entry = ctk.CTkEntry(top, width=70)
+        self.slow_entry.pack(side="left")
+        self.slow_entry.insert(0, f"{profiling.get_slow_query_ms():g}")
+
+        ctk.CTkButton(top, text="Atualizar", command=self.load_stats, width=120).pack(side="left", padx=6)
+        ctk.CTkButton(
+            top,
+            text="Zerar",
+            command=self.reset_stats,
+            width=120,
+            fg_color="#3a3a3a",
+            hover_color="#4a4a4a",
+        ).pack(side="left", padx=6)
+        ctk.CTkButton(top, text="Gravar métricas", command=self.save_metrics, width=140).pack(side="left", padx=6)
+
+        self.totals_label = ctk.CTkLabel(self, text="")
+        self.totals_label.pack(anchor="w", padx=16)
+
+        self.tree = ttk.Treeview(
+            self,
+            columns=("sql", "calls", "total", "avg", "max", "rows", "steps", "slow", "site"),
+            show="headings",
+        )
+        for key, label, width, anchor in [
+            ("sql", "SQL", 360, "w"),
+            ("calls", "Chamadas", 80, "center"),
+            ("total", "Total (ms)", 90, "center"),
+            ("avg", "Média (ms)", 90, "center"),
+            ("max", "Máx (ms)", 90, "center"),
+            ("rows", "Linhas", 80, "center"),
+            ("steps", "Passos VM", 90, "center"),
+            ("slow", "Lentas", 70, "center"),
+            ("site", "Chamado em", 220, "w"),
+        ]:
+            self.tree.heading(key, text=label)
+            self.tree.column(key, width=width, anchor=anchor)
+        self.tree.pack(fill="both", expand=True, padx=10, pady=(6, 10))
+
+        ctk.CTkLabel(self, text="Operações (serviços e telas)").pack(anchor="w", padx=16)
+        self.ops_tree = ttk.Treeview(
+            self,
+            columns=("name", "count", "avg", "p50", "p95", "max", "total"),
+            show="headings",
+            height=8,
+        )
+        for key, label, width, anchor in [
+            ("name", "Operação", 320, "w"),
+            ("count", "Chamadas", 80, "center"),
+            ("avg", "Média (ms)", 90, "center"),
+            ("p50", "p50 ≤ (ms)", 90, "center"),
+            ("p95", "p95 ≤ (ms)", 90, "center"),
+            ("max", "Máx (ms)", 90, "center"),
+            ("total", "Total (ms)", 90, "center"),
+        ]:
+            self.ops_tree.heading(key, text=label)
+            self.ops_tree.column(key, width=width, anchor=anchor)
+        self.ops_tree.pack(fill="x", padx=10, pady=(6, 4))
+
+        self.cache_label = ctk.CTkLabel(self, text="", justify="left")
+        self.cache_label.pack(anchor="w", padx=16, pady=(0, 10))
+
+    def toggle_profiling(self):
+        if self.enabled_var.get():
+            slow = self.slow_entry.get().strip() or "0"
+            if not is_non_negative_float(slow):
+                messagebox.showwarning("Diagnóstico", "Limite de consulta lenta deve ser um número >= 0.")
+                self.enabled_var.set(0)
+                return
+            profiling.enable_profiling(slow_query_ms=float(slow))
+        else:
+            profiling.disable_profiling()
+        self.load_stats()
+
+    def reset_stats(self):
+        profiling.reset_query_stats()
+        metrics.reset_metrics()
+        self.load_stats()
+
+    def save_metrics(self):
+        path = metrics.flush_metrics()
+        messagebox.showinfo("Diagnóstico", f"Métricas gravadas em:\n{path}")
+
+    def load_stats(self):
+        for iid in self.tree.get_children():
+            self.tree.delete(iid)
+
+        totals = profiling.get_totals()
+        state = "ligado" if profiling.is_enabled() else "desligado"
+        self.totals_label.configure(
+            text=f"Profiling {state} | consultas distintas: {totals['distinct_queries']} | instruções executadas: {totals['statements']}"
+        )
+
+        for r in profiling.get_query_stats():
+            self.tree.insert(
+                "",
+                "end",
+                values=(
+                    r["sql"][:200],
+                    r["calls"],
+                    f"{r['total_ms']:.1f}",
+                    f"{r['avg_ms']:.2f}",
+                    f"{r['max_ms']:.1f}",
+                    r["rows"],
+                    r["vm_steps"],
+                    r["slow"],
+                    r["call_site"],
+                ),
+            )
+
+        for iid in self.ops_tree.get_children():
+            self.ops_tree.delete(iid)
+        for m in metrics.get_metrics():
+            self.ops_tree.insert(
+                "",
+                "end",
+                values=(
+                    m["name"],
+                    m["count"],
+                    f"{m['avg_ms']:.2f}",
+                    _fmt_bucket(m["p50_le_ms"]),
+                    _fmt_bucket(m["p95_le_ms"]),
+                    f"{m['max_ms']:.1f}",
+                    f"{m['total_ms']:.1f}",
+                ),
+            )
+
+        parts = [
+            f"{c['name']}: {c['hits']} acertos / {c['misses']} faltas ({c['hit_rate']:.0%}), {c['size']} itens"
+            for c in cache.cache_stats()
+        ]
+        state = "ligado" if cache.is_enabled() else "desligado"
+        self.cache_label.configure(text=f"Cache de cadastro {state}" + (" | " + " | ".join(parts) if parts else ""))
+
+
+def _fmt_bucket(value):
+    return f"{value:g}" if value is not None else f"> {metrics.BUCKETS_MS[-1]}"
+
+
+__all__ = ["DiagnosticsFrame"]
@@ -12,6 +12,7 @@ from datetime import date
 
 from ..db.repositories import ExpenseRepository
 from ..utils.validators import is_non_empty, is_non_negative_float, parse_flexible_date, format_iso_to_br
+from ..utils.metrics import timed
 
 
 class ExpensesFrame(ctk.CTkFrame):
@@ -126,6 +127,7 @@ class ExpensesFrame(ctk.CTkFrame):
         self.payment_entry.delete(0, tk.END)
         self.notes_entry.delete(0, tk.END)
 
+    @timed()
     def load_expenses(self):
         for item in self.tree.get_children():
             self.tree.delete(item)
@@ -13,6 +13,7 @@ from datetime import date
 from ..utils.validators import parse_flexible_date, format_iso_to_br
 
 from ..services.reports_service import get_financial_summary
+from ..utils.metrics import timed
 
 
 class FinanceFrame(ctk.CTkFrame):
@@ -51,6 +52,7 @@ class FinanceFrame(ctk.CTkFrame):
             lbl.pack(anchor="w", pady=5)
             self.result_labels[key] = lbl
 
+    @timed()
     def calculate(self):
         try:
             date_from = parse_flexible_date(self.from_entry.get().strip())
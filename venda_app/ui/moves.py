@@ -12,6 +12,7 @@ from tkinter import ttk, messagebox
 from datetime import date
 
 from ..db.repositories import StockMoveRepository, VariantRepository, ProductRepository
+from ..utils.metrics import timed
 from ..utils.validators import (
     is_non_empty,
     is_positive_integer,
@@ -34,6 +35,7 @@ class MovesFrame(ctk.CTkFrame):
         super().__init__(master)
         self.conn = conn
         self.editing_move_id: int | None = None
+        self._picked_variant: tuple[str, int] | None = None  # (sku, variant_id) já resolvido
         self.create_widgets()
         self.load_moves()
 
@@ -65,6 +67,7 @@ class MovesFrame(ctk.CTkFrame):
         self.sku_entry = AutocompleteEntry(
             form_frame,
             provider=lambda q: VariantRepository.search_variants(self.conn, q),
+            on_select=lambda row: self._set_picked_variant(row["variant_sku"], row["variant_id"]),
         )
         self.sku_entry.grid(row=1, column=1, padx=5, pady=5)
 
@@ -138,6 +141,16 @@ class MovesFrame(ctk.CTkFrame):
         self.reason_menu.configure(values=reasons)
         self.reason_var.set(reasons[0])
 
+    def _set_picked_variant(self, sku: str, variant_id: int) -> None:
+        self._picked_variant = (sku, int(variant_id))
+
+    def _resolve_variant_id(self, sku: str) -> int | None:
+        """variant_id do SKU: usa o já resolvido (autocomplete/edição) ou busca no banco."""
+        if self._picked_variant is not None and self._picked_variant[0] == sku:
+            return self._picked_variant[1]
+        vrow = VariantRepository.get_variant_by_sku(self.conn, sku)
+        return int(vrow["variant_id"]) if vrow is not None else None
+
     def _compute_unit_cost(self, qty: int, total_cost: float) -> float:
         if qty <= 0:
             return 0.0
@@ -161,8 +174,8 @@ class MovesFrame(ctk.CTkFrame):
         if not is_non_empty(sku):
             messagebox.showwarning("SKU", "Informe o SKU da variação.")
             return
-        vrow = VariantRepository.get_variant_by_sku(self.conn, sku)
-        if vrow is None:
+        variant_id = self._resolve_variant_id(sku)
+        if variant_id is None:
             messagebox.showwarning("Variação", f"Variação/SKU '{sku}' não encontrado.")
             return
         if not is_positive_integer(qty):
@@ -175,7 +188,6 @@ class MovesFrame(ctk.CTkFrame):
         qty_i = int(qty)
         unit_cost = self._compute_unit_cost(qty_i, float(total_cost))
         # Insere movimento
-        variant_id = int(vrow["variant_id"])
         move_data = {
             "move_date": move_date,
             "variant_id": variant_id,
@@ -208,6 +220,7 @@ class MovesFrame(ctk.CTkFrame):
 
     def clear_form(self):
         self.editing_move_id = None
+        self._picked_variant = None
         self.add_button.configure(text="Registrar")
         self.date_entry.delete(0, tk.END)
         self.date_entry.insert(0, format_iso_to_br(date.today().isoformat()))
@@ -237,7 +250,7 @@ class MovesFrame(ctk.CTkFrame):
         cur.execute(
             """
             SELECT sm.id, sm.move_date, sm.move_type, sm.reason, sm.qty, sm.unit_cost, sm.notes,
-                   v.variant_sku
+                   sm.variant_id, v.variant_sku
               FROM stock_moves sm
               JOIN product_variants v ON v.id = sm.variant_id
              WHERE sm.id = ?
@@ -261,6 +274,7 @@ class MovesFrame(ctk.CTkFrame):
 
         self.sku_entry.delete(0, tk.END)
         self.sku_entry.insert(0, row["variant_sku"])
+        self._set_picked_variant(row["variant_sku"], row["variant_id"])
 
         self.qty_entry.delete(0, tk.END)
         self.qty_entry.insert(0, str(row["qty"]))
@@ -300,6 +314,7 @@ class MovesFrame(ctk.CTkFrame):
         self.clear_form()
         self.load_moves()
 
+    @timed()
     def load_moves(self):
         """Carrega os últimos movimentos para a Treeview (sem filtro)."""
         for row in self.tree.get_children():
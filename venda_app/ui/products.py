@@ -11,15 +11,17 @@ Regras:
 
 from __future__ import annotations
 
-import re
-import unicodedata
 from datetime import date
 
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from ..db.cache import invalidate as invalidate_cache
 from ..db.repositories import (
+    CACHE_PRODUCT_BY_ID,
+    CACHE_SKU_INDEX,
+    CACHE_VARIANT_BY_SKU,
     CategoryRepository,
     Product,
     ProductRepository,
@@ -27,14 +29,10 @@ from ..db.repositories import (
     VariantRepository,
     StockMoveRepository,
 )
+from ..services.product_service import save_product_with_variants
+from ..services.usage_service import product_has_history, variant_has_history
 from ..utils.validators import is_non_empty, is_non_negative_float, is_positive_integer
-
-
-def _slug(text: str) -> str:
-    """Converte texto em um sufixo seguro para SKU."""
-    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
-    text = re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-")
-    return text.upper() or "VAR"
+from ..utils.metrics import timed
 
 
 class ProductsFrame(ctk.CTkFrame):
@@ -318,11 +316,11 @@ class ProductsFrame(ctk.CTkFrame):
                 messagebox.showwarning("Variação", "Informe o valor da variação.")
                 return
             vsku = sku_entry.get().strip()
-            # SKU vazio: gerar automaticamente e garantir unicidade
-            if not vsku and self.selected_product_id is not None:
-                vsku = VariantRepository.generate_unique_variant_sku(self.conn, sku_base, value)
-            elif not vsku:
-                vsku = f"{sku_base}-{_slug(value)}"
+            # SKU vazio: gerar automaticamente e garantir unicidade (banco + linhas do editor)
+            if not vsku:
+                vsku = VariantRepository.generate_unique_variant_skus(
+                    self.conn, sku_base, [value], reserved=[r["sku"] for r in self.variant_rows]
+                )[0]
             stock_init = stock_entry.get().strip() or "0"
             if stock_init and not stock_init.isdigit():
                 messagebox.showwarning("Estoque", "Estoque inicial deve ser um inteiro >= 0")
@@ -453,6 +451,7 @@ class ProductsFrame(ctk.CTkFrame):
         if self.category_var.get() not in self.category_names:
             self.category_var.set(self.category_names[0])
 
+    @timed()
     def load_products(self):
         for iid in self.products_tree.get_children():
             self.products_tree.delete(iid)
@@ -593,184 +592,39 @@ class ProductsFrame(ctk.CTkFrame):
                 messagebox.showwarning("Variações", "Adicione ao menos 1 variação.")
                 return
 
-        # cria/atualiza produto
-        if self.selected_product_id is None:
-            product = Product(
-                id=None,
-                sku=sku,
-                name=name,
-                category_id=category_id,
-                variant_attribute_name=attr_name if has_variants else None,
-                brand=brand,
-                cost_default=float(cost),
-                price_default=float(price),
-                stock_min=int(stock_min),
-                is_active=is_active,
-            )
-            product_id = ProductRepository.add_product(self.conn, product)
-
-            # cria variações
-            created_variant_ids: list[int] = []
-            if has_variants:
-                for row in self.variant_rows:
-                    v_value = row["value"].strip()
-                    v_sku = (row["sku"].strip() or f"{sku}-{_slug(v_value)}")
-                    v = ProductVariant(
-                        id=None,
-                        product_id=product_id,
-                        variant_sku=v_sku,
-                        variant_value=v_value,
-                        is_default=False,
-                        is_active=True,
-                    )
-                    vid = VariantRepository.add_variant(self.conn, v)
-                    created_variant_ids.append(vid)
-
-                # Estoque inicial via movimentos (data = hoje)
-                from datetime import date as _date
-                today = _date.today().isoformat()
-                for row, vid in zip(self.variant_rows, created_variant_ids):
-                    qty0 = int(row.get("stock_initial", 0) or 0)
-                    if qty0 > 0:
-                        StockMoveRepository.insert_stock_move(
-                            self.conn,
-                            {
-                                "move_date": today,
-                                "variant_id": vid,
-                                "move_type": "IN",
-                                "reason": "ESTOQUE_INICIAL",
-                                "qty": qty0,
-                                "unit_cost": float(cost),
-                                "ref_type": "MANUAL",
-                                "ref_id": None,
-                                "notes": "",
-                            },
-                        )
+        # cria/atualiza produto + variações (uma transação, ver product_service)
+        product = Product(
+            id=self.selected_product_id,
+            sku=sku,
+            name=name,
+            category_id=category_id,
+            variant_attribute_name=attr_name if has_variants else None,
+            brand=brand,
+            cost_default=float(cost),
+            price_default=float(price),
+            stock_min=int(stock_min),
+            is_active=is_active,
+        )
+        try:
+            result = save_product_with_variants(self.conn, product, self.variant_rows, has_variants)
+        except Exception as e:
+            msg = str(e)
+            if "UNIQUE constraint failed" in msg:
+                messagebox.showerror("SKU duplicado", f"Já existe um produto ou variação com esse SKU.\n\n{msg}")
             else:
-                # variação Única
-                v = ProductVariant(
-                    id=None,
-                    product_id=product_id,
-                    variant_sku=sku,
-                    variant_value="Única",
-                    is_default=True,
-                    is_active=True,
-                )
-                vid = VariantRepository.add_variant(self.conn, v)
-                # sem estoque inicial aqui (movimente em Movimentações)
+                messagebox.showerror("Erro ao salvar produto", msg)
+            return
 
+        if self.selected_product_id is None:
             messagebox.showinfo("Produto", "Produto cadastrado com sucesso!")
-        else:
-            # atualização: não muda SKU (campo travado)
-            product_id = int(self.selected_product_id)
-            product = Product(
-                id=product_id,
-                sku=sku,
-                name=name,
-                category_id=category_id,
-                variant_attribute_name=attr_name if has_variants else None,
-                brand=brand,
-                cost_default=float(cost),
-                price_default=float(price),
-                stock_min=int(stock_min),
-                is_active=is_active,
+        elif result["kept_in_use"]:
+            messagebox.showinfo(
+                "Produto",
+                "Produto atualizado!\n\n"
+                f"{len(result['kept_in_use'])} variação(ões) removida(s) do editor continuam ativas "
+                "porque já têm vendas/movimentações.",
             )
-            ProductRepository.update_product(self.conn, product)
-
-            # estratégia:
-            # - Se "com variações":
-            #     * desativa a variação default (Única) (mantém por histórico)
-            #     * faz UPSERT nas variações do editor (atualiza existentes, cria novas, desativa removidas)
-            # - Se "sem variações":
-            #     * desativa variações não-default
-            #     * garante uma variação default ativa com SKU do produto
-            cur = self.conn.cursor()
-
-            if has_variants:
-                # desativa default (mantém por histórico)
-                cur.execute(
-                    "UPDATE product_variants SET is_active = 0 WHERE product_id = ? AND is_default = 1",
-                    (product_id,),
-                )
-
-                # mapa do que existe hoje (ativas/não-default)
-                existing = VariantRepository.list_variants_by_product(self.conn, product_id, only_active=False)
-                existing_map = {int(v.id): v for v in existing if (not v.is_default)}
-
-                desired_ids: set[int] = set()
-                for row in self.variant_rows:
-                    v_value = row["value"].strip()
-                    v_sku = (row["sku"].strip() or f"{sku}-{_slug(v_value)}")
-
-                    rid = row.get("id")
-                    if rid and str(rid).isdigit():
-                        vid = int(rid)
-                        desired_ids.add(vid)
-                        # atualiza
-                        VariantRepository.update_variant(
-                            self.conn,
-                            ProductVariant(
-                                id=vid,
-                                product_id=product_id,
-                                variant_sku=v_sku,
-                                variant_value=v_value,
-                                is_default=False,
-                                cost_override=None,
-                                price_override=None,
-                                is_active=True,
-                            ),
-                        )
-                    else:
-                        # cria nova
-                        VariantRepository.add_variant(
-                            self.conn,
-                            ProductVariant(
-                                id=None,
-                                product_id=product_id,
-                                variant_sku=v_sku,
-                                variant_value=v_value,
-                                is_default=False,
-                                is_active=True,
-                            ),
-                        )
-
-                # desativa as que foram removidas no editor (somente se não tiver uso)
-                for vid, v in existing_map.items():
-                    if vid in desired_ids:
-                        continue
-                    if self._variant_has_usage(vid):
-                        # mantém ativa para não quebrar histórico, mas avisa
-                        continue
-                    cur.execute("UPDATE product_variants SET is_active = 0 WHERE id = ?", (vid,))
-
-                self.conn.commit()
-
-            else:
-                # desativa todas as variações não-default
-                cur.execute("UPDATE product_variants SET is_active = 0 WHERE product_id = ? AND is_default = 0", (product_id,))
-
-                # garante default ativo
-                cur.execute(
-                    "SELECT id FROM product_variants WHERE product_id = ? AND is_default = 1",
-                    (product_id,),
-                )
-                r = cur.fetchone()
-                if r:
-                    cur.execute("UPDATE product_variants SET is_active = 1, variant_sku = ? WHERE id = ?", (sku, r["id"]))
-                else:
-                    VariantRepository.add_variant(
-                        self.conn,
-                        ProductVariant(
-                            id=None,
-                            product_id=product_id,
-                            variant_sku=sku,
-                            variant_value="Única",
-                            is_default=True,
-                            is_active=True,
-                        ),
-                    )
-                self.conn.commit()
-
+        else:
             messagebox.showinfo("Produto", "Produto atualizado!")
 
         # refresh
@@ -791,21 +645,11 @@ class ProductsFrame(ctk.CTkFrame):
 
         # Regra de segurança:
         # - Se houver histórico (vendas/movimentos), não apagamos do banco: apenas INATIVAMOS.
+        has_history = product_has_history(self.conn, pid)
         cur = self.conn.cursor()
-        cur.execute(
-            """
-            SELECT
-                (SELECT COUNT(1) FROM stock_moves sm JOIN product_variants v ON v.id = sm.variant_id WHERE v.product_id = ?) AS n_moves,
-                (SELECT COUNT(1) FROM sale_items si JOIN product_variants v2 ON v2.id = si.variant_id WHERE v2.product_id = ?) AS n_sales
-            """,
-            (pid, pid),
-        )
-        r = cur.fetchone()
-        n_moves = int(r["n_moves"])
-        n_sales = int(r["n_sales"])
 
         try:
-            if n_moves == 0 and n_sales == 0:
+            if not has_history:
                 ProductRepository.delete_product(self.conn, pid)
                 messagebox.showinfo("Produto", "Produto excluído.")
             else:
@@ -814,6 +658,7 @@ class ProductsFrame(ctk.CTkFrame):
                 # também inativa variações (mantém histórico íntegro)
                 cur.execute("UPDATE product_variants SET is_active = 0 WHERE product_id = ?", (pid,))
                 self.conn.commit()
+                invalidate_cache(CACHE_PRODUCT_BY_ID, CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
                 messagebox.showinfo(
                     "Produto",
                     "Este produto possui histórico (vendas/movimentos) e não pode ser apagado.\nEle foi INATIVADO para não aparecer como ativo.",
@@ -826,16 +671,12 @@ class ProductsFrame(ctk.CTkFrame):
         self.clear_product_form()
 
     def _variant_has_usage(self, variant_id: int) -> bool:
-        cur = self.conn.cursor()
-        cur.execute("SELECT COUNT(1) AS n FROM stock_moves WHERE variant_id = ?", (variant_id,))
-        n1 = int(cur.fetchone()["n"])
-        cur.execute("SELECT COUNT(1) AS n FROM sale_items WHERE variant_id = ?", (variant_id,))
-        n2 = int(cur.fetchone()["n"])
-        return (n1 + n2) > 0
+        return variant_has_history(self.conn, variant_id)
 
     def _deactivate_variant(self, variant_id: int) -> None:
         self.conn.execute("UPDATE product_variants SET is_active = 0 WHERE id = ?", (variant_id,))
         self.conn.commit()
+        invalidate_cache(CACHE_PRODUCT_BY_ID, CACHE_VARIANT_BY_SKU, CACHE_SKU_INDEX)
 
 
 # ---------------- Categorias ----------------
@@ -0,0 +1,109 @@
+"""venda_app.ui.replenishment
+
+Tela de reposição (sugestão de compra por variação).
+
+Mostra demanda média diária (EWMA das vendas), saldo, dias de cobertura e
+quantidade sugerida. A demanda é atualizada incrementalmente ao abrir/atualizar.
+"""
+
+from __future__ import annotations
+
+import customtkinter as ctk
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from ..services.replenishment_service import list_reorder_suggestions, refresh_demand
+from ..utils.validators import is_positive_integer
+from ..utils.metrics import timed
+
+
+class ReplenishmentFrame(ctk.CTkFrame):
+    def __init__(self, master, conn):
+        super().__init__(master)
+        self.conn = conn
+        self.create_widgets()
+        self.load_suggestions()
+
+    def create_widgets(self):
+        top = ctk.CTkFrame(self)
+        top.pack(fill="x", padx=10, pady=10)
+
+        ctk.CTkLabel(top, text="Prazo de entrega (dias):").pack(side="left", padx=(6, 4))
+        self.lead_entry = ctk.CTkEntry(top, width=60)
+        self.lead_entry.pack(side="left")
+        self.lead_entry.insert(0, "7")
+
+        ctk.CTkLabel(top, text="Cobertura alvo (dias):").pack(side="left", padx=(12, 4))
+        self.cover_entry = ctk.CTkEntry(top, width=60)
+        self.cover_entry.pack(side="left")
+        self.cover_entry.insert(0, "30")
+
+        self.only_needed_var = tk.IntVar(value=1)
+        ctk.CTkCheckBox(top, text="Somente a repor", variable=self.only_needed_var, command=self.load_suggestions).pack(
+            side="left", padx=12
+        )
+
+        ctk.CTkButton(top, text="Atualizar", command=self.load_suggestions, width=140).pack(side="left", padx=6)
+
+        self.tree = ttk.Treeview(
+            self,
+            columns=("variant_sku", "product", "variant_value", "on_hand", "avg", "cover", "rop", "suggested"),
+            show="headings",
+        )
+        cols = [
+            ("variant_sku", "SKU Variação", 140),
+            ("product", "Produto", 220),
+            ("variant_value", "Variação", 120),
+            ("on_hand", "Estoque", 80),
+            ("avg", "Venda/dia", 90),
+            ("cover", "Cobertura (dias)", 110),
+            ("rop", "Ponto de pedido", 110),
+            ("suggested", "Sugestão", 90),
+        ]
+        for key, label, width in cols:
+            self.tree.heading(key, text=label)
+            self.tree.column(key, width=width, anchor="center")
+
+        self.tree.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+    @timed()
+    def load_suggestions(self):
+        lead = self.lead_entry.get().strip() or "0"
+        cover = self.cover_entry.get().strip() or "0"
+        if (lead != "0" and not is_positive_integer(lead)) or (cover != "0" and not is_positive_integer(cover)):
+            messagebox.showwarning("Reposição", "Prazo e cobertura devem ser inteiros >= 0.")
+            return
+
+        for iid in self.tree.get_children():
+            self.tree.delete(iid)
+
+        try:
+            refresh_demand(self.conn)
+            rows = list_reorder_suggestions(
+                self.conn,
+                lead_time_days=int(lead),
+                cover_days=int(cover),
+                only_needed=bool(self.only_needed_var.get()),
+            )
+        except Exception as e:
+            messagebox.showerror("Erro", str(e))
+            return
+
+        for r in rows:
+            self.tree.insert(
+                "",
+                "end",
+                values=(
+                    r["variant_sku"],
+                    r["product_name"],
+                    r["variant_value"],
+                    int(r["on_hand"]),
+                    f"{float(r['avg_daily']):.2f}",
+                    f"{float(r['days_of_cover']):.1f}",
+                    f"{float(r['reorder_point']):.1f}",
+                    int(r["suggested_qty"]),
+                ),
+            )
+
+
+__all__ = ["ReplenishmentFrame"]
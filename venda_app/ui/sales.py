@@ -4,6 +4,10 @@ Tela de Vendas.
 
 Funcionalidades:
 - Lançar venda com itens (por SKU de variação) com autocomplete
+- Modo leitor (código de barras): SKU + Enter adiciona o item com o preço
+  de venda, repetir o SKU soma 1 na quantidade, F12 / Ctrl+Enter salva.
+  O SKU é resolvido no mapa em memória VariantRepository.get_sku_index
+  (sem consulta por leitura) e a confirmação sai numa linha de status.
 - Definir status do pedido (A_ENVIAR, ENVIADO, CONCLUIDO, CANCELADO)
 - (Opcional) baixar embalagem ao salvar (caixa/envelope) + volumes
 - Lista de vendas recentes com ações: marcar ENVIADO/CONCLUIDO e CANCELAR (reverte estoque)
@@ -18,7 +22,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 
 from ..db.repositories import VariantRepository, SaleRepository
-from ..services.sales_service import create_sale, cancel_sale, update_sale_status
+from ..services.sales_service import SALE_STATUSES, InsufficientStockError, create_sale_resolved, cancel_sale, update_sale_status
+from ..utils.metrics import timed
 from ..utils.validators import (
     is_non_empty,
     is_positive_integer,
@@ -31,12 +36,13 @@ from .autocomplete import AutocompleteEntry
 
 class SalesFrame(ctk.CTkFrame):
     CHANNEL_OPTIONS = ["Shopee", "ML", "Presencial", "Outros"]
-    STATUS_OPTIONS = ["A_ENVIAR", "ENVIADO", "CONCLUIDO", "CANCELADO"]
+    STATUS_OPTIONS = list(SALE_STATUSES)
 
     def __init__(self, master, conn):
         super().__init__(master)
         self.conn = conn
         self.items: list[dict] = []
+        self._picked_variant = None  # linha do autocomplete (já resolvida)
         self._selected_sale_id: int | None = None
         self.create_widgets()
         self.refresh_sales_list()
@@ -126,6 +132,7 @@ class SalesFrame(ctk.CTkFrame):
         self.item_sku_entry = AutocompleteEntry(
             item_frame,
             provider=lambda q: VariantRepository.search_variants(self.conn, q),
+            on_select=self._on_variant_picked,
         )
         self.item_sku_entry.grid(row=0, column=1, padx=5, pady=5)
 
@@ -148,6 +155,20 @@ class SalesFrame(ctk.CTkFrame):
         self.add_item_button = ctk.CTkButton(item_frame, text="Adicionar", command=self.add_item)
         self.add_item_button.grid(row=0, column=10, padx=10, pady=5)
 
+        # Modo leitor (código de barras)
+        self.scan_var = tk.IntVar(value=0)
+        ctk.CTkCheckBox(item_frame, text="Modo leitor", variable=self.scan_var, command=self.toggle_scan_mode).grid(
+            row=1, column=0, sticky="w", pady=5
+        )
+        self.scan_entry = ctk.CTkEntry(item_frame, placeholder_text="Leia o código (SKU)", state="disabled")
+        self.scan_entry.grid(row=1, column=1, columnspan=3, sticky="ew", padx=5, pady=5)
+        self.scan_entry.bind("<Return>", self.on_scan)
+        self.scan_entry.bind("<KP_Enter>", self.on_scan)
+        self.scan_entry.bind("<F12>", self.on_scan_commit)
+        self.scan_entry.bind("<Control-Return>", self.on_scan_commit)
+        self.scan_status = ctk.CTkLabel(item_frame, text="", anchor="w")
+        self.scan_status.grid(row=1, column=4, columnspan=7, sticky="ew", padx=5, pady=5)
+
         # Tabela de itens
         self.item_tree = ttk.Treeview(self, columns=("sku", "qty", "price", "fees", "discount"), show="headings")
         for col, text in [
@@ -209,6 +230,26 @@ class SalesFrame(ctk.CTkFrame):
     # Itens
     # ======================
 
+    def _on_variant_picked(self, row):
+        """Guarda a variação escolhida no autocomplete e sugere o preço."""
+        self._picked_variant = row
+        if not self.item_price_entry.get().strip() and row["unit_price"]:
+            self.item_price_entry.insert(0, f"{float(row['unit_price']):.2f}")
+
+    def _resolve_item_variant(self, sku: str):
+        """(variant_id, unit_cost) do SKU: usa a escolha do autocomplete ou busca no banco."""
+        row = self._picked_variant
+        if row is None or row["variant_sku"] != sku:
+            row = VariantRepository.get_variant_by_sku(self.conn, sku)
+            if row is None:
+                return None
+            cost = row["cost_override"] if row["cost_override"] is not None else row["cost_default"]
+        else:
+            cost = row["unit_cost"]
+        if not bool(row["is_active"]):
+            return None
+        return int(row["variant_id"]), float(cost)
+
     def add_item(self):
         sku = self.item_sku_entry.get().strip()
         qty = self.item_qty_entry.get().strip()
@@ -226,27 +267,100 @@ class SalesFrame(ctk.CTkFrame):
             messagebox.showwarning("Valores", "Preço, taxa e desconto devem ser números válidos (>= 0).")
             return
 
-        if VariantRepository.get_variant_by_sku(self.conn, sku) is None:
-            messagebox.showwarning("SKU", f"Variação/SKU '{sku}' não encontrado.")
+        resolved = self._resolve_item_variant(sku)
+        if resolved is None:
+            messagebox.showwarning("SKU", f"Variação/SKU '{sku}' não encontrado ou inativo.")
             return
+        variant_id, unit_cost = resolved
 
         item = {
+            "variant_id": variant_id,
             "sku": sku,
             "qty": int(qty),
             "unit_price": float(price),
+            "unit_cost": unit_cost,
             "fees": float(fee),
             "discount": float(discount),
         }
         self.items.append(item)
-        self.item_tree.insert("", "end", values=(sku, qty, f"{float(price):.2f}", f"{float(fee):.2f}", f"{float(discount):.2f}"))
+        self.item_tree.insert("", "end", values=self._item_values(item))
 
         # limpa campos item
+        self._picked_variant = None
         self.item_sku_entry.delete(0, tk.END)
         self.item_qty_entry.delete(0, tk.END)
         self.item_price_entry.delete(0, tk.END)
         self.item_fee_entry.delete(0, tk.END)
         self.item_discount_entry.delete(0, tk.END)
 
+    # ======================
+    # Modo leitor
+    # ======================
+
+    def toggle_scan_mode(self):
+        if self.scan_var.get():
+            VariantRepository.get_sku_index(self.conn)  # carrega o mapa antes da 1ª leitura
+            self.scan_entry.configure(state="normal")
+            self.scan_entry.focus_set()
+            self.scan_status.configure(text="Leitor ativo: Enter adiciona, F12 / Ctrl+Enter salva a venda.")
+        else:
+            self.scan_entry.delete(0, tk.END)
+            self.scan_entry.configure(state="disabled")
+            self.scan_status.configure(text="")
+
+    def on_scan(self, event=None):
+        code = self.scan_entry.get().strip()
+        self.scan_entry.delete(0, tk.END)
+        if not code:
+            return "break"
+
+        entry = VariantRepository.get_sku_index(self.conn).get(code)
+        if entry is None or not entry.is_active:
+            self.bell()
+            problem = "não encontrado" if entry is None else "inativo"
+            self.scan_status.configure(text=f"✗ {code}: SKU {problem}")
+            return "break"
+
+        children = self.item_tree.get_children()
+        for idx, item in enumerate(self.items):
+            # soma na linha lida antes (mesma variação, sem taxa/desconto digitados)
+            if item.get("scanned") and item["variant_id"] == entry.variant_id:
+                item["qty"] += 1
+                self.item_tree.item(children[idx], values=self._item_values(item))
+                break
+        else:
+            item = {
+                "variant_id": int(entry.variant_id),
+                "sku": code,
+                "qty": 1,
+                "unit_price": float(entry.unit_price or 0),
+                "unit_cost": float(entry.unit_cost or 0),
+                "fees": 0.0,
+                "discount": 0.0,
+                "scanned": True,
+            }
+            self.items.append(item)
+            self.item_tree.insert("", "end", values=self._item_values(item))
+
+        self.scan_status.configure(
+            text=f"✓ {code} | {entry.product_name} {entry.variant_value} | qtd {item['qty']} | itens {len(self.items)}"
+        )
+        return "break"
+
+    def on_scan_commit(self, event=None):
+        self.save_sale(quiet=True)
+        return "break"
+
+    @staticmethod
+    def _item_values(item: dict) -> tuple:
+        return (
+            item["sku"],
+            item["qty"],
+            f"{item['unit_price']:.2f}",
+            f"{item['fees']:.2f}",
+            f"{item['discount']:.2f}",
+        )
+
     def remove_selected_item(self):
         sel = self.item_tree.selection()
         if not sel:
@@ -260,7 +374,8 @@ class SalesFrame(ctk.CTkFrame):
     # Venda
     # ======================
 
-    def save_sale(self):
+    def save_sale(self, quiet: bool = False):
+        """Grava a venda; `quiet` (modo leitor) confirma na linha de status em vez de messagebox."""
         try:
             sale_date = parse_flexible_date(self.date_entry.get().strip())
         except Exception as e:
@@ -290,30 +405,41 @@ class SalesFrame(ctk.CTkFrame):
             messagebox.showwarning("Embalagem", "Informe pelo menos a Caixa ou o Envelope (ou desmarque 'Baixar embalagem').")
             return
 
+        sale_args = dict(
+            sale_date=sale_date,
+            channel=channel,
+            status=status,
+            order_ref=ref,
+            customer_name=customer,
+            notes=notes,
+            lines=self.items,
+            packaging_enabled=pack_enabled,
+            packaging_volumes=volumes,
+            packaging_box_sku=box_sku,
+            packaging_env_sku=env_sku,
+        )
         try:
-            sale_id = create_sale(
-                self.conn,
-                sale_date=sale_date,
-                channel=channel,
-                status=status,
-                order_ref=ref,
-                customer_name=customer,
-                notes=notes,
-                items=self.items,
-                packaging_enabled=pack_enabled,
-                packaging_volumes=volumes,
-                packaging_box_sku=box_sku,
-                packaging_env_sku=env_sku,
-            )
+            try:
+                sale_id = create_sale_resolved(self.conn, **sale_args)
+            except InsufficientStockError as e:
+                if not messagebox.askyesno("Estoque insuficiente", f"{e}\n\nRegistrar a venda mesmo assim?"):
+                    return
+                sale_id = create_sale_resolved(self.conn, oversell_policy="allow", **sale_args)
         except Exception as e:
             messagebox.showerror("Erro ao salvar", str(e))
             return
 
-        messagebox.showinfo("Venda", f"Venda registrada com sucesso (ID {sale_id})")
+        if quiet:
+            self.scan_status.configure(text=f"✓ Venda registrada (ID {sale_id}) — pronto para a próxima")
+        else:
+            messagebox.showinfo("Venda", f"Venda registrada com sucesso (ID {sale_id})")
         self.clear_form()
         self.refresh_sales_list()
+        if self.scan_var.get():
+            self.scan_entry.focus_set()
 
     def clear_form(self):
+        self._picked_variant = None
         self.date_entry.delete(0, tk.END)
         self.date_entry.insert(0, format_iso_to_br(date.today().isoformat()))
         self.status_var.set("A_ENVIAR")
@@ -335,6 +461,7 @@ class SalesFrame(ctk.CTkFrame):
     # Lista de vendas
     # ======================
 
+    @timed()
     def refresh_sales_list(self):
         for r in self.sales_tree.get_children():
             self.sales_tree.delete(r)
@@ -2,8 +2,9 @@
 
 Tela de estoque (por variação).
 
-Mostra cada variação com seu estoque atual e sinaliza quando o estoque TOTAL
-do produto (soma das variações ativas) está abaixo do mínimo.
+Mostra cada variação com estoque físico, reservado (vendas A_ENVIAR) e
+disponível, e sinaliza quando o estoque disponível TOTAL do produto (soma
+das variações ativas) está abaixo do mínimo.
 """
 
 from __future__ import annotations
@@ -12,6 +13,7 @@ import customtkinter as ctk
 from tkinter import ttk
 
 from ..services.inventory_service import get_product_stock_levels, get_stock_table_rows
+from ..utils.metrics import timed
 
 
 class StockFrame(ctk.CTkFrame):
@@ -29,7 +31,7 @@ class StockFrame(ctk.CTkFrame):
 
         self.tree = ttk.Treeview(
             self,
-            columns=("product_sku", "product", "attr", "variant_value", "variant_sku", "stock", "min", "status"),
+            columns=("product_sku", "product", "attr", "variant_value", "variant_sku", "on_hand", "reserved", "stock", "min", "status"),
             show="headings",
         )
         cols = [
@@ -38,7 +40,9 @@ class StockFrame(ctk.CTkFrame):
             ("attr", "Atributo", 90),
             ("variant_value", "Variação", 140),
             ("variant_sku", "SKU Variação", 140),
-            ("stock", "Estoque", 90),
+            ("on_hand", "Físico", 80),
+            ("reserved", "Reservado", 80),
+            ("stock", "Disponível", 90),
             ("min", "Mínimo", 80),
             ("status", "Status", 90),
         ]
@@ -48,6 +52,7 @@ class StockFrame(ctk.CTkFrame):
 
         self.tree.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
+    @timed()
     def load_stock(self):
         for iid in self.tree.get_children():
             self.tree.delete(iid)
@@ -71,6 +76,8 @@ class StockFrame(ctk.CTkFrame):
                     attr,
                     r["variant_value"],
                     r["variant_sku"],
+                    int(r["on_hand"]),
+                    int(r["reserved"]),
                     int(r["stock"]),
                     min_stock,
                     status,
@@ -1,33 +1,138 @@
 """
-Configuração básica de logging para a aplicação.
+Configuração de logging para a aplicação.
 
 Este módulo centraliza a criação de um logger que pode ser importado
-por outros módulos da aplicação. Os logs são enviados tanto para o
-console quanto para um arquivo `app.log` no diretório base.
+por outros módulos da aplicação. As chamadas de log não fazem I/O na
+thread que loga: o logger `venda_app` tem apenas um `QueueHandler`, e um
+`QueueListener` em thread própria grava no console (texto) e no arquivo
+`app.log` (uma linha JSON por registro, com rotação por tamanho).
+
+Campos estruturados podem ser passados via `extra`, por exemplo:
+
+    logger.info("Venda registrada", extra={"operation": "create_sale", "sale_id": 10, "duration_ms": 3.2})
+
+Variáveis de ambiente:
+    VENDA_APP_LOG_LEVEL      nível do logger (padrão INFO)
+    VENDA_APP_LOG_MAX_BYTES  tamanho máximo do app.log antes de rotacionar (padrão 5 MB)
+    VENDA_APP_LOG_BACKUPS    quantidade de arquivos rotacionados mantidos (padrão 5)
 """
 
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional, Tuple, Union
 
 
 LOG_FILE = Path(__file__).resolve().parent.parent / "app.log"
 
+# Campos aceitos em `extra` e copiados para o registro JSON
+STRUCTURED_FIELDS = ("operation", "duration_ms", "sale_id", "variant_id", "rows")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in STRUCTURED_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler para fila no mesmo processo.
+
+    O `prepare` padrão formata o registro e junta o traceback em `msg`
+    (limpando exc_info/exc_text); aqui só a mensagem é resolvida e o
+    traceback segue no registro, para o listener formatar (campo "exc"
+    do JSON, traceback no console).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+def _env_level() -> Tuple[str, Optional[str]]:
+    """Nível de VENDA_APP_LOG_LEVEL; valor inválido vira INFO (devolvido para o aviso)."""
+    raw = os.environ.get("VENDA_APP_LOG_LEVEL", "INFO").strip().upper()
+    if isinstance(logging.getLevelName(raw), int):
+        return raw, None
+    return "INFO", raw
+
+
 # Cria o logger
 logger = logging.getLogger("venda_app")
-logger.setLevel(logging.DEBUG)
+_level, _invalid_level = _env_level()
+logger.setLevel(_level)
+logger.propagate = False
 
-# Formato de log
+# Formato de log (console)
 formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 
 # Handler de console
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
 
-# Handler de arquivo
-file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+# Handler de arquivo (JSON, com rotação; só abre o arquivo no primeiro registro)
+file_handler = logging.handlers.RotatingFileHandler(
+    LOG_FILE,
+    maxBytes=int(os.environ.get("VENDA_APP_LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+    backupCount=int(os.environ.get("VENDA_APP_LOG_BACKUPS", "5")),
+    encoding="utf-8",
+    delay=True,
+)
+file_handler.setFormatter(JsonFormatter())
+
+# Fila: o logger só enfileira; o listener grava em background
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+queue_handler = LocalQueueHandler(_log_queue)
+logger.addHandler(queue_handler)
+
+_listener = logging.handlers.QueueListener(_log_queue, console_handler, file_handler, respect_handler_level=True)
+_listener.start()
+
+if _invalid_level is not None:
+    logger.warning("VENDA_APP_LOG_LEVEL inválido (%r); usando INFO", _invalid_level)
+
+
+def set_log_level(level: Union[int, str], console_level: Optional[Union[int, str]] = None) -> None:
+    """Ajusta o nível do logger (e, opcionalmente, só do console)."""
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if console_level is not None:
+        console_handler.setLevel(console_level.upper() if isinstance(console_level, str) else console_level)
+
+
+def shutdown_logging() -> None:
+    """Esvazia a fila e para o listener (chamado automaticamente na saída)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        file_handler.close()
+
+
+atexit.register(shutdown_logging)
 
 
-__all__ = ["logger"]
\ No newline at end of file
+__all__ = ["logger", "JsonFormatter", "LocalQueueHandler", "set_log_level", "shutdown_logging", "LOG_FILE"]
@@ -0,0 +1,227 @@
+"""
+Métricas de tempo das operações (serviços e telas).
+
+Uso:
+
+    @timed("sales.create_sale")
+    def create_sale(...): ...
+
+    with timer("ui.dashboard.refresh"):
+        ...
+
+As medições são agregadas em memória por nome (contagem, total, mínimo,
+máximo e histograma em faixas de ms) e gravadas periodicamente em
+`metrics.json` (a cada `VENDA_APP_METRICS_FLUSH_S` segundos, por uma thread
+em segundo plano, e na saída do programa). `record` nunca grava arquivo:
+só atualiza o agregado. A tela de Diagnóstico mostra o agregado e permite
+gravar na hora.
+
+Cada processo grava o seu arquivo: a interface usa `metrics.json`; a API
+e a CLI chamam `set_metrics_file` (metrics_api.json, metrics_cli.json).
+`VENDA_APP_METRICS_FILE` força um caminho. O temporário da gravação
+atômica leva o pid, para dois processos nunca dividirem o mesmo.
+
+Com `VENDA_APP_METRICS=0` (ou `disable_metrics()`), o decorator apenas
+chama a função original após checar uma flag.
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from .logger import logger
+
+
+METRICS_DIR = Path(__file__).resolve().parent.parent
+METRICS_FILE = Path(os.environ.get("VENDA_APP_METRICS_FILE") or METRICS_DIR / "metrics.json")
+
+# Limites superiores (ms) das faixas do histograma; a última faixa é "acima de"
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_lock = threading.Lock()
+_enabled = os.environ.get("VENDA_APP_METRICS", "1") not in ("", "0")
+_flush_interval_s = float(os.environ.get("VENDA_APP_METRICS_FLUSH_S", "60"))
+_metrics: Dict[str, Dict[str, Any]] = {}
+_started_at = datetime.now().isoformat(timespec="seconds")
+_flusher: Optional[threading.Thread] = None
+_stop_flusher = threading.Event()
+
+
+def _flush_loop() -> None:
+    while not _stop_flusher.wait(_flush_interval_s):
+        if _metrics:
+            flush_metrics()
+
+
+def _start_flusher() -> None:
+    """Sobe a thread de gravação periódica (uma vez, no primeiro registro)."""
+    global _flusher
+    with _lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="venda-metrics-flush", daemon=True)
+    _flusher.start()
+
+
+def set_metrics_file(path: Path) -> None:
+    """Arquivo deste processo (ignorado se VENDA_APP_METRICS_FILE estiver definido)."""
+    global METRICS_FILE
+    if not os.environ.get("VENDA_APP_METRICS_FILE"):
+        METRICS_FILE = Path(path)
+
+
+def record(name: str, elapsed_ms: float) -> None:
+    """Registra uma medição (ms) para `name` (só memória; a gravação é em segundo plano)."""
+    if _flusher is None:
+        _start_flusher()
+    with _lock:
+        m = _metrics.get(name)
+        if m is None:
+            m = _metrics[name] = {
+                "count": 0,
+                "total_ms": 0.0,
+                "min_ms": elapsed_ms,
+                "max_ms": elapsed_ms,
+                "buckets": [0] * (len(BUCKETS_MS) + 1),
+            }
+        m["count"] += 1
+        m["total_ms"] += elapsed_ms
+        if elapsed_ms < m["min_ms"]:
+            m["min_ms"] = elapsed_ms
+        if elapsed_ms > m["max_ms"]:
+            m["max_ms"] = elapsed_ms
+        i = 0
+        while i < len(BUCKETS_MS) and elapsed_ms > BUCKETS_MS[i]:
+            i += 1
+        m["buckets"][i] += 1
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Mede o bloco `with` (mesmo se levantar exceção)."""
+    if not _enabled:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - t0) * 1000.0)
+
+
+def timed(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator que mede cada chamada da função (nome padrão: módulo.função)."""
+
+    def decorator(fn: F) -> F:
+        metric = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(metric, (time.perf_counter() - t0) * 1000.0)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _percentile_from_buckets(buckets: List[int], count: int, pct: float) -> Optional[float]:
+    """Limite superior da faixa que contém o percentil (None = acima da última faixa)."""
+    target = count * pct / 100.0
+    acc = 0
+    for i, n in enumerate(buckets):
+        acc += n
+        if acc >= target:
+            return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else None
+    return None
+
+
+def get_metrics() -> List[Dict[str, Any]]:
+    """Cópia das métricas agregadas, ordenadas pelo tempo total."""
+    with _lock:
+        rows = [{"name": k, **v, "buckets": list(v["buckets"])} for k, v in _metrics.items()]
+    for r in rows:
+        r["avg_ms"] = r["total_ms"] / r["count"] if r["count"] else 0.0
+        r["p50_le_ms"] = _percentile_from_buckets(r["buckets"], r["count"], 50)
+        r["p95_le_ms"] = _percentile_from_buckets(r["buckets"], r["count"], 95)
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows
+
+
+def flush_metrics(path: Optional[Path] = None) -> Path:
+    """Grava o agregado atual em JSON (substituição atômica do arquivo)."""
+    path = path or METRICS_FILE
+    data = {
+        "session_started_at": _started_at,
+        "written_at": datetime.now().isoformat(timespec="seconds"),
+        "buckets_ms": list(BUCKETS_MS),
+        "metrics": get_metrics(),
+    }
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Falha ao gravar métricas em %s: %s", path, e)
+    return path
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _metrics.clear()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable_metrics() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable_metrics() -> None:
+    global _enabled
+    _enabled = False
+
+
+def _flush_at_exit() -> None:
+    _stop_flusher.set()
+    if _metrics:
+        flush_metrics()
+
+
+atexit.register(_flush_at_exit)
+
+
+__all__ = [
+    "BUCKETS_MS",
+    "METRICS_DIR",
+    "METRICS_FILE",
+    "disable_metrics",
+    "enable_metrics",
+    "flush_metrics",
+    "get_metrics",
+    "is_enabled",
+    "record",
+    "reset_metrics",
+    "set_metrics_file",
+    "timed",
+    "timer",
+]